@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import StatusSnapshot
+
+
+@admin.register(StatusSnapshot)
+class StatusSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('day', 'department', 'assignment_type', 'status', 'count', 'issued', 'completed')
+    list_filter = ('status', 'department', 'assignment_type')
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,100 @@
+"""
+Календарь сроков: сколько поручений приходится на каждый день месяца.
+
+Счёт по дням — один запрос GROUP BY deadline (для тепловой карты — ещё и
+по подразделению или исполнителю) с разбивкой по статусу через
+COUNT(...) FILTER. В браузер уходят только массивы чисел по дням, без строк
+поручений. Результат кэшируется на месяц и фильтр до следующего изменения
+поручений (версия счётчика ASSIGNMENTS в ключе).
+"""
+import calendar as cal
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.conditional import ASSIGNMENTS
+from core.models import ChangeCounter
+from task_control.models import Assignment
+
+CACHE_TIMEOUT = 60 * 60 * 24
+STATUSES = {
+    'open':    Q(status__in=(Assignment.Status.NEW, Assignment.Status.IN_PROGRESS)),
+    'overdue': Q(status=Assignment.Status.OVERDUE),
+    'done':    Q(status=Assignment.Status.DONE),
+}
+
+
+def parse_month(value, default):
+    """Первое число месяца из 'ГГГГ-ММ'; default при пустом или неверном значении."""
+    try:
+        year, month = map(int, value.split('-'))
+        return date(year, month, 1)
+    except (AttributeError, ValueError):
+        return default
+
+
+def shift_month(month, delta):
+    index = month.year * 12 + month.month - 1 + delta
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _cached(kind, month, *filters, build):
+    version = ChangeCounter.versions(ASSIGNMENTS)[ASSIGNMENTS]
+    key = f'analytics:calendar:{kind}:{month:%Y-%m}:' + ':'.join(str(f or '') for f in filters) + f':{version}'
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def _month_qs(month, dept=None, executor=None):
+    days = cal.monthrange(month.year, month.month)[1]
+    qs = Assignment.objects.filter(deadline__gte=month, deadline__lte=month.replace(day=days)).order_by()
+    if dept:
+        qs = qs.filter(executor__department_id=dept)
+    if executor:
+        qs = qs.filter(executor_id=executor)
+    return qs, days
+
+
+def month_calendar(month, dept=None, executor=None):
+    """{'month', 'days', 'open': [...], 'overdue': [...], 'done': [...]} — по элементу на день."""
+    def build():
+        qs, days = _month_qs(month, dept, executor)
+        result = {'month': f'{month:%Y-%m}', 'days': days, **{name: [0] * days for name in STATUSES}}
+        rows = qs.values('deadline').annotate(
+            **{name: Count('id', filter=condition) for name, condition in STATUSES.items()}
+        )
+        for row in rows:
+            for name in STATUSES:
+                result[name][row['deadline'].day - 1] = row[name]
+        return result
+
+    return _cached('month', month, dept, executor, build=build)
+
+
+def month_heatmap(month, dept=None):
+    """
+    Неисполненные по дням в разрезе подразделений (или исполнителей
+    подразделения dept): {'month', 'days', 'rows': [{'id', 'counts', 'total'}]}.
+    Подразделение 0 — исполнители без подразделения.
+    """
+    def build():
+        qs, days = _month_qs(month, dept)
+        group = 'executor_id' if dept else 'executor__department_id'
+        counts = {}
+        rows = qs.exclude(STATUSES['done']).values(group, 'deadline').annotate(n=Count('id'))
+        for row in rows:
+            counts.setdefault(row[group] or 0, [0] * days)[row['deadline'].day - 1] = row['n']
+        return {
+            'month': f'{month:%Y-%m}',
+            'days':  days,
+            'rows':  sorted(
+                ({'id': pk, 'counts': line, 'total': sum(line)} for pk, line in counts.items()),
+                key=lambda row: -row['total'],
+            ),
+        }
+
+    return _cached('heatmap', month, dept, build=build)
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.rollup import rollup_day
+
+
+class Command(BaseCommand):
+    help = 'Записывает дневной срез статусов поручений для раздела «Аналитика» (запускать в конце дня)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='День среза, ГГГГ-ММ-ДД (по умолчанию — сегодня)')
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('Дата в формате ГГГГ-ММ-ДД.')
+        rows = rollup_day(day)
+        self.stdout.write(self.style.SUCCESS(f'Срез за {day:%d.%m.%Y}: {rows} строк'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analytics.risk import refresh
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает риск просрочки неисполненных поручений (запускать раз в сутки)'
+
+    def handle(self, *args, **kwargs):
+        scored = refresh()
+        self.stdout.write(self.style.SUCCESS(f'Оценено поручений: {scored}'))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('task_control', '0010_assignmentchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.CharField(choices=[('NEW', 'Новое'), ('IN_PROGRESS', 'В работе'), ('DONE', 'Исполнено'), ('OVERDUE', 'Просрочено')], max_length=20, verbose_name='Статус')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Поручений на конец дня')),
+                ('issued', models.PositiveIntegerField(default=0, verbose_name='Выдано за день')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='Исполнено за день')),
+                ('assignment_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='task_control.assignmenttype', verbose_name='Вид документа')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='task_control.department', verbose_name='Подразделение')),
+            ],
+            options={
+                'verbose_name': 'Срез статусов за день',
+                'verbose_name_plural': 'Срезы статусов за день',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day', 'department', 'assignment_type'], name='snapshot_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import models
+
+from task_control.models import Assignment, AssignmentType, Department
+
+
+class StatusSnapshot(models.Model):
+    """
+    Дневной срез поручений: сколько их в каждом статусе по подразделению
+    исполнителя и виду документа на конец дня (count), сколько из них
+    выдано (issued) и исполнено (completed) в этот день.
+
+    Строки пишет analytics.rollup.rollup_day (команда rollup_status_snapshots,
+    задача analytics.rollup); графики раздела «Аналитика» читают только эту
+    таблицу — за день в ней не больше (подразделения × виды × статусы) строк.
+    """
+
+    day             = models.DateField(verbose_name="День")
+    department      = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True,
+                                        related_name='+', verbose_name="Подразделение")
+    assignment_type = models.ForeignKey(AssignmentType, on_delete=models.SET_NULL, null=True, blank=True,
+                                        related_name='+', verbose_name="Вид документа")
+    status          = models.CharField(max_length=20, choices=Assignment.Status.choices, verbose_name="Статус")
+    count           = models.PositiveIntegerField(default=0, verbose_name="Поручений на конец дня")
+    issued          = models.PositiveIntegerField(default=0, verbose_name="Выдано за день")
+    completed       = models.PositiveIntegerField(default=0, verbose_name="Исполнено за день")
+
+    class Meta:
+        verbose_name = "Срез статусов за день"
+        verbose_name_plural = "Срезы статусов за день"
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day', 'department', 'assignment_type'], name='snapshot_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day:%d.%m.%Y} · {self.get_status_display()}: {self.count}'
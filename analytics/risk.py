@@ -0,0 +1,119 @@
+"""
+Риск просрочки неисполненных поручений (Assignment.risk_score, 0…1).
+
+Оценка — доля опозданий в истории по четырём признакам: исполнитель,
+подразделение, вид поручения и отведённый срок (дней от выдачи до срока,
+корзины HORIZONS). Доля по каждому значению признака сглаживается к общей
+(SMOOTHING условных наблюдений), отклонения складываются в логитах с
+весами WEIGHTS. История — исполненные за HISTORY_DAYS (журнал
+StatusTransition; опоздание — исполнено позже срока) и уже просроченные.
+Просроченное поручение получает риск 1.
+
+Весь набор считается одним проходом по массивам NumPy и записывается
+UPDATE по значениям (оценки округлены до процента — не больше сотни
+запросов). Пересчёт — команда score_risk (cron) или задача analytics.risk;
+новые поручения получают оценку при следующем пересчёте.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from core.conditional import ASSIGNMENTS, touch
+from task_control.models import UPDATE_CHUNK, Assignment, StatusTransition
+
+HISTORY_DAYS = 365
+HORIZONS = (3, 7, 14, 30)   # границы корзин отведённого срока, дней
+SMOOTHING = 5
+WEIGHTS = {'executor': 1.0, 'department': 0.5, 'type': 0.5, 'horizon': 0.5}
+FLOOR, CEILING = 0.01, 0.99
+THRESHOLD = 0.6   # «в зоне риска» на дашборде
+
+
+def _logit(p):
+    p = np.clip(p, FLOOR, CEILING)
+    return np.log(p / (1 - p))
+
+
+def _features(executor, department, atype, issued, deadline):
+    allotted = (np.array(deadline, dtype='datetime64[D]') - np.array(issued, dtype='datetime64[D]')).astype(np.int64)
+    return {
+        'executor':   np.array(executor, dtype=np.int64),
+        'department': np.array([pk or 0 for pk in department], dtype=np.int64),
+        'type':       np.array(atype, dtype=np.int64),
+        'horizon':    np.digitize(allotted, HORIZONS),
+    }
+
+
+def history(today):
+    """Признаки и исход (True — опоздание) прошлых поручений."""
+    completed = list(
+        StatusTransition.objects
+        .completions(today - timedelta(days=HISTORY_DAYS), today)
+        .order_by()
+        .values_list('executor_id', 'executor__department_id', 'assignment__assignment_type_id',
+                     'assignment__issue_date', 'deadline', 'changed_at')
+    )
+    overdue = list(
+        Assignment.objects.filter(status=Assignment.Status.OVERDUE).order_by()
+        .values_list('executor_id', 'executor__department_id', 'assignment_type_id', 'issue_date', 'deadline')
+    )
+    rows = [row[:5] for row in completed] + overdue
+    if not rows:
+        return None, None
+    late = np.array(
+        [timezone.localtime(row[5]).date() > row[4] for row in completed] + [True] * len(overdue)
+    )
+    return _features(*zip(*rows)), late
+
+
+def _rates(keys, late, lookup, base):
+    """Сглаженная доля опозданий для каждого значения lookup по истории (keys, late)."""
+    values, groups = np.unique(keys, return_inverse=True)
+    rates = (np.bincount(groups, weights=late) + SMOOTHING * base) / (np.bincount(groups) + SMOOTHING)
+    position = np.clip(np.searchsorted(values, lookup), 0, len(values) - 1)
+    return np.where(values[position] == lookup, rates[position], base)
+
+
+def score(features, past, late):
+    """Риск для массивов признаков по истории (past, late)."""
+    size = len(features['executor'])
+    if past is None:
+        return np.full(size, np.nan)
+    base = float(np.clip(late.mean(), FLOOR, CEILING))
+    logit = np.full(size, _logit(base))
+    for name, weight in WEIGHTS.items():
+        logit += weight * (_logit(_rates(past[name], late, features[name], base)) - _logit(base))
+    return 1 / (1 + np.exp(-logit))
+
+
+def refresh(today=None):
+    """Пересчитывает risk_score всех неисполненных поручений; возвращает их число."""
+    today = today or timezone.localdate()
+    rows = list(
+        Assignment.objects.exclude(status=Assignment.Status.DONE).order_by()
+        .values_list('id', 'executor_id', 'executor__department_id', 'assignment_type_id',
+                     'issue_date', 'deadline', 'status')
+    )
+    if rows:
+        ids, executor, department, atype, issued, deadline, status = zip(*rows)
+        past, late = history(today)
+        risk = score(_features(executor, department, atype, issued, deadline), past, late)
+        risk[np.array(status) == Assignment.Status.OVERDUE] = 1.0
+        risk = np.round(risk, 2)
+        ids = np.array(ids)
+    else:
+        ids, risk = np.array([], dtype=np.int64), np.array([])
+
+    # Служебное поле: прямой UPDATE без отметки updated_at, журнала и счётчиков
+    base_manager = Assignment._base_manager
+    with transaction.atomic():
+        for value in np.unique(risk[~np.isnan(risk)]):
+            chunk_ids = ids[risk == value].tolist()
+            for start in range(0, len(chunk_ids), UPDATE_CHUNK):
+                base_manager.filter(pk__in=chunk_ids[start:start + UPDATE_CHUNK]).update(risk_score=float(value))
+        base_manager.filter(status=Assignment.Status.DONE, risk_score__isnull=False).update(risk_score=None)
+    # Страницы с сортировкой по риску — перепроверить (ETag)
+    touch(ASSIGNMENTS)
+    return len(ids)
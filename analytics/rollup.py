@@ -0,0 +1,53 @@
+"""
+Дневная свёртка поручений в StatusSnapshot.
+
+Срез снимается с текущего состояния таблицы поручений одним GROUP BY
+(подразделение исполнителя, вид документа, статус), поэтому запускать его
+нужно в конце дня, за который он пишется (cron: manage.py
+rollup_status_snapshots в 23:55). Повторный запуск за тот же день
+заменяет его строки.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from core.conditional import ANALYTICS, touch
+from core.replica import use_primary
+from task_control.models import Assignment, StatusTransition
+
+from .models import StatusSnapshot
+
+
+def rollup_day(day=None):
+    """Пишет срез за day (по умолчанию — сегодня); возвращает число строк."""
+    day = day or timezone.localdate()
+    done_today = Exists(StatusTransition.objects.completions(day, day).filter(assignment=OuterRef('pk')))
+    rows = (
+        Assignment.objects
+        .order_by()
+        .values('executor__department_id', 'assignment_type_id', 'status')
+        .annotate(
+            total=Count('id'),
+            issued=Count('id', filter=Q(issue_date=day)),
+            completed=Count('id', filter=Q(done_today, status=Assignment.Status.DONE)),
+        )
+    )
+    # Срез пишется на основную базу — и читается с неё, а не с отстающей реплики
+    with use_primary():
+        snapshots = [
+            StatusSnapshot(
+                day=day,
+                department_id=row['executor__department_id'],
+                assignment_type_id=row['assignment_type_id'],
+                status=row['status'],
+                count=row['total'],
+                issued=row['issued'],
+                completed=row['completed'],
+            )
+            for row in rows
+        ]
+    with transaction.atomic():
+        StatusSnapshot.objects.filter(day=day).delete()
+        StatusSnapshot.objects.bulk_create(snapshots)
+    touch(ANALYTICS)
+    return len(snapshots)
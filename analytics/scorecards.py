@@ -0,0 +1,147 @@
+"""
+Карточки исполнителей: исполнение в срок, опоздания и хвост неисполненных.
+
+Все строки за период читаются одним запросом values_list (дата исполнения —
+последний переход в «Исполнено» из журнала StatusTransition) в массивы
+NumPy; показатели по исполнителям и подразделениям считаются группировкой
+массивов (np.unique + np.bincount), без цикла по поручениям. Результат
+кэшируется на период до следующего изменения поручений.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from core.conditional import ASSIGNMENTS
+from core.models import ChangeCounter
+from task_control.models import Assignment, StatusTransition
+
+CACHE_TIMEOUT = 60 * 60 * 6
+PERCENTILE = 0.9
+
+
+def load(start, end, today):
+    """
+    Массивы по поручениям: исполненным с start по end и неисполненным на сегодня.
+    Сроки и даты — дни от today (отрицательные — в прошлом).
+    """
+    completed_at = Subquery(
+        StatusTransition.objects.filter(assignment=OuterRef('pk'), to_status=Assignment.Status.DONE)
+        .order_by('-changed_at').values('changed_at')[:1]
+    )
+    rows = list(
+        Assignment.objects.annotate(completed_at=completed_at)
+        .filter(
+            Q(status=Assignment.Status.DONE, completed_at__date__gte=start, completed_at__date__lte=end)
+            | ~Q(status=Assignment.Status.DONE)
+        )
+        .order_by()
+        .values_list('executor_id', 'executor__department_id', 'status', 'issue_date', 'deadline', 'completed_at')
+    )
+    if not rows:
+        return None
+    executor, department, status, issued, deadline, completed = zip(*rows)
+    origin = np.datetime64(today, 'D')
+    done_day = np.array([timezone.localtime(value).date() if value else None for value in completed],
+                        dtype='datetime64[D]') - origin
+    return {
+        'executor':   np.array(executor, dtype=np.int64),
+        'department': np.array([pk or 0 for pk in department], dtype=np.int64),
+        'done':       np.array(status) == Assignment.Status.DONE,
+        'issued':     (np.array(issued, dtype='datetime64[D]') - origin).astype(np.int64),
+        'deadline':   (np.array(deadline, dtype='datetime64[D]') - origin).astype(np.int64),
+        'completed':  np.where(np.isnat(done_day), np.nan, done_day.astype(np.int64)),
+    }
+
+
+def _percentile(groups, values, n, q):
+    """q-перцентиль values в каждой из n групп (линейная интерполяция); NaN — пустая группа."""
+    result = np.full(n, np.nan)
+    if not len(values):
+        return result
+    order = np.lexsort((values, groups))
+    values = values[order]
+    counts = np.bincount(groups, minlength=n)
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    position = starts[present] + q * (counts[present] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    result[present] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+
+def _divide(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b > 0, a / np.where(b > 0, b, 1), np.nan)
+
+
+def score(keys, data):
+    """Показатели по группам keys (массив id): {id: {показатель: значение}}."""
+    ids, groups = np.unique(keys, return_inverse=True)
+    n = len(ids)
+    done = data['done']
+    active = ~done
+
+    # Опоздание в днях: дата исполнения минус срок (≤ 0 — в срок)
+    delay = np.maximum(data['completed'] - data['deadline'], 0)
+    completed = np.bincount(groups, weights=done, minlength=n)
+    on_time = np.bincount(groups, weights=done & (data['completed'] <= data['deadline']), minlength=n)
+    late = np.bincount(groups, weights=done & (delay > 0), minlength=n)
+    delay_sum = np.bincount(groups, weights=np.where(done, delay, 0), minlength=n)
+    delay_p90 = _percentile(groups[done], delay[done], n, PERCENTILE)
+    delay_median = _percentile(groups[done], delay[done], n, 0.5)
+
+    # Хвост: неисполненные на сегодня, возраст — дней с выдачи
+    age = -data['issued']
+    backlog = np.bincount(groups, weights=active, minlength=n)
+    overdue = np.bincount(groups, weights=active & (data['deadline'] < 0), minlength=n)
+    age_sum = np.bincount(groups, weights=np.where(active, age, 0), minlength=n)
+    age_max = np.zeros(n)
+    np.maximum.at(age_max, groups[active], age[active])
+
+    columns = {
+        'completed':    completed,
+        'on_time':      on_time,
+        'late':         late,
+        'on_time_rate': _divide(on_time, completed) * 100,
+        'delay_mean':   _divide(delay_sum, completed),
+        'delay_median': delay_median,
+        'delay_p90':    delay_p90,
+        'backlog':      backlog,
+        'overdue':      overdue,
+        'age_mean':     _divide(age_sum, backlog),
+        'age_max':      age_max,
+    }
+    # В кэш и шаблон — обычные числа Python (None вместо NaN)
+    return {
+        int(pk): {name: None if np.isnan(values[i]) else round(float(values[i]), 1)
+                  for name, values in columns.items()}
+        for i, pk in enumerate(ids)
+    }
+
+
+def scorecards(start, end):
+    """{'executors': {id: показатели}, 'departments': {...}} за период; кэшируется."""
+    today = timezone.localdate()
+    version = ChangeCounter.versions(ASSIGNMENTS)[ASSIGNMENTS]
+    key = f'analytics:scorecards:{start}:{end}:{today}:{version}'
+    result = cache.get(key)
+    if result is None:
+        data = load(start, end, today)
+        result = {
+            'executors':   score(data['executor'], data) if data else {},
+            'departments': score(data['department'], data) if data else {},
+        }
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def default_period(today):
+    """Последние три месяца, включая текущий."""
+    month = today.replace(day=1)
+    for _ in range(2):
+        month = (month - timedelta(days=1)).replace(day=1)
+    return month, today
@@ -0,0 +1,19 @@
+"""Фоновые задачи аналитики (jobs.registry)."""
+from datetime import date
+
+from jobs.registry import register
+
+from . import risk
+from .rollup import rollup_day
+
+
+@register('analytics.rollup', 'Срез статусов для аналитики')
+def rollup(ctx):
+    day = ctx.params.get('day')
+    rows = rollup_day(date.fromisoformat(day) if day else None)
+    return {'rows': rows}
+
+
+@register('analytics.risk', 'Риск просрочки поручений')
+def score_risk(ctx):
+    return {'scored': risk.refresh()}
@@ -0,0 +1,201 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from task_control.models import Assignment, AssignmentType, Department, Employee
+
+from . import risk
+from .calendar import month_calendar
+from .models import StatusSnapshot
+from .rollup import rollup_day
+from .scorecards import scorecards
+
+
+class AnalyticsTestCase(TestCase):
+    """Вход под staff, подразделение, контролёр и вид поручения; create() — поручение с ними."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.client.force_login(user)
+
+        self.dept = Department.objects.create(name='Цех №1')
+        self.controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        self.atype = AssignmentType.objects.create(name='Распоряжение')
+
+    def create(self, number, executor, deadline, status='NEW', issue_date=None):
+        return Assignment.objects.create(
+            assignment_type=self.atype, document_number=str(number),
+            issue_date=issue_date or date.today() - timedelta(days=20), deadline=deadline,
+            description='Поручение', executor=executor, controller=self.controller, status=status,
+        )
+
+
+class StatusSnapshotTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван', department=self.dept)
+        today = date.today()
+        # Переходы статусов пишутся после фиксации транзакции
+        with self.captureOnCommitCallbacks(execute=True):
+            for n, (status, issued) in enumerate((
+                ('NEW', today), ('NEW', today - timedelta(days=10)), ('OVERDUE', today - timedelta(days=40)),
+                ('DONE', today - timedelta(days=5)),
+            )):
+                self.create(n, executor, today + timedelta(days=3), status, issue_date=issued)
+
+    def test_rollup_groups_by_department_type_and_status(self):
+        today = date.today()
+        self.assertEqual(rollup_day(today), 3)
+
+        rows = {s.status: s for s in StatusSnapshot.objects.filter(day=today)}
+        self.assertEqual(rows['NEW'].count, 2)
+        self.assertEqual(rows['NEW'].issued, 1)
+        self.assertEqual(rows['NEW'].department, self.dept)
+        self.assertEqual(rows['DONE'].completed, 1)
+        self.assertEqual(rows['OVERDUE'].count, 1)
+
+        # Повторный срез за тот же день заменяет строки
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(status='OVERDUE').update(status='DONE')
+        call_command('rollup_status_snapshots', date=today.isoformat(), stdout=StringIO())
+        self.assertEqual(StatusSnapshot.objects.filter(day=today).count(), 2)
+        self.assertEqual(StatusSnapshot.objects.get(day=today, status='DONE').completed, 2)
+
+    def test_page_reads_only_snapshots(self):
+        response = self.client.get(reverse('analytics:index'))
+        self.assertContains(response, 'Срезов ещё нет')
+
+        rollup_day()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('analytics:index'), {'dept': self.dept.pk, 'months': 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q['sql'] for q in queries if 'task_control_assignment"' in q['sql']])
+        self.assertEqual(response.context['kpi'], {'issued': 1, 'completed': 1, 'active': 3, 'overdue': 1})
+
+    def test_period_start(self):
+        from .views import _month_start
+
+        # 12 месяцев, включая текущий: ноябрь прошлого года — октябрь
+        self.assertEqual(_month_start(date(2026, 10, 19), 11), date(2025, 11, 1))
+        self.assertEqual(_month_start(date(2026, 12, 31), 0), date(2026, 12, 1))
+        self.assertEqual(_month_start(date(2026, 3, 1), 5), date(2025, 10, 1))
+
+
+class ScorecardTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.late = Employee.objects.create(last_name='Сидоров', first_name='Семён', department=self.dept)
+        self.punctual = Employee.objects.create(last_name='Иванов', first_name='Иван', department=self.dept)
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            for n, (executor, overdue_by, status) in enumerate((
+                (self.late, 3, 'DONE'), (self.late, 7, 'DONE'), (self.late, 0, 'DONE'), (self.late, 5, 'OVERDUE'),
+                (self.punctual, -2, 'DONE'), (self.punctual, -5, 'NEW'),
+            )):
+                self.create(n, executor, today - timedelta(days=overdue_by), status)
+
+    def test_vectorised_statistics(self):
+        today = date.today()
+        result = scorecards(today - timedelta(days=30), today)
+        late = result['executors'][self.late.pk]
+        self.assertEqual(late['completed'], 3)
+        self.assertEqual(late['on_time_rate'], 33.3)
+        self.assertEqual(late['delay_mean'], 3.3)
+        self.assertEqual(late['delay_median'], 3)
+        self.assertEqual(late['delay_p90'], 6.2)
+        self.assertEqual((late['backlog'], late['overdue'], late['age_mean']), (1, 1, 20))
+
+        punctual = result['executors'][self.punctual.pk]
+        self.assertEqual((punctual['on_time_rate'], punctual['delay_mean']), (100, 0))
+        self.assertEqual(result['departments'][self.dept.pk]['completed'], 4)
+
+        # Кэш на период: без изменений поручений запрос к базе не повторяется
+        with self.assertNumQueries(1):
+            scorecards(today - timedelta(days=30), today)
+
+    def test_page_lists_worst_first(self):
+        response = self.client.get(reverse('analytics:scorecards'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.context['executors']], [self.late.pk, self.punctual.pk])
+
+
+class RiskScoreTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.late = Employee.objects.create(last_name='Сидоров', first_name='Сидор', department=self.dept)
+        self.punctual = Employee.objects.create(last_name='Иванов', first_name='Иван', department=self.dept)
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            # История: у одного исполнено после срока, у другого — до
+            for n in range(4):
+                self.create(f'late-{n}', self.late, today - timedelta(days=3))
+                self.create(f'ok-{n}', self.punctual, today + timedelta(days=3))
+            Assignment.objects.filter(document_number__contains='-').update(status='DONE')
+            self.late_open = self.create('1', self.late, today + timedelta(days=5))
+            self.punctual_open = self.create('2', self.punctual, today + timedelta(days=5))
+            self.overdue = self.create('3', self.late, today - timedelta(days=1), status='OVERDUE')
+
+    def test_scores_follow_history(self):
+        Assignment.objects.filter(document_number='late-0').update(risk_score=0.5)
+        self.assertEqual(risk.refresh(), 3)
+
+        scores = dict(Assignment.objects.values_list('id', 'risk_score'))
+        self.assertGreater(scores[self.late_open.pk], risk.THRESHOLD)
+        self.assertLess(scores[self.punctual_open.pk], scores[self.late_open.pk])
+        self.assertEqual(scores[self.overdue.pk], 1.0)
+        # У исполненных оценка снимается
+        self.assertIsNone(scores[Assignment.objects.get(document_number='late-0').pk])
+
+    def test_list_sorts_by_risk(self):
+        call_command('score_risk', stdout=StringIO())
+        response = self.client.get(reverse('assignments:list'), {'status': 'active', 'sort': '-risk'})
+        self.assertEqual([a.pk for a in response.context['assignments']], [self.late_open.pk, self.punctual_open.pk])
+
+
+class DeadlineCalendarTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = Employee.objects.create(last_name='Иванов', first_name='Иван', department=self.dept)
+        other = Employee.objects.create(last_name='Сидоров', first_name='Сидор')
+        for n, (executor, deadline, status) in enumerate((
+            (self.executor, date(2026, 3, 5), 'NEW'),
+            (self.executor, date(2026, 3, 5), 'OVERDUE'),
+            (other, date(2026, 3, 5), 'DONE'),
+            (other, date(2026, 3, 31), 'IN_PROGRESS'),
+            (other, date(2026, 4, 1), 'NEW'),
+        )):
+            self.create(n, executor, deadline, status, issue_date=date(2026, 3, 1))
+
+    def test_counts_by_day_are_cached_until_change(self):
+        month = date(2026, 3, 1)
+        with CaptureQueriesContext(connection) as queries:
+            result = month_calendar(month)
+        self.assertEqual(len([q for q in queries if 'task_control_assignment' in q['sql']]), 1)
+        self.assertEqual(result['days'], 31)
+        self.assertEqual((result['open'][4], result['overdue'][4], result['done'][4]), (1, 1, 1))
+        self.assertEqual(result['open'][30], 1)
+        self.assertEqual(month_calendar(month, executor=self.executor.pk)['done'][4], 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            month_calendar(month)
+        self.assertFalse([q for q in queries if 'task_control_assignment' in q['sql']])
+
+        Assignment.objects.filter(status='NEW', deadline=date(2026, 3, 5)).update(status='DONE')
+        self.assertEqual(month_calendar(month)['done'][4], 2)
+
+    def test_heatmap_rows(self):
+        response = self.client.get(reverse('analytics:heatmap_data'), {'month': '2026-03'})
+        rows = {row['name']: row for row in response.json()['rows']}
+        self.assertEqual(rows['Цех №1']['counts'][4], 2)
+        self.assertEqual(rows['Без подразделения']['total'], 1)
+
+        response = self.client.get(reverse('analytics:heatmap_data'), {'month': '2026-03', 'dept': self.dept.pk})
+        self.assertEqual(response.json()['group'], 'executor')
+        self.assertEqual([row['id'] for row in response.json()['rows']], [self.executor.pk])
+        self.assertContains(self.client.get(reverse('analytics:calendar'), {'month': '2026-03'}), 'Календарь сроков')
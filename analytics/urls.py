@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views
+
+app_name = 'analytics'
+
+urlpatterns = [
+    path('',            views.analytics_index,   name='index'),
+    path('scorecards/', views.scorecards,        name='scorecards'),
+    path('calendar/',         views.deadline_calendar, name='calendar'),
+    path('calendar/data/',    views.calendar_data,     name='calendar_data'),
+    path('calendar/heatmap/', views.heatmap_data,      name='heatmap_data'),
+    path('refresh/',    views.analytics_refresh, name='refresh'),
+]
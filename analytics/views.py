@@ -0,0 +1,246 @@
+import json
+from datetime import date, timedelta
+from functools import partial
+
+from asgiref.sync import sync_to_async
+
+from django.contrib import messages
+from django.http import JsonResponse
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.shortcuts import redirect, render
+from django.utils import formats, timezone
+from django.views.decorators.http import require_POST
+
+from core import asyncdb
+from core.conditional import ANALYTICS, ASSIGNMENTS, REFDATA, conditional_page
+from core.mixins import staff_required
+from core.refcache import get_reference_data
+from jobs.runner import enqueue
+from task_control.models import Assignment, Employee
+
+from . import calendar as deadlines
+from . import scorecards as cards
+from .models import StatusSnapshot
+
+PERIODS = (6, 12, 24, 36)   # месяцев
+SCORECARD_SORTS = ('on_time_rate', 'delay_mean', 'delay_p90', 'overdue', 'age_mean')
+ACTIVE = (Assignment.Status.NEW, Assignment.Status.IN_PROGRESS, Assignment.Status.OVERDUE)
+
+
+def _date(value, default):
+    try:
+        return date.fromisoformat(value) if value else default
+    except ValueError:
+        return default
+
+
+def _int(value):
+    return int(value) if value and value.isdigit() else None
+
+
+def _months(start, end):
+    """Первые числа месяцев от start до end включительно."""
+    months = []
+    month = start.replace(day=1)
+    while month <= end:
+        months.append(month)
+        month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return months
+
+
+def _month_start(today, months):
+    """Первое число месяца, отстоящего от текущего на months назад."""
+    return deadlines.shift_month(today.replace(day=1), -months)
+
+
+@staff_required
+@conditional_page(ANALYTICS, REFDATA)
+def analytics_index(request):
+    """Статистика по дневным срезам (StatusSnapshot) — поручения не читаются."""
+    dept = _int(request.GET.get('dept'))
+    atype = _int(request.GET.get('atype'))
+    months = _int(request.GET.get('months'))
+    months = months if months in PERIODS else 12
+
+    today = timezone.localdate()
+    start = _month_start(today, months - 1)
+    latest = StatusSnapshot.objects.aggregate(day=Max('day'))['day']
+
+    snapshots = StatusSnapshot.objects.filter(day__gte=start)
+    if dept:
+        snapshots = snapshots.filter(department_id=dept)
+    if atype:
+        snapshots = snapshots.filter(assignment_type_id=atype)
+
+    # ── Выдано / исполнено по месяцам ────────────────────────
+    flow = {
+        row['month']: row
+        for row in snapshots.annotate(month=TruncMonth('day')).values('month')
+        .annotate(issued=Sum('issued'), completed=Sum('completed')).order_by()
+    }
+
+    # ── Остаток по статусам на последний срез месяца ─────────
+    month_ends = (
+        StatusSnapshot.objects.filter(day__gte=start).annotate(month=TruncMonth('day'))
+        .values('month').annotate(last=Max('day')).order_by().values_list('last', flat=True)
+    )
+    stock = {}
+    for row in snapshots.filter(day__in=list(month_ends)).values('day', 'status') \
+            .annotate(n=Sum('count')).order_by():
+        stock[(row['day'].replace(day=1), row['status'])] = row['n']
+
+    labels = _months(start, today)
+    chart_flow = {
+        'labels':    [formats.date_format(m, 'M Y') for m in labels],
+        'issued':    [flow[m]['issued'] if m in flow else 0 for m in labels],
+        'completed': [flow[m]['completed'] if m in flow else 0 for m in labels],
+    }
+    chart_stock = {
+        'labels': chart_flow['labels'],
+        'series': [
+            {'label': str(label), 'status': value, 'data': [stock.get((m, value), 0) for m in labels]}
+            for value, label in Assignment.Status.choices if value in ACTIVE
+        ],
+    }
+
+    # ── Разбивка на последний срез ───────────────────────────
+    current = StatusSnapshot.objects.filter(day=latest, status__in=ACTIVE)
+    active_sum = {'active': Sum('count'), 'overdue': Sum('count', filter=Q(status=Assignment.Status.OVERDUE))}
+    by_dept = list(
+        (current.filter(assignment_type_id=atype) if atype else current)
+        .values('department__name').annotate(**active_sum).order_by('-active')[:10]
+    )
+    by_type = list(
+        (current.filter(department_id=dept) if dept else current)
+        .values('assignment_type__name').annotate(**active_sum).order_by('-active')[:10]
+    )
+    chart_depts = {
+        'labels':  [row['department__name'] or 'Без подразд.' for row in by_dept],
+        'active':  [row['active'] for row in by_dept],
+        'overdue': [row['overdue'] or 0 for row in by_dept],
+    }
+    chart_types = {
+        'labels':  [row['assignment_type__name'] or '(удалён)' for row in by_type],
+        'active':  [row['active'] for row in by_type],
+        'overdue': [row['overdue'] or 0 for row in by_type],
+    }
+
+    totals = snapshots.aggregate(issued=Sum('issued'), completed=Sum('completed'))
+    on_latest = snapshots.filter(day=latest, status__in=ACTIVE).aggregate(**active_sum)
+    kpi = {
+        'issued':    totals['issued'] or 0,
+        'completed': totals['completed'] or 0,
+        'active':    on_latest['active'] or 0,
+        'overdue':   on_latest['overdue'] or 0,
+    }
+
+    ref = get_reference_data()
+    return render(request, 'analytics/index.html', {
+        'kpi':              kpi,
+        'latest':           latest,
+        'start':            start,
+        'periods':          PERIODS,
+        'departments':      ref.departments,
+        'assignment_types': ref.assignment_types,
+        'f_dept':           dept,
+        'f_atype':          atype,
+        'f_months':         months,
+        'chart_flow':  json.dumps(chart_flow,  ensure_ascii=False),
+        'chart_stock': json.dumps(chart_stock, ensure_ascii=False),
+        'chart_depts': json.dumps(chart_depts, ensure_ascii=False),
+        'chart_types': json.dumps(chart_types, ensure_ascii=False),
+    })
+
+
+@staff_required
+@conditional_page(ASSIGNMENTS, REFDATA)
+def scorecards(request):
+    """Карточки исполнителей и подразделений за период (?start=&end=)."""
+    today = timezone.localdate()
+    default_start, default_end = cards.default_period(today)
+    start = _date(request.GET.get('start'), default_start)
+    end = min(_date(request.GET.get('end'), default_end), today)
+    start = min(start, end)
+    sort = request.GET.get('sort')
+    sort = sort if sort in SCORECARD_SORTS else 'on_time_rate'
+
+    result = cards.scorecards(start, end)
+    names = {
+        pk: f'{last} {first[:1]}.' + (f'{middle[:1]}.' if middle else '')
+        for pk, last, first, middle in Employee.objects.filter(pk__in=result['executors'])
+        .values_list('id', 'last_name', 'first_name', 'middle_name')
+    }
+    dept_names = {d['id']: d['name'] for d in get_reference_data().departments}
+
+    def ordered(rows):
+        # Сначала хуже всех: меньше исполнено в срок, дольше опоздания и хвост
+        reverse = sort != 'on_time_rate'
+        missing = float('inf') if not reverse else float('-inf')
+        return sorted(rows, key=lambda row: missing if row[sort] is None else row[sort], reverse=reverse)
+
+    executors = ordered(
+        {**stats, 'id': pk, 'name': names.get(pk, '—')} for pk, stats in result['executors'].items()
+    )
+    departments = ordered(
+        {**stats, 'id': pk, 'name': dept_names.get(pk, 'Без подразделения')}
+        for pk, stats in result['departments'].items()
+    )
+    return render(request, 'analytics/scorecards.html', {
+        'executors':   executors,
+        'departments': departments,
+        'start':       start,
+        'end':         end,
+        'sort':        sort,
+    })
+
+
+@staff_required
+@conditional_page(REFDATA)
+def deadline_calendar(request):
+    """Календарь сроков; данные страница запрашивает у calendar_data и heatmap_data."""
+    data = get_reference_data()
+    month = deadlines.parse_month(request.GET.get('month'), timezone.localdate().replace(day=1))
+    return render(request, 'analytics/calendar.html', {
+        'departments': data.departments,
+        'executors':   data.executors,
+        'month':       month,
+        'prev_month':  deadlines.shift_month(month, -1),
+        'next_month':  deadlines.shift_month(month, 1),
+        'f_dept':      _int(request.GET.get('dept')),
+        'f_executor':  _int(request.GET.get('executor')),
+    })
+
+
+@staff_required
+@conditional_page(ASSIGNMENTS)
+async def calendar_data(request):
+    """Число поручений по дням месяца (?month=ГГГГ-ММ&dept=&executor=)."""
+    month = deadlines.parse_month(request.GET.get('month'), timezone.localdate().replace(day=1))
+    return JsonResponse(await sync_to_async(deadlines.month_calendar)(
+        month, _int(request.GET.get('dept')), _int(request.GET.get('executor')),
+    ))
+
+
+@staff_required
+@conditional_page(ASSIGNMENTS, REFDATA)
+async def heatmap_data(request):
+    """Неисполненные по дням месяца: строки — подразделения или исполнители ?dept=."""
+    month = deadlines.parse_month(request.GET.get('month'), timezone.localdate().replace(day=1))
+    dept = _int(request.GET.get('dept'))
+    data, result = await asyncdb.gather(get_reference_data, partial(deadlines.month_heatmap, month, dept))
+    if dept:
+        names = {e['id']: e['short'] for e in data.executors}
+    else:
+        names = {d['id']: d['name'] for d in data.departments}
+    rows = [{**row, 'name': names.get(row['id'], '—' if dept else 'Без подразделения')} for row in result['rows']]
+    return JsonResponse({**result, 'rows': rows, 'group': 'executor' if dept else 'dept'})
+
+
+@staff_required
+@require_POST
+def analytics_refresh(request):
+    """Срез за сегодня вне расписания — через очередь фоновых задач."""
+    job = enqueue('analytics.rollup', user=request.user)
+    messages.info(request, f'Срез поставлен в очередь (задача №{job.pk}). Обновите страницу после её завершения.')
+    return redirect('analytics:index')
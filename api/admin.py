@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import ApiToken
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_active', 'can_write', 'created_at', 'last_used_at')
+    list_editable = ('is_active', 'can_write')
+    readonly_fields = ('created_at', 'last_used_at')
+
+    def has_add_permission(self, request):
+        # Ключ создаётся командой create_api_token: только она может показать его открытым
+        return False
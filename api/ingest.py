@@ -0,0 +1,273 @@
+"""
+Загрузка поручений из внешних систем: NDJSON, одна строка — одно поручение.
+
+    {"document_number": "15-к/107", "assignment_type": 3, "executor": 12,
+     "controller": 4, "approver": null, "issue_date": "2026-03-01",
+     "deadline": "2026-03-20", "description": "...", "status": "NEW",
+     "base_document_number": null}
+
+Тело запроса читается построчно, без загрузки целиком. Строки проверяются
+пачками по BATCH_SIZE по снимку справочников (core.refcache) — без
+запросов к базе на строку — и записываются одним INSERT ... ON CONFLICT
+по ключу (вид, год издания, номер, исполнитель): новое поручение
+создаётся, существующее обновляется (статус и отметки об уведомлениях не
+трогаются).
+
+Уведомления не отправляются в запросе: при notify=True новые поручения
+и поручения с изменённым сроком уходят массовыми операциями в очередь
+фоновых задач (assignments.bulk).
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import DatabaseError, transaction
+
+from core.conditional import ASSIGNMENTS, touch
+from core.refcache import bump_version, get_reference_data
+from task_control import workload
+from task_control.models import Assignment, AssignmentChange, DocumentNumberCounter, StatusTransition
+from task_control.workload import State
+
+BATCH_SIZE = 1000
+
+UNIQUE_FIELDS = ('assignment_type', 'issue_year', 'document_number', 'executor')
+UPDATE_FIELDS = (
+    'base_document_number', 'issue_date', 'deadline',
+    'description', 'controller', 'approver', 'updated_at',
+)
+MAX_LENGTHS = {'document_number': 50, 'base_document_number': 50}
+
+
+class Lookup:
+    """Допустимые id из снимка справочников."""
+
+    def __init__(self, data):
+        self.types       = {t['id'] for t in data.assignment_types}
+        self.employees   = set(data.employee_ids)
+        self.controllers = {e['id'] for e in data.controller_candidates}
+        self.approvers   = {e['id'] for e in data.approver_candidates}
+        self.people_in_assignments = data.executor_ids | data.controller_ids | data.approver_ids
+
+
+@dataclass
+class IngestResult:
+    lines:   list = field(default_factory=list)   # (номер строки, статус, id, ошибки)
+    created: list = field(default_factory=list)
+    deadline_changed: list = field(default_factory=list)
+    written:    int = 0
+    new_people: bool = False
+
+    def add(self, line, status, pk=None, errors=None):
+        self.lines.append((line, status, pk, errors))
+
+    def summary(self):
+        counts = {}
+        for _, status, _, _ in self.lines:
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def as_json(self):
+        return {
+            'summary': self.summary(),
+            'results': [
+                {'line': line, 'status': status, 'id': pk, **({'errors': errors} if errors else {})}
+                for line, status, pk, errors in sorted(self.lines, key=lambda item: item[0])
+            ],
+        }
+
+
+# ════════════════════════════════════════════════════════
+#  РАЗБОР И ПРОВЕРКА
+# ════════════════════════════════════════════════════════
+
+def iter_records(stream):
+    """(номер строки, dict или None, ошибка) для каждой непустой строки потока."""
+    for number, raw in enumerate(stream, 1):
+        raw = raw.strip()
+        if number == 1:
+            raw = raw.lstrip(b'\xef\xbb\xbf')
+        if not raw:
+            continue
+        try:
+            record = json.loads(raw)
+        except (ValueError, UnicodeDecodeError):
+            yield number, None, 'Строка не является JSON.'
+            continue
+        if not isinstance(record, dict):
+            yield number, None, 'Ожидается JSON-объект.'
+            continue
+        yield number, record, None
+
+
+def _date(record, name, errors):
+    value = record.get(name)
+    if not value:
+        errors[name] = 'Обязательное поле.'
+        return None
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        errors[name] = 'Ожидается дата ГГГГ-ММ-ДД.'
+        return None
+
+
+def _ref(record, name, allowed, errors, required=True):
+    value = record.get(name)
+    if value in (None, ''):
+        if required:
+            errors[name] = 'Обязательное поле.'
+        return None
+    if not isinstance(value, int) or value not in allowed:
+        errors[name] = 'Нет такой записи (или она не подходит для этого поля).'
+        return None
+    return value
+
+
+def build(record, lookup):
+    """Несохранённое Assignment из строки и словарь ошибок."""
+    errors = {}
+    text = {}
+    for name in ('document_number', 'description', 'base_document_number'):
+        value = record.get(name)
+        value = '' if value is None else str(value).strip()
+        if not value and name != 'base_document_number':
+            errors[name] = 'Обязательное поле.'
+        elif name in MAX_LENGTHS and len(value) > MAX_LENGTHS[name]:
+            errors[name] = f'Не длиннее {MAX_LENGTHS[name]} символов.'
+        text[name] = value
+
+    status = record.get('status') or Assignment.Status.NEW
+    if status not in Assignment.Status.values:
+        errors['status'] = f'Одно из: {", ".join(Assignment.Status.values)}.'
+
+    assignment = Assignment(
+        document_number=text['document_number'],
+        base_document_number=text['base_document_number'] or None,
+        description=text['description'],
+        status=status,
+        assignment_type_id=_ref(record, 'assignment_type', lookup.types, errors),
+        executor_id=_ref(record, 'executor', lookup.employees, errors),
+        controller_id=_ref(record, 'controller', lookup.controllers, errors),
+        approver_id=_ref(record, 'approver', lookup.approvers, errors, required=False),
+        issue_date=_date(record, 'issue_date', errors),
+        deadline=_date(record, 'deadline', errors),
+    )
+    return assignment, errors
+
+
+# ════════════════════════════════════════════════════════
+#  ЗАПИСЬ
+# ════════════════════════════════════════════════════════
+
+def key_of(assignment):
+    return (assignment.assignment_type_id, assignment.issue_date.year,
+            assignment.document_number, assignment.executor_id)
+
+
+def select_keys(keys):
+    """{ключ: (id, State)} поручений с ключами из keys."""
+    return {
+        (type_id, year, number, executor_id): (pk, State(executor_id, type_id, status, deadline))
+        for pk, type_id, year, number, executor_id, status, deadline in Assignment.objects.filter(
+            assignment_type_id__in={key[0] for key in keys},
+            issue_year__in={key[1] for key in keys},
+            document_number__in={key[2] for key in keys},
+            executor_id__in={key[3] for key in keys},
+        ).values_list('id', 'assignment_type_id', 'issue_year', 'document_number', 'executor_id',
+                      'status', 'deadline')
+        if (type_id, year, number, executor_id) in keys
+    }
+
+
+def upsert(batch, result, lookup):
+    """Записывает пачку [(номер строки, Assignment)] одним INSERT ... ON CONFLICT."""
+    by_key = {}
+    for line, assignment in batch:
+        key = key_of(assignment)
+        if key in by_key:
+            result.add(by_key[key][0], 'skipped', errors={'line': f'Заменена строкой {line}.'})
+        by_key[key] = (line, assignment)
+
+    objs = [assignment for _, assignment in by_key.values()]
+    try:
+        with transaction.atomic():
+            existing = select_keys(by_key)
+            Assignment.objects.bulk_create(
+                objs, update_conflicts=True, unique_fields=UNIQUE_FIELDS, update_fields=UPDATE_FIELDS,
+            )
+            # id после bulk_create заполнены не на всех базах (MySQL — без RETURNING):
+            # перечитываем по ключу в той же транзакции
+            ids = {key: pk for key, (pk, _) in select_keys(by_key).items()}
+            for key, (_, assignment) in by_key.items():
+                assignment.pk = ids[key]
+            created = [key for key in by_key if key not in existing]
+
+            # Счётчики нагрузки — в той же транзакции (статус существующих загрузка не меняет)
+            workload.apply(
+                (existing[key][1], existing[key][1]._replace(deadline=assignment.deadline))
+                if key in existing else (None, State.of(assignment))
+                for key, (_, assignment) in by_key.items()
+            )
+            # bulk_create не шлёт post_save — журналы и счётчики номеров вручную, в той же транзакции
+            AssignmentChange.record(AssignmentChange.Operation.CREATE, [ids[key] for key in created])
+            AssignmentChange.record(
+                AssignmentChange.Operation.UPDATE, [ids[key] for key in by_key if key in existing], UPDATE_FIELDS)
+            # Переходы статуса — только у новых поручений
+            StatusTransition.objects.bulk_create(
+                [StatusTransition.for_assignment(by_key[key][1]) for key in created], batch_size=1000)
+            DocumentNumberCounter.observe_many(objs)
+    except DatabaseError as exc:
+        for line, _ in by_key.values():
+            result.add(line, 'error', errors={'line': f'Ошибка записи пачки: {exc}'})
+        return
+
+    result.written += len(objs)
+    for key, (line, assignment) in by_key.items():
+        if key in existing:
+            pk, old = existing[key]
+            result.add(line, 'updated', pk)
+            if old.deadline != assignment.deadline:
+                result.deadline_changed.append(pk)
+        else:
+            result.created.append(assignment.pk)
+            result.add(line, 'created', assignment.pk)
+        if {assignment.executor_id, assignment.controller_id, assignment.approver_id} - {None} \
+                - lookup.people_in_assignments:
+            result.new_people = True
+
+
+def ingest(stream, user=None, notify=False, batch_size=BATCH_SIZE):
+    """Загружает поручения из потока NDJSON-строк; возвращает IngestResult."""
+    lookup = Lookup(get_reference_data())
+    result = IngestResult()
+    batch = []
+    for line, record, error in iter_records(stream):
+        if error:
+            result.add(line, 'error', errors={'line': error})
+            continue
+        assignment, errors = build(record, lookup)
+        if errors:
+            result.add(line, 'error', errors=errors)
+            continue
+        batch.append((line, assignment))
+        if len(batch) >= batch_size:
+            upsert(batch, result, lookup)
+            batch = []
+    if batch:
+        upsert(batch, result, lookup)
+
+    if result.written:
+        # bulk_create не шлёт post_save: счётчик изменений и кэш справочников — вручную
+        touch(ASSIGNMENTS)
+        if result.new_people:
+            bump_version()
+
+    if notify:
+        from assignments import bulk
+        from assignments.models import SelectionSet
+
+        for ids, action in ((result.created, 'notify_new'), (result.deadline_changed, 'notify_deadline')):
+            if ids:
+                bulk.start(SelectionSet.from_ids(ids, user), action, user)
+    return result
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = 'Создаёт ключ доступа к API для внешней системы и выводит его (один раз)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', type=str, help='Название системы')
+        parser.add_argument('--write', action='store_true', help='Разрешить загрузку поручений')
+
+    def handle(self, *args, name, write, **options):
+        if ApiToken.objects.filter(name=name).exists():
+            raise CommandError(f'Ключ для «{name}» уже есть. Отключите его в админке и создайте с другим именем.')
+        token, key = ApiToken.issue(name, can_write=write)
+        self.stdout.write(self.style.SUCCESS(f'Ключ для «{token.name}»:'))
+        self.stdout.write(key)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apitoken',
+            name='can_write',
+            field=models.BooleanField(default=False, help_text='Разрешить загрузку поручений (api/v1/assignments/ingest/)', verbose_name='Загрузка поручений'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+import hashlib
+import secrets
+
+from django.db import models
+from django.utils import timezone
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiToken(models.Model):
+    """
+    Ключ доступа внешней системы к API (заголовок Authorization: Bearer <ключ>).
+    В базе хранится только хэш ключа; сам ключ показывается один раз при
+    создании (manage.py create_api_token).
+    """
+    name         = models.CharField(max_length=100, unique=True, verbose_name="Система")
+    key_hash     = models.CharField(max_length=64, unique=True, editable=False)
+    is_active    = models.BooleanField(default=True, verbose_name="Активен")
+    can_write    = models.BooleanField(default=False, verbose_name="Загрузка поручений",
+                                       help_text="Разрешить загрузку поручений (api/v1/assignments/ingest/)")
+    created_at   = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True, verbose_name="Последнее обращение")
+
+    class Meta:
+        verbose_name = "Ключ API"
+        verbose_name_plural = "Ключи API"
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def issue(cls, name, can_write=False):
+        """Создаёт ключ; возвращает (token, ключ в открытом виде)."""
+        key = secrets.token_urlsafe(32)
+        return cls.objects.create(name=name, key_hash=hash_key(key), can_write=can_write), key
+
+    @classmethod
+    def authenticate(cls, key):
+        token = cls.objects.filter(key_hash=hash_key(key), is_active=True).first()
+        if token is not None:
+            now = timezone.now()
+            # Отметка об использовании — не чаще раза в минуту
+            if token.last_used_at is None or (now - token.last_used_at).total_seconds() > 60:
+                cls.objects.filter(pk=token.pk).update(last_used_at=now)
+        return token
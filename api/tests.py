@@ -0,0 +1,173 @@
+import json
+from datetime import date, timedelta
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from task_control.models import Assignment, AssignmentType, Employee
+
+from .models import ApiToken
+
+
+class AssignmentApiTests(TestCase):
+    def setUp(self):
+        _, key = ApiToken.issue('ERP')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {key}'}
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        atype = AssignmentType.objects.create(name='Приказ')
+        for n in range(5):
+            Assignment.objects.create(
+                assignment_type=atype, document_number=str(n + 1), description='Текст',
+                issue_date=date.today(), deadline=date.today() + timedelta(days=n % 2),
+                executor=executor, controller=executor,
+            )
+        self.url = reverse('api:list', args=['assignments'])
+
+    def test_requires_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_sparse_fields_and_keyset_pages(self):
+        numbers = []
+        params = {'fields': 'document_number', 'order': 'deadline', 'limit': 2}
+        url = self.url
+        while url:
+            data = self.client.get(url, params, **self.auth).json()
+            self.assertTrue(all(set(row) == {'document_number'} for row in data['results']))
+            numbers += [row['document_number'] for row in data['results']]
+            url, params = data['next'], None
+        # Сначала срок «сегодня» (нечётные номера), внутри срока — по id
+        self.assertEqual(numbers, ['1', '3', '5', '2', '4'])
+
+        response = self.client.get(self.url, {'fields': 'secret'}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_not_modified_until_data_changes(self):
+        response = self.client.get(self.url, **self.auth)
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 304)
+
+        Assignment.objects.filter(document_number='1').update(status='DONE')
+        response = self.client.get(self.url, {'status': 'DONE'}, **self.auth)
+        self.assertEqual([row['document_number'] for row in response.json()['results']], ['1'])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+
+class IngestTests(TestCase):
+    def setUp(self):
+        _, key = ApiToken.issue('DBF', can_write=True)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {key}'}
+        self.executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        self.controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        self.atype = AssignmentType.objects.create(name='Приказ')
+
+    def line(self, **fields):
+        record = {
+            'document_number': '10', 'assignment_type': self.atype.pk, 'executor': self.executor.pk,
+            'controller': self.controller.pk, 'issue_date': '2026-03-01', 'deadline': '2026-03-20',
+            'description': 'Текст',
+        }
+        record.update(fields)
+        return json.dumps(record, ensure_ascii=False)
+
+    def post(self, *lines, **params):
+        url = reverse('api:ingest')
+        if params:
+            url += '?' + urlencode(params)
+        return self.client.post(url, '\n'.join(lines), content_type='application/x-ndjson', **self.auth)
+
+    def test_upsert_by_document_and_executor(self):
+        data = self.post(
+            self.line(),
+            self.line(document_number='11', controller=self.executor.pk),   # не контролирующий
+            '{not json',
+        ).json()
+        self.assertEqual(data['summary'], {'created': 1, 'error': 2})
+        created = data['results'][0]
+        self.assertEqual(created['id'], Assignment.objects.get(document_number='10').pk)
+        self.assertIn('controller', data['results'][1]['errors'])
+
+        Assignment.objects.filter(pk=created['id']).update(status='IN_PROGRESS')
+        data = self.post(self.line(deadline='2026-04-01', description='Новый текст')).json()
+        self.assertEqual(data['results'][0], {'line': 1, 'status': 'updated', 'id': created['id']})
+        task = Assignment.objects.get()
+        self.assertEqual((task.deadline, task.description, task.status),
+                         (date(2026, 4, 1), 'Новый текст', 'IN_PROGRESS'))
+
+    def test_key_is_scoped_to_type_and_year(self):
+        from django.db import connection
+        from task_control.models import StatusTransition
+
+        self.post(self.line())
+        # Без RETURNING (MySQL) id после bulk_create не заполняются — они перечитываются по ключу
+        with patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            data = self.post(
+                self.line(issue_date='2027-01-15', deadline='2027-02-01'),
+                self.line(assignment_type=AssignmentType.objects.create(name='Распоряжение').pk),
+            ).json()
+        self.assertEqual(data['summary'], {'created': 2})
+        self.assertEqual(sorted(r['id'] for r in data['results']),
+                         list(Assignment.objects.filter(document_number='10').order_by('pk')[1:].values_list('pk', flat=True)))
+        # Переходы статуса пишутся в транзакции загрузки, а не после фиксации
+        self.assertEqual(StatusTransition.objects.count(), 3)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_notifications_are_queued(self):
+        from jobs.models import Job
+
+        with patch('telegram.notifications.process_new_assignments', return_value=1) as notify, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.post(self.line(), notify=1)
+        self.assertEqual(Job.objects.get().kind, 'assignments.bulk')
+        self.assertEqual(list(notify.call_args[0][0].values_list('document_number', flat=True)), ['10'])
+
+    def test_read_only_token_is_rejected(self):
+        _, key = ApiToken.issue('BI')
+        response = self.client.post(reverse('api:ingest'), self.line(), content_type='application/x-ndjson',
+                                    HTTP_AUTHORIZATION=f'Bearer {key}')
+        self.assertEqual(response.status_code, 403)
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        _, key = ApiToken.issue('BI')
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {key}'}
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        self.task = Assignment.objects.create(
+            assignment_type=AssignmentType.objects.create(name='Приказ'), document_number='1',
+            description='Текст', issue_date=date.today(), deadline=date.today(),
+            executor=executor, controller=executor,
+        )
+        # Фильтр перестаёт совпадать после UPDATE — изменение всё равно попадает в журнал
+        Assignment.objects.filter(status='NEW').update(status='OVERDUE')
+
+    def test_changes_since_seq(self):
+        url = reverse('api:changes')
+        data = self.client.get(url, {'since': 0, 'expand': 1, 'fields': 'status'}, **self.auth).json()
+        self.assertEqual([r['operation'] for r in data['results']], ['create', 'update'])
+        self.assertEqual(data['results'][1]['fields'], ['status', 'updated_at'])
+        self.assertEqual(data['results'][1]['assignment'], {'status': 'OVERDUE'})
+        since = data['since']
+
+        pk = self.task.pk
+        self.task.delete()
+        data = self.client.get(url, {'since': since, 'limit': 1}, **self.auth).json()
+        self.assertEqual([(r['id'], r['operation']) for r in data['results']], [(pk, 'delete')])
+        self.assertFalse(data['has_more'])
+        data = self.client.get(url, {'since': data['since']}, **self.auth).json()
+        self.assertEqual(data['results'], [])
+
+    def test_journal_is_written_with_the_change(self):
+        from django.db import transaction
+        from task_control.models import AssignmentChange
+
+        with transaction.atomic():
+            Assignment.objects.filter(pk=self.task.pk).update(description='Новый текст')
+            self.assertEqual(AssignmentChange.objects.count(), 3)
+            transaction.set_rollback(True)
+        self.assertEqual(AssignmentChange.objects.count(), 2)
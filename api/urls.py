@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('assignments/ingest/',       views.assignment_ingest, name='ingest'),
+    path('changes/',                  views.change_feed,       name='changes'),
+    path('<slug:resource>/',          views.resource_list,     name='list'),
+    path('<slug:resource>/<int:pk>/', views.resource_detail,   name='detail'),
+]
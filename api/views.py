@@ -0,0 +1,374 @@
+"""
+API только для чтения, версия 1 (/api/v1/).
+
+Доступ — по ключу внешней системы (Authorization: Bearer <ключ>, см.
+api.models.ApiToken) или из сессии сотрудника (is_staff).
+
+Общие параметры списков:
+    fields=id,deadline,...   — только эти поля (из базы читаются только они);
+    limit=N                  — размер страницы, не больше MAX_PAGE_SIZE;
+    order=updated_at         — сортировка из resource.orderings, «-» — по убыванию;
+    cursor=...               — продолжение из поля next предыдущего ответа.
+
+Страницы — keyset по (поле сортировки, id): каждая страница — один запрос
+по индексу, без OFFSET. Ответ содержит ETag по счётчикам изменений
+(core.conditional): повторный опрос без изменений данных получает 304.
+Ответы сжимаются gzip, если клиент это поддерживает.
+
+GET changes/?since=<seq> — журнал изменений для инкрементальной синхронизации.
+POST assignments/ingest/ — загрузка поручений (api.ingest).
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from assignments.filters import filter_assignments, read_filters
+from core.conditional import ASSIGNMENTS, REFDATA, conditional_page
+from task_control.models import Assignment, AssignmentChange, AssignmentType, Department, Employee
+
+from .ingest import ingest
+from .models import ApiToken
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE     = 500
+
+
+class ApiError(Exception):
+    pass
+
+
+# ════════════════════════════════════════════════════════
+#  РЕСУРСЫ
+# ════════════════════════════════════════════════════════
+
+def _assignment_filters(qs, params):
+    qs = filter_assignments(qs, read_filters(params))
+    since = params.get('updated_since')
+    if since:
+        moment = parse_datetime(since)
+        if moment is None:
+            raise ApiError('updated_since: ожидается дата и время ISO 8601.')
+        qs = qs.filter(updated_at__gt=moment)
+    return qs
+
+
+def _employee_filters(qs, params):
+    dept = params.get('dept', '')
+    if dept.isdigit():
+        qs = qs.filter(department_id=int(dept))
+    active = params.get('active')
+    if active in ('0', '1'):
+        qs = qs.filter(is_active=active == '1')
+    q = params.get('q', '').strip()
+    if q:
+        qs = qs.filter(last_name__icontains=q)
+    return qs
+
+
+@dataclass(frozen=True)
+class Resource:
+    model:     type
+    fields:    dict                # публичное имя -> путь ORM для values()
+    orderings: tuple               # допустимые значения order (без «-»)
+    tables:    tuple               # счётчики изменений для ETag
+    defaults:  tuple = ()          # поля без fields=; пусто — все
+    filters:   Callable = field(default=lambda qs, params: qs)
+
+    def select(self, params):
+        requested = params.get('fields')
+        if not requested:
+            return list(self.defaults or self.fields)
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Неизвестные поля: {", ".join(unknown)}. Доступны: {", ".join(self.fields)}.')
+        return names
+
+
+RESOURCES = {
+    'assignments': Resource(
+        model=Assignment,
+        fields={
+            'id':                   'id',
+            'document_number':      'document_number',
+            'base_document_number': 'base_document_number',
+            'assignment_type':      'assignment_type_id',
+            'assignment_type_name': 'assignment_type__name',
+            'issue_date':           'issue_date',
+            'deadline':             'deadline',
+            'status':               'status',
+            'executor':             'executor_id',
+            'department':           'executor__department_id',
+            'controller':           'controller_id',
+            'approver':             'approver_id',
+            'description':          'description',
+            'created_at':           'created_at',
+            'updated_at':           'updated_at',
+        },
+        # Текст поручения — только по явному запросу
+        defaults=(
+            'id', 'document_number', 'base_document_number', 'assignment_type', 'assignment_type_name',
+            'issue_date', 'deadline', 'status', 'executor', 'department', 'controller', 'approver',
+            'created_at', 'updated_at',
+        ),
+        orderings=('id', 'deadline', 'updated_at'),
+        tables=(ASSIGNMENTS, REFDATA),
+        filters=_assignment_filters,
+    ),
+    'employees': Resource(
+        model=Employee,
+        fields={
+            'id':              'id',
+            'last_name':       'last_name',
+            'first_name':      'first_name',
+            'middle_name':     'middle_name',
+            'department':      'department_id',
+            'department_name': 'department__name',
+            'position':        'position_id',
+            'position_name':   'position__name',
+            'is_controller':   'is_controller',
+            'is_approver':     'is_approver',
+            'is_active':       'is_active',
+        },
+        orderings=('id', 'last_name'),
+        tables=(REFDATA,),
+        filters=_employee_filters,
+    ),
+    'departments': Resource(
+        model=Department,
+        fields={'id': 'id', 'name': 'name'},
+        orderings=('id', 'name'),
+        tables=(REFDATA,),
+    ),
+    'assignment-types': Resource(
+        model=AssignmentType,
+        fields={'id': 'id', 'name': 'name', 'color': 'color'},
+        orderings=('id', 'name'),
+        tables=(REFDATA,),
+    ),
+}
+
+
+# ════════════════════════════════════════════════════════
+#  КУРСОРЫ
+# ════════════════════════════════════════════════════════
+
+def encode_cursor(value, pk):
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([value, pk], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return value, int(pk)
+    except (ValueError, TypeError):
+        raise ApiError('Некорректный cursor.')
+
+
+def _order(resource, params):
+    order = params.get('order', 'id')
+    name = order.lstrip('-')
+    if name not in resource.orderings:
+        raise ApiError(f'order: допустимо {", ".join(resource.orderings)} (с «-» — по убыванию).')
+    return resource.fields[name], order.startswith('-')
+
+
+def _after(path, descending, cursor):
+    """Условие keyset «строго после курсора» в порядке (path, id)."""
+    value, pk = decode_cursor(cursor)
+    cmp = 'lt' if descending else 'gt'
+    if path == 'id':
+        return Q(**{f'id__{cmp}': pk})
+    return Q(**{f'{path}__{cmp}': value}) | Q(**{path: value, f'id__{cmp}': pk})
+
+
+def _page_size(params):
+    value = params.get('limit', '')
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    if not value.isdigit() or int(value) < 1:
+        raise ApiError('limit: ожидается положительное число.')
+    return min(int(value), MAX_PAGE_SIZE)
+
+
+# ════════════════════════════════════════════════════════
+#  ОБРАБОТКА ЗАПРОСА
+# ════════════════════════════════════════════════════════
+
+def _token(request):
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return ApiToken.authenticate(header[7:].strip())
+    return None
+
+
+def _authenticate(request):
+    if request.headers.get('Authorization', '').startswith('Bearer '):
+        return _token(request) is not None
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def api_view(view_func):
+    """Доступ по ключу или сессии сотрудника, gzip, ошибки в JSON."""
+    @gzip_page
+    @require_GET
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _authenticate(request):
+            return JsonResponse({'error': 'Требуется ключ API или вход сотрудника.'}, status=401)
+        try:
+            response = view_func(request, *args, **kwargs)
+        except (ApiError, ValidationError) as exc:
+            message = exc.messages[0] if isinstance(exc, ValidationError) else str(exc)
+            return JsonResponse({'error': message}, status=400)
+        except Http404:
+            return JsonResponse({'error': 'Не найдено.'}, status=404)
+        response['Vary'] = 'Authorization, Cookie, Accept-Encoding'
+        return response
+    return wrapper
+
+
+def api_endpoint(view_func):
+    """
+    api_view с ETag по счётчикам ресурса. Ресурс определяется именованным
+    аргументом resource из URL.
+    """
+    conditioned = {
+        name: conditional_page(*resource.tables)(view_func) for name, resource in RESOURCES.items()
+    }
+
+    @api_view
+    @wraps(view_func)
+    def wrapper(request, resource, **kwargs):
+        if resource not in RESOURCES:
+            raise Http404
+        return conditioned[resource](request, resource=resource, **kwargs)
+    return wrapper
+
+
+def _rows(values, names, resource):
+    return [{name: row[resource.fields[name]] for name in names} for row in values]
+
+
+@api_endpoint
+def resource_list(request, resource):
+    resource = RESOURCES[resource]
+    params = request.GET
+    names = resource.select(params)
+    path, descending = _order(resource, params)
+    limit = _page_size(params)
+
+    qs = resource.filters(resource.model.objects.all(), params)
+    if params.get('cursor'):
+        qs = qs.filter(_after(path, descending, params['cursor']))
+    prefix = '-' if descending else ''
+    qs = qs.order_by(f'{prefix}{path}', f'{prefix}id') if path != 'id' else qs.order_by(f'{prefix}id')
+
+    # Только запрошенные колонки плюс ключ курсора
+    columns = {resource.fields[name] for name in names} | {path, 'id'}
+    rows = list(qs.values(*columns)[:limit + 1])
+
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        query = params.copy()
+        query['cursor'] = encode_cursor(rows[-1][path], rows[-1]['id'])
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+
+    return JsonResponse({'results': _rows(rows, names, resource), 'next': next_url},
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_endpoint
+def resource_detail(request, resource, pk):
+    resource = RESOURCES[resource]
+    names = resource.select(request.GET)
+    row = resource.model.objects.filter(pk=pk).values(*{resource.fields[name] for name in names}).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(_rows([row], names, resource)[0], json_dumps_params={'ensure_ascii': False})
+
+
+# ════════════════════════════════════════════════════════
+#  ЖУРНАЛ ИЗМЕНЕНИЙ
+# ════════════════════════════════════════════════════════
+
+@api_view
+def change_feed(request):
+    """
+    Изменения поручений после номера since (task_control.AssignmentChange),
+    по возрастанию seq. Потребитель хранит since из ответа и передаёт его
+    в следующий запрос; has_more — есть следующая страница. Записи журнала
+    фиксируются строго по возрастанию seq (AssignmentChange.record), поэтому
+    запись с меньшим seq не появится после выданного since.
+    expand=1 — к записям добавляются текущие данные поручений (поля как
+    в assignments, fields= тоже работает; у удалённых — null).
+    """
+    params = request.GET
+    since = params.get('since', '0')
+    if not since.isdigit():
+        raise ApiError('since: ожидается номер изменения (seq).')
+    since = int(since)
+    limit = _page_size(params)
+
+    rows = list(
+        AssignmentChange.objects.filter(pk__gt=since).order_by('pk')
+        .values_list('pk', 'assignment_id', 'operation', 'fields', 'changed_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = [
+        {'seq': seq, 'id': pk, 'operation': operation, 'fields': fields, 'changed_at': changed_at}
+        for seq, pk, operation, fields, changed_at in rows
+    ]
+
+    if params.get('expand') == '1' and results:
+        resource = RESOURCES['assignments']
+        names = resource.select(params)
+        current = {
+            row['id']: row for row in Assignment.objects.filter(pk__in={r['id'] for r in results})
+            .values(*({resource.fields[name] for name in names} | {'id'}))
+        }
+        for result in results:
+            row = current.get(result['id'])
+            result['assignment'] = _rows([row], names, resource)[0] if row else None
+
+    return JsonResponse(
+        {'results': results, 'since': rows[-1][0] if rows else since, 'has_more': has_more},
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+# ════════════════════════════════════════════════════════
+#  ЗАГРУЗКА
+# ════════════════════════════════════════════════════════
+
+@csrf_exempt
+@gzip_page
+@require_POST
+def assignment_ingest(request):
+    """
+    Создание и обновление поручений из NDJSON (см. api.ingest). Только по
+    ключу с правом загрузки. ?notify=1 — поставить уведомления в очередь.
+    """
+    token = _token(request)
+    if token is None:
+        return JsonResponse({'error': 'Требуется ключ API.'}, status=401)
+    if not token.can_write:
+        return JsonResponse({'error': 'Ключу не разрешена загрузка поручений.'}, status=403)
+
+    result = ingest(request, notify=request.GET.get('notify') == '1')
+    return JsonResponse(result.as_json(), json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,115 @@
+"""
+Массовые действия порциями.
+
+Выборка (SelectionSet) обходится кусками по CHUNK_SIZE поручений: для
+выборки по фильтру — keyset-страницами по id (фильтр пересчитывается на
+каждой порции, курсор между транзакциями не держится), для отмеченных
+id — прямо из битовой карты. Каждая порция обрабатывается в своей
+транзакции, после неё в BulkOperation записывается прогресс.
+
+Небольшие выборки (до INLINE_LIMIT) выполняются сразу в запросе, большие —
+фоновой задачей assignments.bulk (jobs, воркер manage.py runjobs).
+"""
+import logging
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from task_control.models import Assignment
+
+from .models import BulkOperation
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE   = 500
+INLINE_LIMIT = CHUNK_SIZE
+
+STATUS_ACTIONS = {
+    'status_done':     'DONE',
+    'status_progress': 'IN_PROGRESS',
+}
+NOTIFY_ACTIONS = ('notify_new', 'notify_remind', 'notify_deadline')
+ACTIONS = tuple(STATUS_ACTIONS) + NOTIFY_ACTIONS
+
+ACTION_LABELS = {
+    'status_done':     'Отметить исполненными',
+    'status_progress': 'Перевести в работу',
+    'notify_new':      'Уведомления о новых поручениях',
+    'notify_remind':   'Напоминания о сроках',
+    'notify_deadline': 'Уведомления об изменении сроков',
+}
+
+
+def iter_chunks(selection, size=CHUNK_SIZE):
+    """Списки id выборки по size штук."""
+    if selection.kind == selection.Kind.IDS:
+        ids = selection.ids()
+        while chunk := list(islice(ids, size)):
+            yield chunk
+        return
+
+    qs = selection.queryset().order_by('id')
+    last_id = 0
+    while chunk := list(qs.filter(id__gt=last_id).values_list('id', flat=True)[:size]):
+        yield chunk
+        last_id = chunk[-1]
+
+
+def apply_chunk(action, ids):
+    """Выполняет действие над порцией; возвращает число изменённых / отправленных."""
+    qs = Assignment.objects.filter(id__in=ids)
+    if action in STATUS_ACTIONS:
+        return qs.update(status=STATUS_ACTIONS[action], updated_at=timezone.now())
+
+    from telegram import notifications
+    handler = {
+        'notify_new':      notifications.process_new_assignments,
+        'notify_remind':   notifications.process_reminders,
+        'notify_deadline': notifications.process_deadline_change,
+    }[action]
+    return handler(qs.select_related('executor', 'controller', 'approver', 'assignment_type'))
+
+
+def run(operation, progress=None):
+    """
+    Выполняет операцию порциями. progress(processed, total) вызывается после
+    каждой порции; если он возвращает False, выполнение прекращается.
+    """
+    BulkOperation.objects.filter(pk=operation.pk).update(status=BulkOperation.Status.RUNNING)
+    try:
+        for chunk in iter_chunks(operation.selection):
+            with transaction.atomic():
+                affected = apply_chunk(operation.action, chunk)
+            BulkOperation.objects.filter(pk=operation.pk).update(
+                processed=F('processed') + len(chunk), affected=F('affected') + (affected or 0),
+            )
+            if progress is not None:
+                operation.refresh_from_db(fields=['processed'])
+                if progress(operation.processed, operation.total) is False:
+                    break
+    except Exception as exc:
+        logger.exception('Bulk operation %s failed', operation.pk)
+        BulkOperation.objects.filter(pk=operation.pk).update(
+            status=BulkOperation.Status.FAILED, error=str(exc), finished_at=timezone.now(),
+        )
+        raise
+    BulkOperation.objects.filter(pk=operation.pk).update(
+        status=BulkOperation.Status.DONE, finished_at=timezone.now(),
+    )
+    operation.refresh_from_db()
+    return operation
+
+
+def start(selection, action, user=None):
+    """Создаёт операцию и ставит её в очередь фоновых задач."""
+    from jobs.runner import enqueue
+
+    operation = BulkOperation.objects.create(
+        selection=selection, action=action, total=selection.count,
+        created_by=user if getattr(user, 'is_authenticated', False) else None,
+    )
+    enqueue('assignments.bulk', {'operation': operation.pk}, user=user,
+            title=f'{ACTION_LABELS[action]}: {selection.count} поручений')
+    return operation
@@ -0,0 +1,148 @@
+"""
+Потоковая выгрузка поручений в CSV и XLSX.
+
+Строки читаются из базы порциями (QuerySet.iterator) через values_list,
+без создания моделей, и сразу уходят в ответ, поэтому память не зависит
+от размера выборки.
+
+CSV отдаётся по мере чтения из базы. XLSX — zip-архив, который нельзя
+дописывать по частям, поэтому книга openpyxl в режиме write_only пишется
+во временный файл (строки на диск, не в память), а затем файл отдаётся
+кусками.
+"""
+import csv
+import tempfile
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from task_control.models import Assignment
+
+CHUNK_SIZE = 2000
+FILE_CHUNK = 64 * 1024
+
+# Больше строк — выгрузка массовым действием готовится фоновой задачей
+# (assignments.tasks.export_assignments) и скачивается со страницы задач
+BACKGROUND_ROWS = 20000
+
+FIELDS = (
+    'assignment_type__name', 'document_number', 'base_document_number',
+    'issue_date', 'deadline', 'status',
+    'executor__last_name', 'executor__first_name', 'executor__middle_name',
+    'executor__department__name', 'executor__position__name',
+    'controller__last_name', 'controller__first_name', 'controller__middle_name',
+    'approver__last_name', 'approver__first_name', 'approver__middle_name',
+    'description',
+)
+
+HEADERS = (
+    'Вид документа', 'Номер', 'Основание', 'Дата издания', 'Срок исполнения',
+    'Статус', 'Исполнитель', 'Подразделение', 'Должность',
+    'Контролирующий', 'Визирующий', 'Текст поручения',
+)
+DATE_COLUMNS = (3, 4)
+
+CONTENT_TYPES = {
+    'csv':  'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _short(last, first, middle):
+    """Фамилия И.О."""
+    if not last:
+        return ''
+    initials = f'{first[:1]}.' if first else ''
+    if middle:
+        initials += f'{middle[:1]}.'
+    return f'{last} {initials}'.strip()
+
+
+def iter_rows(qs):
+    """Строки выгрузки в порядке сортировки queryset'а."""
+    statuses = {value: str(label) for value, label in Assignment.Status.choices}
+    for (atype, number, base, issued, deadline, status,
+         e_last, e_first, e_middle, dept, pos,
+         c_last, c_first, c_middle,
+         a_last, a_first, a_middle, text) in qs.values_list(*FIELDS).iterator(chunk_size=CHUNK_SIZE):
+        yield (
+            atype, number, base or '', issued, deadline,
+            statuses.get(status, status),
+            _short(e_last, e_first, e_middle), dept or '', pos or '',
+            _short(c_last, c_first, c_middle),
+            _short(a_last, a_first, a_middle),
+            text,
+        )
+
+
+# ════════════════════════════════════════════════════════
+#  CSV
+# ════════════════════════════════════════════════════════
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    # BOM и «;» — чтобы Excel с русской локалью открыл файл без мастера импорта
+    writer = csv.writer(_Echo(), delimiter=';')
+    yield '\ufeff' + writer.writerow(HEADERS)
+    for row in rows:
+        row = list(row)
+        for i in DATE_COLUMNS:
+            row[i] = row[i].strftime('%d.%m.%Y') if row[i] else ''
+        yield writer.writerow(row)
+
+
+# ════════════════════════════════════════════════════════
+#  XLSX
+# ════════════════════════════════════════════════════════
+
+def stream_xlsx(rows, title='Поручения'):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title[:31])
+    for width, col in zip((14, 14, 14, 12, 12, 12, 22, 28, 24, 22, 22, 80), 'ABCDEFGHIJKL'):
+        ws.column_dimensions[col].width = width
+    ws.append(HEADERS)
+
+    for row in rows:
+        row = list(row)
+        for i in DATE_COLUMNS:
+            if row[i]:
+                cell = WriteOnlyCell(ws, value=row[i])
+                cell.number_format = 'DD.MM.YYYY'
+                row[i] = cell
+        ws.append(row)
+
+    tmp = tempfile.TemporaryFile()
+    wb.save(tmp)
+    tmp.seek(0)
+    try:
+        while chunk := tmp.read(FILE_CHUNK):
+            yield chunk
+    finally:
+        tmp.close()
+
+
+# ════════════════════════════════════════════════════════
+#  ОТВЕТ
+# ════════════════════════════════════════════════════════
+
+def export_response(qs, fmt, basename, title='Поручения'):
+    """StreamingHttpResponse с выгрузкой qs в формате fmt ('csv' или 'xlsx')."""
+    if fmt not in CONTENT_TYPES:
+        fmt = 'xlsx'
+    rows = iter_rows(qs)
+    content = stream_csv(rows) if fmt == 'csv' else stream_xlsx(rows, title)
+
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    filename = f'{basename}_{timezone.localdate():%Y-%m-%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,76 @@
+"""
+Фильтры списка поручений.
+
+Один разбор GET-параметров для страницы списка и выгрузок, чтобы
+экспорт всегда содержал ровно те строки, что пользователь видит в таблице.
+"""
+from datetime import date as dt_date
+
+from django.db.models import F, Q
+
+FILTER_PARAMS = (
+    'q', 'status', 'dept', 'position', 'executor', 'controller',
+    'approver', 'atype', 'date_from', 'date_to',
+)
+
+ALLOWED_SORTS = {
+    'deadline':        'deadline',
+    '-deadline':       '-deadline',
+    'executor':        'executor__last_name',
+    '-executor':       '-executor__last_name',
+    'status':          'status',
+    '-status':         '-status',
+    'created_at':      'created_at',
+    '-created_at':     '-created_at',
+    'document_number': 'document_number',
+    '-document_number':'-document_number',
+    'risk':            F('risk_score').asc(nulls_last=True),
+    '-risk':           F('risk_score').desc(nulls_last=True),
+}
+
+
+def read_filters(params):
+    """Значения фильтров из request.GET (или словаря) — всегда строки."""
+    filters = {name: params.get(name, '') for name in FILTER_PARAMS}
+    filters['q'] = filters['q'].strip()
+    filters['sort'] = params.get('sort', '-created_at')
+    return filters
+
+
+def filter_assignments(qs, filters):
+    """Применяет фильтры списка поручений к queryset'у и сортирует его."""
+    q = filters.get('q', '')
+    status = filters.get('status', '')
+
+    if q:
+        qs = qs.filter(
+            Q(document_number__icontains=q) |
+            Q(description__icontains=q)     |
+            Q(executor__last_name__icontains=q)
+        )
+    if status == 'active':
+        qs = qs.filter(status__in=['NEW', 'IN_PROGRESS'])
+    elif status:
+        qs = qs.filter(status=status)
+
+    for param, lookup in (
+        ('dept',       'executor__department_id'),
+        ('position',   'executor__position_id'),
+        ('executor',   'executor_id'),
+        ('controller', 'controller_id'),
+        ('approver',   'approver_id'),
+        ('atype',      'assignment_type_id'),
+    ):
+        value = filters.get(param, '')
+        if value.isdigit():
+            qs = qs.filter(**{lookup: int(value)})
+
+    for param, lookup in (('date_from', 'deadline__gte'), ('date_to', 'deadline__lte')):
+        value = filters.get(param, '')
+        if value:
+            try:
+                qs = qs.filter(**{lookup: dt_date.fromisoformat(value)})
+            except ValueError:
+                pass
+
+    return qs.order_by(ALLOWED_SORTS.get(filters.get('sort'), '-created_at'))
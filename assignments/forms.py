@@ -1,5 +1,9 @@
 from django import forms
-from task_control.models import Assignment, Employee, AssignmentType, Department
+from django.db import transaction
+from task_control.models import (
+    Assignment, Employee, AssignmentType, Department, DocumentNumberCounter, StatusTransition,
+)
+from .widgets import EmployeeAutocompleteSelect, EmployeeAutocompleteSelectMultiple
 
 
 class AssignmentForm(forms.ModelForm):
@@ -18,49 +22,28 @@ class AssignmentForm(forms.ModelForm):
             'issue_date':       forms.DateInput(attrs={'class': 'date-input', 'type': 'date'}),
             'description':      forms.Textarea(attrs={'class': 'form-control', 'rows': 5, 'placeholder': 'Текст поручения…'}),
             'deadline':         forms.DateInput(attrs={'class': 'date-input', 'type': 'date'}),
-            'executor':         forms.Select(attrs={'class': 'form-control'}),
-            'controller':       forms.Select(attrs={'class': 'form-control'}),
-            'approver':         forms.Select(attrs={'class': 'form-control'}),
+            'executor':         EmployeeAutocompleteSelect(),
+            'controller':       EmployeeAutocompleteSelect(role='controller'),
+            'approver':         EmployeeAutocompleteSelect(role='approver'),
             'status':           forms.Select(attrs={'class': 'form-control'}),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        active = Employee.objects.filter(is_active=True).select_related(
-            'department', 'position'
-        ).order_by('department__name', 'last_name')
-
-        # Группировка по цеху для исполнителя
-        dept_choices = [('', '— Выберите исполнителя —')]
-        current_dept = None
-        dept_group = []
-        for emp in active:
-            dept_name = emp.department.name if emp.department else 'Без подразделения'
-            if dept_name != current_dept:
-                if current_dept is not None:
-                    dept_choices.append((current_dept, dept_group))
-                current_dept = dept_name
-                dept_group = []
-            dept_group.append((emp.id, str(emp)))
-        if dept_group:
-            dept_choices.append((current_dept, dept_group))
-
-        self.fields['executor'].choices = dept_choices
+        # Варианты сотрудников подгружаются виджетами через автодополнение
         self.fields['executor'].required = True
-
-        # Контролёр и визирующий — необязательные, с пустым вариантом
-        people_choices = [('', '— Не назначен —')] + [
-            (e.id, str(e)) for e in active
-        ]
-        self.fields['controller'].choices = people_choices
         self.fields['controller'].required = False
-        self.fields['approver'].choices = people_choices
         self.fields['approver'].required = False
 
         self.fields['assignment_type'].empty_label = '— Выберите вид —'
         self.fields['assignment_type'].queryset = AssignmentType.objects.order_by('name')
 
 
+def reserved_numbers_key(type_id, year):
+    """Ключ сессии с блоком номеров, зарезервированных при DOCUMENT_NUMBER_BLOCK > 1."""
+    return f'document_numbers:{type_id}:{year}'
+
+
 class AssignmentCreateForm(forms.Form):
     """
     Форма создания поручений с множественным выбором исполнителей.
@@ -77,6 +60,8 @@ class AssignmentCreateForm(forms.Form):
         widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Например: 26-2-2-1'}),
         label='Номер документа',
     )
+    # Номер подставлен кнопкой «Авто» и не менялся — выдаётся счётчиком при сохранении
+    number_suggested = forms.BooleanField(required=False, widget=forms.HiddenInput)
     issue_date = forms.DateField(
         widget=forms.DateInput(attrs={'class': 'date-input', 'type': 'date'}),
         label='Дата издания',
@@ -90,23 +75,23 @@ class AssignmentCreateForm(forms.Form):
         label='Срок исполнения',
     )
     executors = forms.ModelMultipleChoiceField(
-        queryset=Employee.objects.filter(is_active=True).select_related('department').order_by('department__name', 'last_name'),
-        widget=forms.CheckboxSelectMultiple,
+        queryset=Employee.objects.filter(is_active=True),
+        widget=EmployeeAutocompleteSelectMultiple(),
         label='Исполнители',
         error_messages={'required': 'Выберите хотя бы одного исполнителя.'},
     )
     controller = forms.ModelChoiceField(
-        queryset=Employee.objects.filter(is_active=True).order_by('last_name'),
+        queryset=Employee.objects.filter(is_active=True, is_controller=True),
         empty_label='— Не назначен —',
         required=False,
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=EmployeeAutocompleteSelect(role='controller'),
         label='Контролирующий',
     )
     approver = forms.ModelChoiceField(
-        queryset=Employee.objects.filter(is_active=True).order_by('last_name'),
+        queryset=Employee.objects.filter(is_active=True, is_approver=True),
         empty_label='— Не назначен —',
         required=False,
-        widget=forms.Select(attrs={'class': 'form-control'}),
+        widget=EmployeeAutocompleteSelect(role='approver'),
         label='Визирующий',
     )
     send_notifications = forms.BooleanField(
@@ -115,6 +100,62 @@ class AssignmentCreateForm(forms.Form):
         label='Отправить уведомления после создания',
     )
 
+    def clean(self):
+        cleaned = super().clean()
+        number, executors = cleaned.get('document_number'), cleaned.get('executors')
+        atype, issue_date = cleaned.get('assignment_type'), cleaned.get('issue_date')
+        # Подсказанный номер проверять незачем: при сохранении выдаётся свободный
+        if number and executors and atype and issue_date and not cleaned.get('number_suggested'):
+            # Номер документа уникален у исполнителя в пределах вида и года
+            taken = Employee.objects.filter(
+                pk__in=[e.pk for e in executors],
+                assignments_to_execute__assignment_type=atype,
+                assignments_to_execute__issue_year=issue_date.year,
+                assignments_to_execute__document_number=number,
+            ).distinct()
+            if taken:
+                self.add_error('executors', 'Поручение с этим номером уже есть у: '
+                               + ', '.join(str(e) for e in taken))
+        return cleaned
+
+    def allocate_number(self, session=None):
+        """
+        Выдаёт подсказанный номер: из блока, зарезервированного в сессии, или
+        счётчиком. Если подсказку тем временем занял другой пользователь,
+        allocate() вернёт следующий номер.
+        """
+        data = self.cleaned_data
+        type_id, year = data['assignment_type'].pk, data['issue_date'].year
+        key = reserved_numbers_key(type_id, year)
+        reserved = list(session.get(key) or []) if session is not None else []
+        if data['document_number'] in reserved:
+            reserved.remove(data['document_number'])
+            session[key] = reserved
+            return data['document_number']
+        return DocumentNumberCounter.allocate(type_id, year)[0]
+
+    def save(self, session=None):
+        """Создаёт по поручению на каждого исполнителя; возвращает их список."""
+        data = self.cleaned_data
+        with transaction.atomic():
+            number = self.allocate_number(session) if data.get('number_suggested') else data['document_number']
+            # Переходы статусов созданных поручений — одной вставкой
+            with StatusTransition.buffer():
+                return [
+                    Assignment.objects.create(
+                        assignment_type = data['assignment_type'],
+                        document_number = number,
+                        issue_date      = data['issue_date'],
+                        description     = data['description'],
+                        deadline        = data['deadline'],
+                        executor        = executor,
+                        controller      = data.get('controller'),
+                        approver        = data.get('approver'),
+                        status          = 'NEW',
+                    )
+                    for executor in data['executors']
+                ]
+
 
 class StatusChangeForm(forms.Form):
     status = forms.ChoiceField(
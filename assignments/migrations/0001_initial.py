@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SelectionSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True, verbose_name='Токен')),
+                ('kind', models.CharField(choices=[('filter', 'По фильтру'), ('ids', 'Отмеченные')], max_length=10, verbose_name='Тип')),
+                ('filters', models.JSONField(blank=True, default=dict, verbose_name='Фильтр')),
+                ('ids_bitmap', models.BinaryField(blank=True, default=b'', verbose_name='Битовая карта id')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Создал')),
+            ],
+            options={
+                'verbose_name': 'Выборка поручений',
+                'verbose_name_plural': 'Выборки поручений',
+            },
+        ),
+    ]
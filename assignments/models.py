@@ -1,3 +1,190 @@
+import secrets
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.http import Http404
+from django.utils import timezone
+
+# Сколько живёт выборка для массовых действий и печати
+SELECTION_TTL = timedelta(hours=12)
+
+# Больше диапазонов — фильтр по списку id (глубина выражения в SQLite ограничена)
+MAX_RANGES = 300
+
+
+def encode_ids(ids):
+    """Битовая карта id (бит N = поручение N), сжатая zlib."""
+    ids = sorted(set(ids))
+    if not ids:
+        return b''
+    bitmap = bytearray(ids[-1] // 8 + 1)
+    for pk in ids:
+        bitmap[pk >> 3] |= 1 << (pk & 7)
+    return zlib.compress(bytes(bitmap))
+
+
+def decode_ids(blob):
+    """id из битовой карты по возрастанию."""
+    if not blob:
+        return
+    for index, byte in enumerate(zlib.decompress(bytes(blob))):
+        if byte:
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield (index << 3) | bit
+
+
+def id_ranges(ids):
+    """Склеивает отсортированные id в отрезки [start, end]."""
+    start = end = None
+    for pk in ids:
+        if start is None:
+            start = end = pk
+        elif pk == end + 1:
+            end = pk
+        else:
+            yield start, end
+            start = end = pk
+    if start is not None:
+        yield start, end
+
+
+class SelectionSetQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+
+class SelectionSet(models.Model):
+    """
+    Сохранённая выборка поручений под коротким токеном.
+
+    Хранит либо фильтр списка (kind=FILTER — «все по фильтру», без
+    перечисления id), либо битовую карту отмеченных id (kind=IDS).
+    Массовые действия, печать и выгрузка получают токен вместо списка id.
+    """
+
+    class Kind(models.TextChoices):
+        FILTER = 'filter', 'По фильтру'
+        IDS    = 'ids',    'Отмеченные'
+
+    token      = models.CharField(max_length=32, unique=True, verbose_name="Токен")
+    kind       = models.CharField(max_length=10, choices=Kind.choices, verbose_name="Тип")
+    filters    = models.JSONField(default=dict, blank=True, verbose_name="Фильтр")
+    ids_bitmap = models.BinaryField(blank=True, default=b'', verbose_name="Битовая карта id")
+    count      = models.PositiveIntegerField(default=0, verbose_name="Количество")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                   null=True, blank=True, verbose_name="Создал")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+
+    objects = SelectionSetQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Выборка поручений"
+        verbose_name_plural = "Выборки поручений"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.count} ({self.token})"
+
+    # ── Создание ────────────────────────────────────────────
+    @classmethod
+    def _create(cls, user, **fields):
+        now = timezone.now()
+        # Попутно убираем просроченные выборки
+        cls.objects.filter(expires_at__lte=now).delete()
+        return cls.objects.create(
+            token=secrets.token_urlsafe(12),
+            created_by=user if getattr(user, 'is_authenticated', False) else None,
+            expires_at=now + SELECTION_TTL,
+            **fields,
+        )
+
+    @classmethod
+    def from_ids(cls, ids, user=None):
+        ids = [int(pk) for pk in ids]
+        return cls._create(user, kind=cls.Kind.IDS, ids_bitmap=encode_ids(ids), count=len(set(ids)))
+
+    @classmethod
+    def from_queryset(cls, queryset, user=None):
+        return cls.from_ids(queryset.values_list('id', flat=True).iterator(), user)
+
+    @classmethod
+    def from_filters(cls, filters, user=None):
+        from .filters import filter_assignments
+        from task_control.models import Assignment
+
+        count = filter_assignments(Assignment.objects.all(), filters).count()
+        return cls._create(user, kind=cls.Kind.FILTER, filters=filters, count=count)
+
+    @classmethod
+    def get_or_404(cls, token):
+        try:
+            return cls.objects.active().get(token=token)
+        except cls.DoesNotExist:
+            raise Http404("Выборка не найдена или устарела.")
+
+    # ── Чтение ──────────────────────────────────────────────
+    def ids(self):
+        return decode_ids(self.ids_bitmap)
+
+    def queryset(self):
+        """Поручения выборки (queryset, без загрузки id в память при kind=FILTER)."""
+        from .filters import filter_assignments
+        from task_control.models import Assignment
+
+        qs = Assignment.objects.all()
+        if self.kind == self.Kind.FILTER:
+            return filter_assignments(qs, self.filters)
+
+        ranges = list(id_ranges(self.ids()))
+        if not ranges:
+            return qs.none()
+        if len(ranges) > MAX_RANGES:
+            qs = qs.filter(id__in=list(self.ids()))
+        else:
+            condition = Q()
+            for start, end in ranges:
+                condition |= Q(id=start) if start == end else Q(id__range=(start, end))
+            qs = qs.filter(condition)
+        return qs.order_by('-created_at')
+
+
+class BulkOperation(models.Model):
+    """
+    Массовое действие над выборкой, выполняемое порциями вне запроса
+    (assignments.bulk). Ход выполнения читает страница списка.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'В очереди'
+        RUNNING = 'RUNNING', 'Выполняется'
+        DONE    = 'DONE',    'Завершено'
+        FAILED  = 'FAILED',  'Ошибка'
+
+    selection   = models.ForeignKey(SelectionSet, on_delete=models.SET_NULL, null=True, blank=True,
+                                    verbose_name="Выборка")
+    action      = models.CharField(max_length=30, verbose_name="Действие")
+    status      = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING,
+                                   verbose_name="Состояние")
+    total       = models.PositiveIntegerField(default=0, verbose_name="Всего")
+    processed   = models.PositiveIntegerField(default=0, verbose_name="Обработано")
+    affected    = models.PositiveIntegerField(default=0, verbose_name="Изменено / отправлено")
+    error       = models.TextField(blank=True, verbose_name="Ошибка")
+    created_by  = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                    null=True, blank=True, verbose_name="Запустил")
+    created_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Массовая операция"
+        verbose_name_plural = "Массовые операции"
+
+    def __str__(self):
+        return f"{self.action}: {self.processed}/{self.total} ({self.get_status_display()})"
 
-# Create your models here.
+    @property
+    def percent(self):
+        return 100 if not self.total else min(100, round(self.processed * 100 / self.total))
@@ -0,0 +1,44 @@
+"""Фоновые задачи поручений (jobs.registry)."""
+from django.utils import timezone
+
+from core.replica import use_replica
+from jobs.registry import register
+
+from . import bulk
+from .export import iter_rows, stream_csv, stream_xlsx
+from .models import BulkOperation, SelectionSet
+
+
+@register('assignments.bulk', 'Массовое действие над поручениями', concurrency=2, priority=10)
+def bulk_action(ctx):
+    operation = BulkOperation.objects.select_related('selection').get(pk=ctx.params['operation'])
+    ctx.progress(0, operation.total, message=f'{operation.total} поручений')
+    bulk.run(operation, progress=lambda processed, total: ctx.progress(processed, total))
+    return {'processed': operation.processed, 'affected': operation.affected}
+
+
+@register('assignments.export', 'Выгрузка поручений', concurrency=2)
+def export_assignments(ctx):
+    selection = SelectionSet.objects.get(token=ctx.params['selection'])
+    fmt = ctx.params.get('format', 'xlsx')
+    ctx.progress(0, selection.count, message='Чтение поручений')
+
+    def counted(rows):
+        n = 0
+        for n, row in enumerate(rows, 1):
+            if n % 1000 == 0:
+                ctx.progress(n)
+            yield row
+        ctx.progress(n, force=True)
+
+    path = ctx.artifact(f'assignments_{timezone.localdate():%Y-%m-%d}.{fmt}')
+    rows = counted(iter_rows(selection.queryset()))
+    # Выборка только что записана — с основной базы, строки выгрузки — с реплики
+    with use_replica(), open(path, 'wb') as f:
+        if fmt == 'csv':
+            for line in stream_csv(rows):
+                f.write(line.encode('utf-8'))
+        else:
+            for chunk in stream_xlsx(rows):
+                f.write(chunk)
+    return {'rows': ctx.current}
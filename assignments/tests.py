@@ -70,3 +70,202 @@ class AssignmentBulkActionTests(TestCase):
             [self.assignment],
             transform=lambda obj: obj,
         )
+
+
+class StaffAssignmentTestCase(TestCase):
+    """Вход под сотрудником с правами staff и одно открытое поручение."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.client.force_login(user)
+
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван', middle_name='Иванович')
+        controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        Assignment.objects.create(
+            assignment_type=AssignmentType.objects.create(name='Распоряжение'),
+            document_number='1',
+            issue_date=date.today(),
+            deadline=date.today() + timedelta(days=3),
+            description='Тестовое поручение',
+            executor=executor,
+            controller=controller,
+        )
+
+
+class AssignmentExportTests(StaffAssignmentTestCase):
+    def test_csv_export_uses_list_filters(self):
+        response = self.client.get(reverse('assignments:export'), {'format': 'csv', 'q': 'Тестовое'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Иванов И.И.', lines[1])
+
+        response = self.client.get(reverse('assignments:export'), {'format': 'csv', 'q': 'нет такого'})
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 1)
+
+    def test_xlsx_export(self):
+        from io import BytesIO
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('assignments:export'), {'format': 'xlsx'})
+
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(ws.values)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1], '1')
+
+
+class AssignmentCreateFormTests(TestCase):
+    def test_controller_and_approver_limited_by_role(self):
+        from assignments.forms import AssignmentCreateForm
+
+        plain = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        form = AssignmentCreateForm()
+
+        self.assertEqual(list(form.fields['controller'].queryset), [controller])
+        self.assertFalse(form.fields['approver'].queryset.filter(pk=plain.pk).exists())
+        self.assertIn('data-employee-search="controller"', str(form['controller']))
+
+    def test_number_is_unique_per_type_and_year(self):
+        from assignments.forms import AssignmentCreateForm
+
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        atype = AssignmentType.objects.create(name='Приказ')
+        Assignment.objects.create(
+            assignment_type=atype, document_number='7', issue_date=date(2025, 5, 1), deadline=date(2025, 6, 1),
+            description='—', executor=executor, controller=executor,
+        )
+        data = {'assignment_type': atype.pk, 'document_number': '7', 'issue_date': '2026-01-10',
+                'deadline': '2026-02-01', 'description': '—', 'executors': [executor.pk]}
+
+        self.assertTrue(AssignmentCreateForm(data).is_valid())
+        form = AssignmentCreateForm(dict(data, issue_date='2025-12-01'))
+        self.assertFalse(form.is_valid())
+        self.assertIn('executors', form.errors)
+
+
+class DocumentNumberSuggestionTests(StaffAssignmentTestCase):
+    def create(self, number, suggested=True):
+        return self.client.post(reverse('assignments:create'), {
+            'assignment_type': self.atype.pk, 'document_number': number, 'number_suggested': suggested,
+            'issue_date': date.today(), 'deadline': date.today(), 'description': 'Тест',
+            'executors': [Employee.objects.get(last_name='Иванов').pk],
+            'controller': Employee.objects.get(last_name='Петров').pk,
+        })
+
+    def suggest(self):
+        return self.client.post(reverse('assignments:next_number'), {'type': self.atype.pk}).json()['number']
+
+    def setUp(self):
+        super().setUp()
+        self.atype = AssignmentType.objects.get()
+
+    def test_number_is_allocated_only_on_save(self):
+        from task_control.models import DocumentNumberCounter
+
+        # Подсказка номер не расходует
+        self.assertEqual(self.suggest(), '2')
+        self.assertEqual(self.suggest(), '2')
+
+        self.create('2')
+        self.assertTrue(Assignment.objects.filter(document_number='2').exists())
+        self.assertEqual(self.suggest(), '3')
+
+        # Подсказку занял другой пользователь — поручение получает следующий номер
+        DocumentNumberCounter.allocate(self.atype.pk, date.today().year)
+        self.create('3')
+        self.assertTrue(Assignment.objects.filter(document_number='4').exists())
+
+        # Номер, введённый вручную, сохраняется как есть
+        self.create('10', suggested=False)
+        self.assertEqual(self.suggest(), '11')
+
+
+class SelectionSetTests(StaffAssignmentTestCase):
+    def test_ids_bitmap_roundtrip(self):
+        from .models import SelectionSet
+
+        selection = SelectionSet.from_ids([5, 1, 2, 3, 700, 5])
+        self.assertEqual(selection.count, 5)
+        self.assertEqual(list(SelectionSet.objects.get(pk=selection.pk).ids()), [1, 2, 3, 5, 700])
+
+    def test_print_action_redirects_with_token(self):
+        pk = Assignment.objects.get().pk
+        response = self.client.post(reverse('assignments:bulk'), {'action': 'print', 'ids': [str(pk)]})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('?s=', response.url)
+        page = b''.join(self.client.get(response.url).streaming_content).decode()
+        self.assertEqual(page.count('Контрольный талон'), 1)
+
+    def test_select_all_matching_filter(self):
+        response = self.client.post(reverse('assignments:bulk'), {
+            'action': 'status_done', 'select_all': '1', 'filters': 'q=Тестовое',
+        })
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Assignment.objects.get().status, 'DONE')
+
+
+class BulkOperationTests(StaffAssignmentTestCase):
+    def test_filter_selection_is_processed_in_chunks(self):
+        from . import bulk
+        from .models import BulkOperation, SelectionSet
+
+        first = Assignment.objects.get()
+        for number in ('2', '3'):
+            first.pk = None
+            first.document_number = number
+            first.save()
+
+        selection = SelectionSet.from_filters({'status': 'active'})
+        self.assertEqual([len(chunk) for chunk in bulk.iter_chunks(selection, size=2)], [2, 1])
+
+        operation = bulk.run(BulkOperation.objects.create(
+            selection=selection, action='status_done', total=selection.count,
+        ))
+        self.assertEqual((operation.status, operation.processed, operation.affected), ('DONE', 3, 3))
+        self.assertFalse(Assignment.objects.exclude(status='DONE').exists())
+
+        response = self.client.get(reverse('assignments:bulk_progress', args=[operation.pk]))
+        self.assertEqual(response.json()['percent'], 100)
+
+
+class AsyncViewTests(TestCase):
+    """Список и карточка под ASGI: async-представления и ORM без синхронных обращений в цикле событий."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        self.assignment = Assignment.objects.create(
+            assignment_type=AssignmentType.objects.create(name='Приказ'),
+            document_number='77-к', issue_date=date.today(), deadline=date.today() + timedelta(days=3),
+            description='Тест', executor=executor, controller=executor,
+        )
+
+    async def test_list_and_detail(self):
+        detail = reverse('assignments:detail', args=[self.assignment.pk])
+        response = await self.async_client.get(detail)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/login/', response.url)
+
+        await self.async_client.aforce_login(self.user)
+        self.assertContains(await self.async_client.get(reverse('assignments:list')), '77-к')
+        self.assertContains(await self.async_client.get(detail), '77-к')
+
+        response = await self.async_client.post(detail, {'change_status': '1', 'status': 'IN_PROGRESS'})
+        self.assertEqual(response.status_code, 302)
+        await self.assignment.arefresh_from_db()
+        self.assertEqual(self.assignment.status, 'IN_PROGRESS')
+
+    @patch('telegram.notifications.process_new_assignments')
+    async def test_notification_runs_outside_event_loop(self, process):
+        await self.async_client.aforce_login(self.user)
+        await self.async_client.post(
+            reverse('assignments:detail', args=[self.assignment.pk]), {'send_notify': '1', 'notify_type': 'new'},
+        )
+        self.assertEqual([a.pk async for a in process.call_args.args[0]], [self.assignment.pk])
@@ -9,6 +9,8 @@ urlpatterns = [
     path('<int:pk>/',           views.assignment_detail,      name='detail'),
     path('<int:pk>/edit/',      views.assignment_edit,        name='edit'),
     path('<int:pk>/delete/',    views.assignment_delete,      name='delete'),
+    path('export/',             views.assignment_export,      name='export'),
     path('bulk/',               views.assignment_bulk_action, name='bulk'),
+    path('bulk/<int:pk>/progress/', views.bulk_operation_progress, name='bulk_progress'),
     path('api/next-number/',    views.next_document_number,   name='next_number'),
 ]
\ No newline at end of file
@@ -1,16 +1,35 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from urllib.parse import urlsplit, urlunsplit
+
+from django.http import JsonResponse, QueryDict
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.urls import reverse
+from django.conf import settings
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q
+from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_POST
-from datetime import timedelta, date as dt_date
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
 
+from core import asyncdb
+from core.conditional import ASSIGNMENTS, REFDATA, TELEGRAM, conditional_page
 from core.mixins import staff_required
-from task_control.models import Assignment, Employee, Department, AssignmentType
+from core.replica import replica_view
+from analytics.risk import THRESHOLD as RISK_THRESHOLD
+from core.refcache import get_reference_data
+from jobs.runner import enqueue
+from task_control.models import Assignment, DocumentNumberCounter
+
+from .export import BACKGROUND_ROWS, export_response
+from .filters import filter_assignments, read_filters
+from . import bulk
+from .models import BulkOperation, SelectionSet
 
 
 @staff_required
-def assignment_list(request):
+@conditional_page(ASSIGNMENTS, REFDATA)
+async def assignment_list(request):
     today = timezone.now().date()
 
     qs = Assignment.objects.select_related(
@@ -18,156 +37,147 @@ def assignment_list(request):
         'controller', 'approver', 'assignment_type'
     )
 
-    # ── Фильтры ─────────────────────────────────────────────
-    q       = request.GET.get('q', '').strip()
-    status  = request.GET.get('status', '')
-    dept_id = request.GET.get('dept', '')
-    exec_id = request.GET.get('executor', '')
-    ctrl_id = request.GET.get('controller', '')
-    appr_id = request.GET.get('approver', '')
-    type_id = request.GET.get('atype', '')
-    date_from = request.GET.get('date_from', '')
-    date_to   = request.GET.get('date_to', '')
-
-    if q:
-        qs = qs.filter(
-            Q(document_number__icontains=q) |
-            Q(description__icontains=q)     |
-            Q(executor__last_name__icontains=q)
-        )
-    if status == 'active':
-        qs = qs.filter(status__in=['NEW', 'IN_PROGRESS'])
-    elif status:
-        qs = qs.filter(status=status)
-    if dept_id.isdigit():
-        qs = qs.filter(executor__department_id=int(dept_id))
-
-    position_id = request.GET.get('position', '')
-    if position_id.isdigit():
-        qs = qs.filter(executor__position_id=int(position_id))
-    if exec_id.isdigit():
-        qs = qs.filter(executor_id=int(exec_id))
-    if ctrl_id.isdigit():
-        qs = qs.filter(controller_id=int(ctrl_id))
-    if appr_id.isdigit():
-        qs = qs.filter(approver_id=int(appr_id))
-    if type_id.isdigit():
-        qs = qs.filter(assignment_type_id=int(type_id))
-    if date_from:
-        try:
-            qs = qs.filter(deadline__gte=dt_date.fromisoformat(date_from))
-        except ValueError:
-            pass
-    if date_to:
-        try:
-            qs = qs.filter(deadline__lte=dt_date.fromisoformat(date_to))
-        except ValueError:
-            pass
-
-    # ── Сортировка ───────────────────────────────────────────
-    sort = request.GET.get('sort', '-created_at')
-    ALLOWED_SORTS = {
-        'deadline':        'deadline',
-        '-deadline':       '-deadline',
-        'executor':        'executor__last_name',
-        '-executor':       '-executor__last_name',
-        'status':          'status',
-        '-status':         '-status',
-        'created_at':      'created_at',
-        '-created_at':     '-created_at',
-        'document_number': 'document_number',
-        '-document_number':'-document_number',
-    }
-    qs = qs.order_by(ALLOWED_SORTS.get(sort, '-created_at'))
-
-    # ── Данные для фильтров ──────────────────────────────────
-    departments = Department.objects.order_by('name')
-    assignment_types = AssignmentType.objects.order_by('name')
-
-    executors = Employee.objects.filter(
-        is_active=True,
-        assignments_to_execute__isnull=False
-    ).distinct().order_by('last_name', 'first_name')
-
-    controllers = Employee.objects.filter(
-        assignments_to_control__isnull=False
-    ).distinct().order_by('last_name', 'first_name')
-
-    approvers = Employee.objects.filter(
-        assignments_to_approve__isnull=False
-    ).distinct().order_by('last_name', 'first_name')
-
-    total = qs.count()
-
-    return render(request, 'assignments/list.html', {
+    # ── Фильтры и сортировка ────────────────────────────────
+    filters = read_filters(request.GET)
+    qs = filter_assignments(qs, filters)
+
+    # ── Число строк и данные для фильтров (из кэша справочников) — одновременно ──
+    total, ref = await asyncdb.gather(qs.count, get_reference_data)
+
+    return await sync_to_async(render)(request, 'assignments/list.html', {
         'assignments':      qs,
         'total':            total,
         'today':            today,
-        'departments':      departments,
-        'assignment_types': assignment_types,
-        'executors':        executors,
-        'controllers':      controllers,
-        'approvers':        approvers,
+        'departments':      ref.departments,
+        'assignment_types': ref.assignment_types,
+        'executors':        ref.executors,
+        'controllers':      ref.controllers,
+        'approvers':        ref.approvers,
         'status_choices':   Assignment.Status.choices,
         # Текущие значения фильтров
-        'f_q':          q,
-        'f_status':     status,
-        'f_dept':       dept_id,
-        'f_executor':   exec_id,
-        'f_controller': ctrl_id,
-        'f_approver':   appr_id,
-        'f_atype':      type_id,
-        'f_date_from':  date_from,
-        'f_date_to':    date_to,
-        'current_sort': sort,
+        'f_q':          filters['q'],
+        'f_status':     filters['status'],
+        'f_dept':       filters['dept'],
+        'f_executor':   filters['executor'],
+        'f_controller': filters['controller'],
+        'f_approver':   filters['approver'],
+        'f_atype':      filters['atype'],
+        'f_date_from':  filters['date_from'],
+        'f_date_to':    filters['date_to'],
+        'current_sort': filters['sort'],
+        'risk_threshold': RISK_THRESHOLD,
     })
 
 
+@staff_required
+@replica_view
+def assignment_export(request):
+    """
+    Выгрузка поручений (?format=csv|xlsx): выборки ?s=<токен> или списка
+    с текущими фильтрами и сортировкой.
+    """
+    token = request.GET.get('s')
+    if token:
+        qs = SelectionSet.get_or_404(token).queryset()
+    else:
+        qs = filter_assignments(Assignment.objects.all(), read_filters(request.GET))
+    return export_response(qs, request.GET.get('format', 'xlsx'), 'assignments')
+
+
+def _selection_from_post(request):
+    """
+    Выборка для массового действия: готовый токен, «все по фильтру»
+    (фильтры страницы списка) или отмеченные галочками id.
+    """
+    token = request.POST.get('selection')
+    if token:
+        return SelectionSet.get_or_404(token)
+    if request.POST.get('select_all') == '1':
+        filters = read_filters(QueryDict(request.POST.get('filters', '')))
+        return SelectionSet.from_filters(filters, request.user)
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+    if ids:
+        return SelectionSet.from_ids(ids, request.user)
+    return None
+
+
+BULK_MESSAGES = {
+    'status_done':     'Помечено как исполненные: {n} поручений.',
+    'status_progress': 'Статус «В работе»: {n} поручений.',
+    'notify_new':      'Отправлено уведомлений: {n}.',
+    'notify_remind':   'Отправлено напоминаний: {n}.',
+    'notify_deadline': 'Отправлено уведомлений об изменении сроков: {n}.',
+}
+
+
+def _with_param(url, name, value):
+    parts = urlsplit(url)
+    query = QueryDict(parts.query, mutable=True)
+    query[name] = value
+    return urlunsplit(parts._replace(query=query.urlencode()))
+
+
 @staff_required
 @require_POST
 def assignment_bulk_action(request):
-    action = request.POST.get('action')
-    ids    = request.POST.getlist('ids')
+    action    = request.POST.get('action')
+    selection = _selection_from_post(request)
 
-    if not ids:
+    if selection is None or not selection.count:
         messages.warning(request, 'Не выбрано ни одного поручения.')
         return redirect('assignments:list')
 
-    qs = Assignment.objects.filter(id__in=ids)
-
-    if action == 'status_done':
-        qs.update(status='DONE', updated_at=timezone.now())
-        messages.success(request, f'Помечено как исполненные: {len(ids)} поручений.')
-    elif action == 'status_progress':
-        qs.update(status='IN_PROGRESS', updated_at=timezone.now())
-        messages.success(request, f'Статус «В работе»: {len(ids)} поручений.')
-    elif action == 'notify_new':
-        from telegram.notifications import process_new_assignments
-        sent = process_new_assignments(qs)
-        messages.success(request, f'Отправлено уведомлений: {sent}.')
-    elif action == 'notify_remind':
-        from telegram.notifications import process_reminders
-        sent = process_reminders(qs)
-        messages.success(request, f'Отправлено напоминаний: {sent}.')
-    elif action == 'notify_deadline':
-        from telegram.notifications import process_deadline_change
-        sent = process_deadline_change(qs)
-        messages.success(request, f'Отправлено уведомлений об изменении сроков: {sent}.')
+    if action in bulk.ACTIONS:
+        if selection.count > bulk.INLINE_LIMIT:
+            # Большая выборка — порциями в фоне, страница списка показывает прогресс
+            operation = bulk.start(selection, action, request.user)
+            messages.info(request, f'Операция запущена: {selection.count} поручений обрабатываются порциями.')
+            return redirect(_with_param(request.POST.get('next') or reverse('assignments:list'), 'op', operation.pk))
+        operation = bulk.run(BulkOperation.objects.create(
+            selection=selection, action=action, total=selection.count, created_by=request.user,
+        ))
+        messages.success(request, BULK_MESSAGES[action].format(n=operation.affected))
     elif action == 'print':
-        return redirect(f'/reports/print-selected/?ids={",".join(ids)}')
+        return redirect(f"{reverse('reports:print_selected')}?s={selection.token}")
+    elif action in ('export_xlsx', 'export_csv'):
+        fmt = action.split('_')[1]
+        if selection.count > BACKGROUND_ROWS:
+            job = enqueue('assignments.export', {'selection': selection.token, 'format': fmt},
+                          user=request.user, title=f'Выгрузка {fmt.upper()}: {selection.count} поручений')
+            messages.info(request, 'Выгрузка большая: файл готовится в фоне и появится на странице задачи.')
+            return redirect('jobs:detail', job.pk)
+        return redirect(f"{reverse('assignments:export')}?s={selection.token}&format={fmt}")
     else:
         messages.error(request, 'Неизвестное действие.')
 
     return redirect(request.POST.get('next', 'assignments:list'))
 
 
+@staff_required
+@never_cache
+async def bulk_operation_progress(request, pk):
+    """Ход массовой операции (JSON для страницы списка)."""
+    operation = await aget_object_or_404(BulkOperation, pk=pk)
+    return JsonResponse({
+        'status':    operation.status,
+        'label':     operation.get_status_display(),
+        'total':     operation.total,
+        'processed': operation.processed,
+        'affected':  operation.affected,
+        'percent':   operation.percent,
+        'error':     operation.error,
+        'message':   BULK_MESSAGES.get(operation.action, '').format(n=operation.affected),
+    })
+
+
 # ════════════════════════════════════════════════════════
 #  КАРТОЧКА ПОРУЧЕНИЯ
 # ════════════════════════════════════════════════════════
 
 @staff_required
-def assignment_detail(request, pk):
-    task = get_object_or_404(
+@conditional_page(ASSIGNMENTS, REFDATA, TELEGRAM)
+async def assignment_detail(request, pk):
+    task = await aget_object_or_404(
         Assignment.objects.select_related(
             'executor', 'executor__department', 'executor__position',
             'executor__telegram_profile',
@@ -183,25 +193,25 @@ def assignment_detail(request, pk):
         if new_status in dict(Assignment.Status.choices):
             old_status = task.get_status_display()
             task.status = new_status
-            task.save(update_fields=['status', 'updated_at'])
+            await task.asave(update_fields=['status', 'updated_at'])
             messages.success(request, f'Статус изменён: {old_status} → {task.get_status_display()}')
         return redirect('assignments:detail', pk=pk)
 
-    # Отправка уведомления
+    # Отправка уведомления (HTTP к Telegram — вне потока запроса)
     if request.method == 'POST' and 'send_notify' in request.POST:
         notify_type = request.POST.get('notify_type', 'new')
         try:
             if notify_type == 'new':
                 from telegram.notifications import process_new_assignments
-                process_new_assignments(Assignment.objects.filter(pk=pk))
+                await asyncdb.run_isolated(process_new_assignments, Assignment.objects.filter(pk=pk))
                 messages.success(request, 'Уведомление о новом поручении отправлено.')
             elif notify_type == 'remind':
                 from telegram.notifications import process_reminders
-                process_reminders(Assignment.objects.filter(pk=pk))
+                await asyncdb.run_isolated(process_reminders, Assignment.objects.filter(pk=pk))
                 messages.success(request, 'Напоминание отправлено.')
             elif notify_type == 'deadline':
                 from telegram.notifications import process_deadline_change
-                process_deadline_change(Assignment.objects.filter(pk=pk))
+                await asyncdb.run_isolated(process_deadline_change, Assignment.objects.filter(pk=pk))
                 messages.success(request, 'Уведомление об изменении срока отправлено.')
         except Exception as e:
             messages.error(request, f'Ошибка отправки: {e}')
@@ -211,7 +221,7 @@ def assignment_detail(request, pk):
     days_left = delta.days          # значение < 0, если срок уже просрочен
     days_overdue = abs(delta.days)  # всегда положительное
 
-    return render(request, 'assignments/detail.html', {
+    return await sync_to_async(render)(request, 'assignments/detail.html', {
         'task':      task,
         'today':     today,
         'days_left':    days_left,
@@ -227,33 +237,17 @@ def assignment_detail(request, pk):
 @staff_required
 def assignment_create(request):
     from .forms import AssignmentCreateForm
-    from task_control.models import Department
 
     today = timezone.now().date()
-    departments = Department.objects.prefetch_related(
-        'employee_set'
-    ).order_by('name')
+    ref = get_reference_data()
 
     if request.method == 'POST':
         form = AssignmentCreateForm(request.POST)
         if form.is_valid():
-            data      = form.cleaned_data
-            executors = data['executors']
-            created   = []
-
-            for executor in executors:
-                task = Assignment.objects.create(
-                    assignment_type = data['assignment_type'],
-                    document_number = data['document_number'],
-                    issue_date      = data['issue_date'],
-                    description     = data['description'],
-                    deadline        = data['deadline'],
-                    executor        = executor,
-                    controller      = data.get('controller'),
-                    approver        = data.get('approver'),
-                    status          = 'NEW',
-                )
-                created.append(task)
+            data    = form.cleaned_data
+            created = form.save(request.session)
+            if created and created[0].document_number != data['document_number']:
+                messages.info(request, f'Подсказанный номер уже занят — присвоен № {created[0].document_number}.')
 
             # Отправка уведомлений если выбрано
             if data.get('send_notifications') and created:
@@ -273,24 +267,10 @@ def assignment_create(request):
     else:
         form = AssignmentCreateForm(initial={'issue_date': today})
 
-    import json as _json
-    employees_json = _json.dumps([
-        {
-            'id':    str(e.pk),
-            'name':  f'{e.last_name} {e.first_name} {e.middle_name}'.strip(),
-            'short': f'{e.last_name} {e.first_name[:1]}.{e.middle_name[:1]}.' if e.first_name else e.last_name,
-            'pos':   e.position.name if e.position else '',
-            'dept':  e.department.name if e.department else 'Без подразделения',
-            'av':    (e.last_name[:1] + e.first_name[:1]).upper() if e.first_name else e.last_name[:2].upper(),
-        }
-        for e in form.fields['executors'].queryset
-    ], ensure_ascii=False)
-
     return render(request, 'assignments/create.html', {
         'form':          form,
         'today':         today,
-        'departments':   departments,
-        'employees_json': employees_json,
+        'ref':           ref,
     })
 
 
@@ -337,6 +317,7 @@ def assignment_edit(request, pk):
     return render(request, 'assignments/edit.html', {
         'form': form,
         'task': task,
+        'ref':  get_reference_data(),
     })
 
 
@@ -361,35 +342,32 @@ def assignment_delete(request, pk):
 # ════════════════════════════════════════════════════════
 #  API: следующий номер документа
 # ════════════════════════════════════════════════════════
-from django.http import JsonResponse
-
 @staff_required
+@require_POST
 def next_document_number(request):
-    """Возвращает следующий номер документа на основе последнего."""
-    from task_control.models import Assignment
-    import re
-
-    atype_id = request.GET.get('type', '')
-    today = timezone.now().date()
-    year  = today.year
-
-    # Берём последнее поручение этого типа за текущий год
-    qs = Assignment.objects.filter(issue_date__year=year)
-    if atype_id.isdigit():
-        qs = qs.filter(assignment_type_id=int(atype_id))
-
-    last = qs.order_by('-id').first()
-
-    if last:
-        # Пытаемся найти последнее число в номере и инкрементировать
-        m = re.search(r'(\d+)$', last.document_number)
-        if m:
-            base = last.document_number[:m.start()]
-            num  = int(m.group(1)) + 1
-            suggestion = f"{base}{num}"
-        else:
-            suggestion = ''
-    else:
-        suggestion = ''
-
-    return JsonResponse({'number': suggestion})
+    """
+    Подсказывает следующий номер документа для вида type в текущем году.
+
+    Номер не выдаётся: счётчик DocumentNumberCounter сдвигается только при
+    сохранении поручения с подсказанным номером (AssignmentCreateForm.save),
+    так что повторные запросы номеров не расходуют. При
+    DOCUMENT_NUMBER_BLOCK > 1 на сессию резервируется блок номеров и
+    подсказывается первый неиспользованный из него.
+    """
+    from .forms import reserved_numbers_key
+
+    atype_id = request.POST.get('type', '')
+    if not atype_id.isdigit():
+        return JsonResponse({'number': ''})
+
+    year = timezone.now().date().year
+    key  = reserved_numbers_key(int(atype_id), year)
+
+    reserved = request.session.get(key) or []
+    block = max(1, getattr(settings, 'DOCUMENT_NUMBER_BLOCK', 1))
+    if not reserved and block > 1:
+        reserved = DocumentNumberCounter.allocate(int(atype_id), year, count=block)
+        request.session[key] = reserved
+    number = reserved[0] if reserved else DocumentNumberCounter.peek(int(atype_id), year)
+
+    return JsonResponse({'number': number})
@@ -0,0 +1,39 @@
+from django import forms
+
+
+class EmployeeAutocompleteMixin:
+    """
+    Виджет выбора сотрудника без полного списка в HTML.
+
+    Рендерит только уже выбранные значения; остальные варианты браузер
+    подгружает из references:employee_search (static/js/employee_search.js).
+    """
+    def __init__(self, attrs=None, role=None):
+        attrs = {'class': 'form-control', **(attrs or {})}
+        attrs['data-employee-search'] = role or ''
+        super().__init__(attrs)
+
+    def optgroups(self, name, value, attrs=None):
+        selected = {str(v) for v in value if v not in ('', None)}
+        field = getattr(self.choices, 'field', None)
+        if field is None or not selected:
+            choices = [('', field.empty_label)] if field is not None and field.empty_label is not None else []
+        else:
+            qs = field.queryset.filter(pk__in=selected)
+            choices = [(obj.pk, field.label_from_instance(obj)) for obj in qs]
+
+        groups = []
+        for index, (option_value, option_label) in enumerate(choices):
+            is_selected = str(option_value) in selected
+            groups.append((None, [self.create_option(
+                name, option_value, option_label, is_selected, index, attrs=attrs,
+            )], index))
+        return groups
+
+
+class EmployeeAutocompleteSelect(EmployeeAutocompleteMixin, forms.Select):
+    pass
+
+
+class EmployeeAutocompleteSelectMultiple(EmployeeAutocompleteMixin, forms.SelectMultiple):
+    pass
@@ -3,6 +3,16 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Запуск в эксплуатации (один процесс держит много медленных клиентов и
+потоков core:events; воркеров — по числу ядер):
+
+    uvicorn config.asgi:application --workers 4 --proxy-headers \\
+        --timeout-keep-alive 5 --timeout-graceful-shutdown 10
+
+(uvicorn закреплён в requirements.txt). Статику отдаёт nginx
+(collectstatic); для /events/ в nginx — proxy_buffering off и
+proxy_read_timeout больше core.live.HEARTBEAT.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +23,33 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Справочники собираем сразу, чтобы первый запрос не платил за прогрев
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.db import connections  # noqa: E402
+
+from core import asyncdb  # noqa: E402
+from core.refcache import warm  # noqa: E402
+
+warm()
+
+
+async def _lifespan(receive, send):
+    """Запуск и остановка воркера: Django сам lifespan-сообщения не принимает."""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await sync_to_async(asyncdb.shutdown, thread_sensitive=False)()
+            await sync_to_async(connections.close_all)()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    await django_application(scope, receive, send)
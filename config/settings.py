@@ -33,6 +33,9 @@ INSTALLED_APPS = [
     'reports',
     'assignments',
     'references',
+    'jobs',
+    'api',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -42,6 +45,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.replica.primary_after_write_middleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -57,12 +61,14 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.navigation',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
 # Убраны f-строки. Теперь, если переменных нет, Django использует значения по умолчанию (SQLite)
@@ -74,6 +80,44 @@ DATABASES = {
         'PASSWORD': os.getenv("PASSWORD", ""),
         'HOST': os.getenv("HOST", ""),
         'PORT': os.getenv("PORT", ""),
+        # Постоянные соединения: потоки запросов и пул core.asyncdb не
+        # подключаются к базе заново на каждый запрос. Для PostgreSQL можно
+        # вместо этого включить пул psycopg (OPTIONS {'pool': True}, CONN_MAX_AGE=0).
+        'CONN_MAX_AGE': int(os.getenv("CONN_MAX_AGE", "60")),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+# Потоков (и соединений с базой) на процесс для параллельных блоков запросов
+# async-представлений (core.asyncdb.gather)
+ASYNC_DB_WORKERS = int(os.getenv("ASYNC_DB_WORKERS", "4"))
+
+# Реплика для отчётов, дашборда и выгрузок (core.replica). По умолчанию —
+# второй файл SQLite рядом с основным, его обновляет manage.py sync_replica;
+# в эксплуатации — реплика СУБД (REPLICA_HOST и т. д.). Чтение с неё
+# включается REPLICA_READS=1.
+DATABASES['replica'] = {
+    'ENGINE': os.getenv("REPLICA_ENGINE", DATABASES['default']['ENGINE']),
+    'NAME': os.getenv("REPLICA_NAME", BASE_DIR / "db_replica.sqlite3"
+                      if DATABASES['default']['ENGINE'].endswith('sqlite3') else DATABASES['default']['NAME']),
+    'USER': os.getenv("REPLICA_USER", DATABASES['default']['USER']),
+    'PASSWORD': os.getenv("REPLICA_PASSWORD", DATABASES['default']['PASSWORD']),
+    'HOST': os.getenv("REPLICA_HOST", DATABASES['default']['HOST']),
+    'PORT': os.getenv("REPLICA_PORT", DATABASES['default']['PORT']),
+    'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+    'CONN_HEALTH_CHECKS': True,
+}
+DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+REPLICA_READS = os.getenv("REPLICA_READS", "") == "1"
+REPLICA_MAX_LAG = int(os.getenv("REPLICA_MAX_LAG", "30"))          # секунд
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "30"))
+
+# Кэш. По умолчанию — память процесса; при нескольких воркерах укажите общий
+# бэкенд (например, CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache),
+# иначе версии справочников (core.refcache) не будут видны соседним процессам.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -104,6 +148,23 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Серверная печать в PDF (reports.pdf): нужен пакет weasyprint, для параллельной
+# сборки больших отчётов — ещё pypdf. Без них отчёты печатаются из браузера.
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', BASE_DIR / 'var' / 'pdf')
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 1))
+
+# Сколько номеров документов резервировать за раз на сессию пользователя
+# (assignments.views.next_document_number); 1 — без резерва, номер выдаётся
+# при сохранении поручения.
+DOCUMENT_NUMBER_BLOCK = int(os.getenv('DOCUMENT_NUMBER_BLOCK', 1))
+
+# Фоновые задачи (jobs): выполняются воркерами manage.py runjobs.
+# JOBS_EAGER=1 — выполнять сразу в запросе, без воркера (разработка).
+JOBS_ARTIFACTS_DIR = os.getenv('JOBS_ARTIFACTS_DIR', BASE_DIR / 'var' / 'jobs')
+JOBS_EAGER = os.getenv('JOBS_EAGER', '') == '1'
+JOBS_STALE_AFTER = int(os.getenv('JOBS_STALE_AFTER', 300))   # секунд без heartbeat
+JOBS_KEEP_DAYS = int(os.getenv('JOBS_KEEP_DAYS', 14))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Читаем токен из .env
@@ -20,4 +20,7 @@ from django.urls import path, include
 urlpatterns = [path('admin/', admin.site.urls), path('', include('core.urls')),
                path('reports/', include('reports.urls')), path('assignments/', include('assignments.urls')),
                path('references/', include('references.urls')),
-               path('telegram/', include('telegram.urls')), ]
+               path('telegram/', include('telegram.urls')),
+               path('jobs/', include('jobs.urls')),
+               path('api/v1/', include('api.urls')),
+               path('analytics/', include('analytics.urls')), ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Справочники собираем сразу, чтобы первый запрос не платил за прогрев
+from core.refcache import warm  # noqa: E402
+
+warm()
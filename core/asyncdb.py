@@ -0,0 +1,76 @@
+"""
+Запросы к базе из асинхронных view.
+
+Под ASGI синхронный код запроса (ORM, шаблоны) выполняется в отдельном
+потоке запроса — он не блокирует цикл событий и чужие запросы, но внутри
+запроса всё идёт по очереди. gather() запускает независимые блоки
+запросов (KPI, графики, списки фильтров) одновременно в пуле из
+settings.ASYNC_DB_WORKERS потоков на процесс. Потоки пула живут долго и
+держат свои соединения (CONN_MAX_AGE), так что блок не платит за
+подключение, а соединений с базой у процесса не больше, чем потоков:
+при наплыве клиентов лишние блоки ждут свободный поток. Внутри открытой
+транзакции (в том числе в TestCase) блоки выполняются по очереди в потоке
+запроса: другие соединения не видят её незафиксированных данных.
+
+    kpi, chart = await gather(partial(dashboard_kpi, today), monthly_chart)
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_WORKERS, thread_name_prefix='asyncdb')
+        return _executor
+
+
+def shutdown():
+    """Остановка воркера (config.asgi): дождаться блоков, выполняющихся в пуле."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+def _isolated(call):
+    def run():
+        # Как в начале и конце HTTP-запроса: соединение потока переиспользуется,
+        # пока не истёк CONN_MAX_AGE и не было ошибок
+        close_old_connections()
+        try:
+            return call()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather(*calls):
+    """Результаты вызовов calls (функций без аргументов) в том же порядке."""
+    if await sync_to_async(_in_transaction)():
+        return [await sync_to_async(call)() for call in calls]
+    executor = _get_executor()
+    return await asyncio.gather(*(
+        sync_to_async(_isolated(call), thread_sensitive=False, executor=executor)() for call in calls
+    ))
+
+
+async def run_isolated(call, *args, **kwargs):
+    """Долгий синхронный вызов (HTTP к Telegram и т. п.) вне потока запроса."""
+    if await sync_to_async(_in_transaction)():
+        return await sync_to_async(call)(*args, **kwargs)
+    return await sync_to_async(_isolated(lambda: call(*args, **kwargs)), thread_sensitive=False)()
@@ -0,0 +1,144 @@
+"""
+Условные GET-запросы: ETag / Last-Modified и ответ 304 без рендеринга.
+
+Валидатор страницы строится из счётчиков изменений (core.models.ChangeCounter)
+тех таблиц, от которых она зависит, и параметров запроса: путь, GET-фильтры,
+текущая дата (шаблоны подсвечивают сроки относительно «сегодня»), пользователь
+и CSRF-cookie (в формах страницы зашит токен). Проверка стоит один запрос по
+первичному ключу вместо всех запросов и рендеринга шаблона.
+
+Использование:
+
+    @staff_required
+    @conditional_page(ASSIGNMENTS, REFDATA)
+    def assignment_list(request): ...
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import ChangeCounter
+
+# Имена счётчиков
+ASSIGNMENTS = 'assignments'
+REFDATA     = 'refdata'
+TELEGRAM    = 'telegram'
+ANALYTICS   = 'analytics'
+
+
+def touch(*names):
+    """Отмечает изменение таблиц (для путей записи в обход сигналов)."""
+    ChangeCounter.touch(*names)
+
+
+def _state(request, tables):
+    """Значения счётчиков — один запрос на запрос пользователя."""
+    cache_attr = '_change_counters'
+    cached = getattr(request, cache_attr, None)
+    if cached is None:
+        cached = dict.fromkeys(tables)
+        rows = ChangeCounter.objects.filter(name__in=tables).values_list('name', 'value', 'updated_at')
+        for name, value, updated_at in rows:
+            cached[name] = (value, updated_at)
+        setattr(request, cache_attr, cached)
+    return cached
+
+
+def _applicable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Непоказанные сообщения (messages framework) должны попасть на страницу
+    return not len(get_messages(request))
+
+
+def conditional_page(*tables):
+    """
+    Декоратор view: ETag и Last-Modified по счётчикам tables.
+
+    Ставится под декоратором проверки доступа, чтобы 304 не отдавался
+    неавторизованным пользователям.
+    """
+    def etag_func(request, *args, **kwargs):
+        if not _applicable(request):
+            return None
+        counters = _state(request, tables)
+        user = request.user
+        parts = [
+            request.path,
+            sorted(request.GET.lists()),
+            sorted(kwargs.items()),
+            timezone.localdate().isoformat(),
+            getattr(user, 'pk', None),
+            getattr(user, 'is_superuser', False),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            [(name, counters[name] and counters[name][0]) for name in tables],
+        ]
+        return hashlib.md5(repr(parts).encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        if not _applicable(request):
+            return None
+        stamps = [state[1] for state in _state(request, tables).values() if state]
+        return max(stamps) if stamps else None
+
+    def decorator(view_func):
+        conditioned = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                # condition() зовёт etag_func синхронно: счётчики и сообщения читаем заранее в потоке
+                await sync_to_async(etag_func)(request, *args, **kwargs)
+                response = await conditioned(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditioned(request, *args, **kwargs)
+            # Браузер хранит страницу, но перепроверяет её при каждом открытии
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+# ════════════════════════════════════════════════════════
+#  СЧЁТЧИКИ ПО СИГНАЛАМ
+# ════════════════════════════════════════════════════════
+
+def _touch_handler(name):
+    def handler(sender, **kwargs):
+        touch(name)
+    return handler
+
+
+_touch_assignments = _touch_handler(ASSIGNMENTS)
+_touch_refdata     = _touch_handler(REFDATA)
+_touch_telegram    = _touch_handler(TELEGRAM)
+
+
+def connect_signals():
+    from task_control.models import Assignment, AssignmentType, Department, Employee, Position
+    from task_control.signals import assignments_updated
+    from telegram.models import TelegramUser
+
+    for model, handler in (
+        (Assignment, _touch_assignments),
+        (Department, _touch_refdata),
+        (Position, _touch_refdata),
+        (AssignmentType, _touch_refdata),
+        (Employee, _touch_refdata),
+        (TelegramUser, _touch_telegram),
+    ):
+        post_save.connect(handler, sender=model, dispatch_uid=f'counter_save_{model.__name__}')
+        post_delete.connect(handler, sender=model, dispatch_uid=f'counter_delete_{model.__name__}')
+    assignments_updated.connect(_touch_assignments, sender=Assignment, dispatch_uid='counter_update_Assignment')
@@ -0,0 +1,14 @@
+from core.mixins import get_user_role
+
+
+def navigation(request):
+    """
+    Ключ кэша бокового меню (core/base.html, {% cache %}): меню зависит
+    только от роли пользователя и текущего раздела/страницы.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    match = request.resolver_match
+    section = request.path_info.split('/', 2)[1]
+    return {'nav_cache_key': f"{get_user_role(user)}|{match.view_name if match else ''}|{section}"}
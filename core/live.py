@@ -0,0 +1,172 @@
+"""
+Живое обновление страниц: поток server-sent events (core:events).
+
+Один опросчик на процесс (Broker) раз в POLL_INTERVAL секунд читает
+последний номер журнала AssignmentChange — один запрос по первичному ключу
+на процесс, сколько бы вкладок ни было открыто. Журнал фиксируется вместе с
+изменениями, поэтому номер сдвигается ровно тогда, когда есть что читать:
+опросчик читает новые записи, пересчитывает KPI дашборда и рассылает
+подписчикам одно событие:
+
+    id: <seq>
+    event: assignments
+    data: {"seq": 812, "kpi": {...}, "delta": {"overdue": -1},
+           "created": [..], "updated": [..], "deleted": [..], "at": "..."}
+
+Страницы (static/js/live.js) правят числа и строки на месте. Номер seq —
+тот же, что в api/v1/changes/; при переподключении браузер присылает
+Last-Event-ID, и пропущенные изменения приходят первым событием.
+"""
+import asyncio
+import json
+import weakref
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+POLL_INTERVAL = 2      # секунд между проверками журнала
+HEARTBEAT = 15         # секунд между комментариями-«пингами» (держат соединение через прокси)
+MAX_IDS = 500          # id в одном событии; больше — страница перезагружает данные целиком
+QUEUE_SIZE = 20        # событий в очереди медленного клиента, дальше он отключается
+RETRY_MS = 5000
+
+
+def dashboard_kpi(today):
+    """Числа KPI-карточек дашборда."""
+    from task_control import workload
+    from task_control.models import Assignment, StatusTransition, WorkloadCounter
+
+    from .refcache import get_reference_data
+
+    active_qs = Assignment.objects.exclude(status='DONE')
+    by_type = workload.counters(WorkloadCounter.Scope.TYPE).values()
+    return {
+        'active':    sum(c.active for c in by_type),
+        'overdue':   sum(c.overdue for c in by_type),
+        'today':     active_qs.filter(deadline=today).count(),
+        'week':      active_qs.filter(deadline__gt=today, deadline__lte=today + timedelta(days=7)).count(),
+        # По журналу смены статусов: правка исполненного поручения не считается
+        'done_month': StatusTransition.objects.completions(today.replace(day=1), today)
+                      .values('assignment').distinct().count(),
+        'total_employees': len(get_reference_data().employees),
+    }
+
+
+def last_seq():
+    from task_control.models import AssignmentChange
+
+    return AssignmentChange.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def changes_since(seq):
+    """(новый seq, {'created': [...], 'updated': [...], 'deleted': [...]}) по журналу после seq."""
+    from task_control.models import AssignmentChange
+
+    rows = list(
+        AssignmentChange.objects.filter(pk__gt=seq).order_by('pk')
+        .values_list('pk', 'assignment_id', 'operation')[:MAX_IDS + 1]
+    )
+    truncated = len(rows) > MAX_IDS
+    rows = rows[:MAX_IDS]
+    keys = {
+        AssignmentChange.Operation.CREATE: 'created',
+        AssignmentChange.Operation.UPDATE: 'updated',
+        AssignmentChange.Operation.DELETE: 'deleted',
+    }
+    changes = {key: [] for key in keys.values()}
+    for _, pk, operation in rows:
+        if pk not in changes[keys[operation]]:
+            changes[keys[operation]].append(pk)
+    changes['truncated'] = truncated
+    return (rows[-1][0] if rows else seq), changes
+
+
+def event(name, data, event_id=None):
+    """Событие в формате text/event-stream."""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n'
+
+
+class Broker:
+    """Опросчик базы и рассылка событий подписчикам одного цикла событий."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+        self.seq = None
+        self.kpi = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def _poll(self):
+        seq = last_seq()
+        if self.seq is None:
+            self.seq, self.kpi = seq, dashboard_kpi(timezone.localdate())
+            return None
+        if seq == self.seq:
+            return None
+        self.seq, changes = changes_since(self.seq)
+        kpi = dashboard_kpi(timezone.localdate())
+        delta = {name: kpi[name] - self.kpi.get(name, 0) for name in kpi if kpi[name] != self.kpi.get(name, 0)}
+        self.kpi = kpi
+        return {'seq': self.seq, 'kpi': kpi, 'delta': delta, **changes, 'at': timezone.now()}
+
+    async def run(self):
+        while self.subscribers:
+            data = await sync_to_async(self._poll)()
+            if data is not None:
+                message = event('assignments', data, data['seq'])
+                for queue in list(self.subscribers):
+                    try:
+                        queue.put_nowait(message)
+                    except asyncio.QueueFull:
+                        # Клиент не успевает читать: отключаем, браузер переподключится
+                        self.unsubscribe(queue)
+                        queue.get_nowait()
+                        queue.put_nowait(None)
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+_brokers = weakref.WeakKeyDictionary()
+
+
+def broker():
+    """Брокер текущего цикла событий (под ASGI — один на процесс)."""
+    loop = asyncio.get_running_loop()
+    if loop not in _brokers:
+        _brokers[loop] = Broker()
+    return _brokers[loop]
+
+
+async def stream(since=None):
+    """Поток событий для одного клиента; since — Last-Event-ID после переподключения."""
+    hub = broker()
+    queue = hub.subscribe()
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        if since is not None:
+            seq, changes = await sync_to_async(changes_since)(since)
+            if seq != since:
+                kpi = await sync_to_async(dashboard_kpi)(timezone.localdate())
+                yield event('assignments', {'seq': seq, 'kpi': kpi, 'delta': {}, **changes,
+                                            'at': timezone.now()}, seq)
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        hub.unsubscribe(queue)
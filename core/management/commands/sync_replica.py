@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.replica import REPLICA, replica_lag, reset_health
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файл реплики — локальная замена репликации '
+            '(запускать по расписанию; в эксплуатации реплику ведёт СУБД)')
+
+    def handle(self, *args, **kwargs):
+        if REPLICA not in connections.settings:
+            raise CommandError('Алиас базы «replica» не настроен.')
+        source, target = connections[DEFAULT_DB_ALIAS], connections[REPLICA]
+        if source.vendor != 'sqlite' or target.vendor != 'sqlite':
+            raise CommandError('Команда только для SQLite.')
+        source.ensure_connection()
+        target.ensure_connection()
+        source.connection.backup(target.connection)
+        reset_health()
+        self.stdout.write(self.style.SUCCESS(f'Реплика обновлена, отставание: {replica_lag():.0f} с'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Таблица')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Номер изменения')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Последнее изменение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик изменений',
+                'verbose_name_plural': 'Счётчики изменений',
+            },
+        ),
+    ]
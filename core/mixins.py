@@ -1,6 +1,8 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import redirect
+from asgiref.sync import iscoroutinefunction
 from functools import wraps
 
 
@@ -21,8 +23,21 @@ class StaffRequiredMixin(LoginRequiredMixin):
 
 def staff_required(view_func):
     """
-    Декоратор для function-based views.
+    Декоратор для function-based views (обычных и async def).
     """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return redirect_to_login(request.get_full_path(), '/login/')
+            if not user.is_staff:
+                return redirect('core:forbidden')
+            # Дальше (шаблоны, проверки ролей) request.user читается без запроса к базе
+            request.user = user
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     @login_required(login_url='/login/')
     def wrapper(request, *args, **kwargs):
@@ -41,11 +56,23 @@ ROLE_CONTROLLER = 'Контролирующие'
 ROLE_VIEWER     = 'Просмотр'
 
 
+def _group_names(user):
+    """
+    Группы пользователя — один запрос на объект user. request.user живёт
+    один запрос, поэтому все проверки ролей за запрос стоят один запрос.
+    """
+    names = getattr(user, '_role_group_names', None)
+    if names is None:
+        names = frozenset(user.groups.values_list('name', flat=True)) if user.is_authenticated else frozenset()
+        user._role_group_names = names
+    return names
+
+
 def get_user_role(user):
     """Возвращает роль пользователя."""
     if user.is_superuser:
         return ROLE_ADMIN
-    groups = set(user.groups.values_list('name', flat=True))
+    groups = _group_names(user)
     if ROLE_ADMIN in groups:
         return ROLE_ADMIN
     if ROLE_CONTROLLER in groups:
@@ -54,8 +81,8 @@ def get_user_role(user):
 
 
 def is_admin(user):
-    return user.is_superuser or user.groups.filter(name=ROLE_ADMIN).exists()
+    return user.is_superuser or ROLE_ADMIN in _group_names(user)
 
 
 def is_controller(user):
-    return is_admin(user) or user.groups.filter(name=ROLE_CONTROLLER).exists()
+    return is_admin(user) or ROLE_CONTROLLER in _group_names(user)
@@ -1,3 +1,36 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 
-# Create your models here.
+
+class ChangeCounter(models.Model):
+    """
+    Счётчик изменений таблицы (или группы таблиц).
+
+    Увеличивается при каждой записи — в том числе через queryset.update(),
+    который не вызывает сигналы и не трогает auto_now. По счётчикам строятся
+    ETag / Last-Modified (core.conditional).
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name="Таблица")
+    value = models.BigIntegerField(default=0, verbose_name="Номер изменения")
+    updated_at = models.DateTimeField(default=timezone.now, verbose_name="Последнее изменение")
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def touch(cls, *names):
+        now = timezone.now()
+        for name in names:
+            if not cls.objects.filter(name=name).update(value=F('value') + 1, updated_at=now):
+                cls.objects.get_or_create(name=name, defaults={'value': 1, 'updated_at': now})
+
+    @classmethod
+    def versions(cls, *names):
+        """Текущие номера изменений: {имя: номер} (0 — изменений ещё не было)."""
+        found = dict(cls.objects.filter(name__in=names).values_list('name', 'value'))
+        return {name: found.get(name, 0) for name in names}
+
+    class Meta:
+        verbose_name = "Счётчик изменений"
+        verbose_name_plural = "Счётчики изменений"
@@ -0,0 +1,188 @@
+"""
+Кэш справочных данных: подразделения, должности, виды поручений, сотрудники.
+
+Справочники меняются редко, а читаются почти на каждой странице, поэтому
+готовые структуры (списки для фильтров и выпадающих списков) собираются
+один раз и живут в памяти процесса.
+
+Актуальность определяется номером версии в общем кэше Django
+(settings.CACHES): любое изменение Department / Position / AssignmentType /
+Employee увеличивает версию, и все воркеры пересобирают данные при
+следующем обращении.
+"""
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'refdata:version'
+
+_lock  = threading.Lock()
+_state = {'version': None, 'data': None}
+
+
+# ════════════════════════════════════════════════════════
+#  ВЕРСИЯ
+# ════════════════════════════════════════════════════════
+
+def get_version():
+    """Текущая версия справочников (общая для всех процессов)."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Начальное значение берём от времени: если ключ вытеснили из кэша,
+        # новая версия гарантированно не совпадёт со старыми.
+        cache.add(VERSION_KEY, time.time_ns())
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version(*args, **kwargs):
+    """Помечает справочники изменёнными. Подходит как обработчик сигнала."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns())
+
+
+# ════════════════════════════════════════════════════════
+#  СБОРКА ДАННЫХ
+# ════════════════════════════════════════════════════════
+
+class ReferenceData:
+    """Снимок справочников на определённую версию. Только для чтения."""
+
+    def __init__(self, version):
+        from task_control.models import Assignment, AssignmentType, Department, Employee, Position
+
+        self.version = version
+
+        self.departments = [
+            {'id': pk, 'name': name}
+            for pk, name in Department.objects.order_by('name').values_list('id', 'name')
+        ]
+        self.positions = [
+            {'id': pk, 'name': name}
+            for pk, name in Position.objects.order_by('name').values_list('id', 'name')
+        ]
+        self.assignment_types = [
+            {'id': pk, 'name': name, 'color': color}
+            for pk, name, color in AssignmentType.objects.order_by('name').values_list('id', 'name', 'color')
+        ]
+
+        dept_by_id = {d['id']: d for d in self.departments}
+        pos_by_id  = {p['id']: p for p in self.positions}
+
+        rows = Employee.objects.values_list(
+            'id', 'last_name', 'first_name', 'middle_name',
+            'department_id', 'position_id', 'is_active', 'is_approver', 'is_controller',
+        ).order_by('last_name', 'first_name')
+
+        people = {}
+        for pk, last, first, middle, dept_id, pos_id, active, approver, controller in rows:
+            people[pk] = employee_record(
+                pk, last, first, middle,
+                dept_by_id.get(dept_id), pos_by_id.get(pos_id),
+                active, approver, controller,
+            )
+
+        # Активные сотрудники: по ФИО и по подразделению (для {% regroup %})
+        self.employees = [e for e in people.values() if e['is_active']]
+        self.employees_by_dept = sorted(
+            self.employees,
+            key=lambda e: (e['department']['name'] if e['department'] else '', e['last_name']),
+        )
+        self.employee_ids = {e['id'] for e in self.employees}
+        # Кандидаты по limit_choices_to полей Assignment.controller / approver
+        self.controller_candidates = [e for e in self.employees if e['is_controller']]
+        self.approver_candidates   = [e for e in self.employees if e['is_approver']]
+
+        # Сотрудники, которые уже встречаются в поручениях (фильтры списка)
+        self.executor_ids   = set(Assignment.objects.values_list('executor_id', flat=True).distinct())
+        self.controller_ids = set(Assignment.objects.values_list('controller_id', flat=True).distinct())
+        self.approver_ids   = set(
+            Assignment.objects.filter(approver__isnull=False).values_list('approver_id', flat=True).distinct()
+        )
+        self.executors   = [e for e in self.employees if e['id'] in self.executor_ids]
+        self.controllers = [e for pk, e in people.items() if pk in self.controller_ids]
+        self.approvers   = [e for pk, e in people.items() if pk in self.approver_ids]
+
+
+def employee_record(pk, last, first, middle, dept, pos, active, approver, controller):
+    full_name = f'{last} {first} {middle}'.strip()
+    return {
+        'id':            pk,
+        'last_name':     last,
+        'first_name':    first,
+        'middle_name':   middle,
+        'department':    dept,
+        'position':      pos,
+        'is_active':     active,
+        'is_approver':   approver,
+        'is_controller': controller,
+        'full_name':     full_name,
+        # То же, что Employee.__str__
+        'label':         full_name + (f" ({dept['name']})" if dept else ''),
+        'short':         f'{last} {first[:1]}.{middle[:1]}.' if first else last,
+        'avatar':        (last[:1] + first[:1]).upper() if first else last[:2].upper(),
+    }
+
+
+# ════════════════════════════════════════════════════════
+#  ДОСТУП
+# ════════════════════════════════════════════════════════
+
+def get_reference_data():
+    """Возвращает актуальный снимок справочников, пересобирая его при смене версии."""
+    version = get_version()
+    data = _state['data']
+    if data is not None and _state['version'] == version:
+        return data
+
+    with _lock:
+        if _state['data'] is not None and _state['version'] == version:
+            return _state['data']
+        data = ReferenceData(version)
+        _state['version'], _state['data'] = version, data
+        return data
+
+
+def warm():
+    """Прогрев при старте воркера (config/wsgi.py, config/asgi.py)."""
+    try:
+        get_reference_data()
+    except DatabaseError as exc:
+        # База ещё не создана или не мигрирована — соберём при первом запросе
+        logger.warning('Reference data cache was not warmed: %s', exc)
+
+
+# ════════════════════════════════════════════════════════
+#  ИНВАЛИДАЦИЯ
+# ════════════════════════════════════════════════════════
+
+def _assignment_saved(sender, instance, **kwargs):
+    """
+    Списки исполнителей/контролёров/визирующих в фильтрах зависят от поручений.
+    Версию сбрасываем только если в поручении появился новый человек;
+    устаревший снимок этого процесса пересоберётся сам при следующем чтении.
+    """
+    data = _state['data']
+    if data is None:
+        return
+    if (instance.executor_id not in data.executor_ids
+            or instance.controller_id not in data.controller_ids
+            or (instance.approver_id and instance.approver_id not in data.approver_ids)):
+        bump_version()
+
+
+def connect_signals():
+    from task_control.models import Assignment, AssignmentType, Department, Employee, Position
+
+    for model in (Department, Position, AssignmentType, Employee):
+        post_save.connect(bump_version, sender=model, dispatch_uid=f'refcache_save_{model.__name__}')
+        post_delete.connect(bump_version, sender=model, dispatch_uid=f'refcache_delete_{model.__name__}')
+    post_save.connect(_assignment_saved, sender=Assignment, dispatch_uid='refcache_assignment_saved')
@@ -0,0 +1,191 @@
+"""
+Чтение с реплики базы для тяжёлых отчётов, дашборда и выгрузок.
+
+Запросы на чтение уходят на алиас REPLICA только внутри use_replica()
+(команды, фоновые задачи) или view с @replica_view — и только если:
+
+  * чтение с реплики включено (settings.REPLICA_READS);
+  * пользователь недавно ничего не записывал: после POST/PUT/PATCH/DELETE
+    middleware ставит cookie STICKY_COOKIE на REPLICA_STICKY_SECONDS, и
+    его запросы идут на основную базу — он сразу видит свои изменения;
+  * реплика отстаёт не больше REPLICA_MAX_LAG секунд. Отставание — по
+    счётчикам изменений (core.models.ChangeCounter): если номер на реплике
+    меньше, чем на основной базе, до неё не дошли записи, сделанные после
+    её updated_at (оценка сверху: после простоя лишний раз прочитаем с
+    основной базы). Проверка — раз в LAG_CHECK_INTERVAL секунд на
+    процесс; ошибка соединения считается отставанием.
+
+Запись всегда идёт на основную базу, миграции — только на неё.
+
+Локально реплика — второй файл SQLite (REPLICA_NAME), который обновляет
+manage.py sync_replica: между запусками она честно отстаёт, и на ней
+можно проверить и откат на основную базу, и липкость после записи.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+from django.utils.decorators import sync_and_async_middleware
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'db_primary_until'
+LAG_CHECK_INTERVAL = 5
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_reads = ContextVar('replica_reads', default=False)
+_health = {'checked': None, 'lag': None}
+_health_lock = threading.Lock()
+
+
+# ════════════════════════════════════════════════════════
+#  ОТСТАВАНИЕ
+# ════════════════════════════════════════════════════════
+
+def replica_lag():
+    """Отставание реплики в секундах (0 — догнала); None — реплика недоступна."""
+    from .models import ChangeCounter
+
+    try:
+        primary = {name: (value, stamp) for name, value, stamp in
+                   ChangeCounter.objects.using(DEFAULT_DB_ALIAS).values_list('name', 'value', 'updated_at')}
+        replica = {name: (value, stamp) for name, value, stamp in
+                   ChangeCounter.objects.using(REPLICA).values_list('name', 'value', 'updated_at')}
+    except DatabaseError:
+        return None
+    lag = 0
+    for name, (value, stamp) in primary.items():
+        if name not in replica:
+            return None
+        seen_value, seen_stamp = replica[name]
+        if seen_value < value:
+            # Не дошли записи, сделанные после последней дошедшей: оценка сверху
+            lag = max(lag, (timezone.now() - seen_stamp).total_seconds())
+    return lag
+
+
+def reset_health():
+    """Забыть результат проверки (после sync_replica и в тестах)."""
+    with _health_lock:
+        _health.update(checked=None, lag=None)
+
+
+def replica_ready():
+    """Можно ли сейчас читать с реплики (результат проверки живёт LAG_CHECK_INTERVAL секунд)."""
+    if not getattr(settings, 'REPLICA_READS', False) or REPLICA not in connections.settings:
+        return False
+    with _health_lock:
+        now = time.monotonic()
+        if _health['checked'] is None or now - _health['checked'] >= LAG_CHECK_INTERVAL:
+            _health.update(checked=now, lag=replica_lag())
+        lag = _health['lag']
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG
+
+
+# ════════════════════════════════════════════════════════
+#  МАРШРУТИЗАЦИЯ
+# ════════════════════════════════════════════════════════
+
+class ReplicaRouter:
+    """settings.DATABASE_ROUTERS: чтение внутри use_replica() — с реплики, остальное — с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        if _reads.get() and replica_ready():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Данные одни и те же: объект с реплики можно связывать с объектом основной базы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+@contextmanager
+def use_replica():
+    """Чтение с реплики в блоке (команды, фоновые задачи, потоковые ответы)."""
+    previous = _reads.get()
+    # set(previous), а не reset(token): генератор потокового ответа закрывается в другом контексте
+    _reads.set(True)
+    try:
+        yield
+    finally:
+        _reads.set(previous)
+
+
+@contextmanager
+def use_primary():
+    """Чтение с основной базы в блоке, даже внутри use_replica() (данные для последующей записи)."""
+    previous = _reads.get()
+    _reads.set(False)
+    try:
+        yield
+    finally:
+        _reads.set(previous)
+
+
+def pinned_to_primary(request):
+    value = request.COOKIES.get(STICKY_COOKIE, '')
+    return value.isdigit() and int(value) > time.time()
+
+
+def _streamed(content):
+    with use_replica():
+        yield from content
+
+
+def replica_view(view_func):
+    """
+    Декоратор view только для чтения: запросы — с реплики, если пользователь
+    не писал последние REPLICA_STICKY_SECONDS секунд. Потоковый ответ
+    (выгрузки) читает с реплики и во время отдачи.
+    """
+    def finish(response):
+        if getattr(response, 'streaming', False) and not response.is_async:
+            response.streaming_content = _streamed(response.streaming_content)
+        return response
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if pinned_to_primary(request):
+                return await view_func(request, *args, **kwargs)
+            with use_replica():
+                return finish(await view_func(request, *args, **kwargs))
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if pinned_to_primary(request):
+            return view_func(request, *args, **kwargs)
+        with use_replica():
+            return finish(view_func(request, *args, **kwargs))
+    return wrapper
+
+
+@sync_and_async_middleware
+def primary_after_write_middleware(get_response):
+    """После записи (не безопасный метод) — cookie: следующие запросы читают с основной базы."""
+    def mark(request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, str(int(time.time()) + seconds), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return mark(request, await get_response(request))
+    else:
+        def middleware(request):
+            return mark(request, get_response(request))
+    return middleware
@@ -5,6 +5,23 @@ from core.mixins import get_user_role, is_admin, is_controller
 register = template.Library()
 
 
+def _current_url_name(request):
+    """Имя текущего URL: берётся из request.resolver_match, resolve() — только вне view."""
+    cached = getattr(request, '_nav_url_name', None)
+    if cached is None:
+        match = request.resolver_match
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                match = None
+        cached = '' if match is None else (
+            f"{match.app_name}:{match.url_name}" if match.app_name else (match.url_name or '')
+        )
+        request._nav_url_name = cached
+    return cached
+
+
 @register.simple_tag(takes_context=True)
 def nav_active(context, *url_names):
     """
@@ -16,16 +33,14 @@ def nav_active(context, *url_names):
     request = context.get('request')
     if not request:
         return ''
-    try:
-        match = resolve(request.path_info)
-        current = f"{match.app_name}:{match.url_name}" if match.app_name else match.url_name
-        for name in url_names:
-            if current == name or request.path_info.startswith(
-                '/' + name.replace(':', '/').split('/')[0] + '/'
-            ):
-                return 'nav-item--active'
-    except Resolver404:
-        pass
+    current = _current_url_name(request)
+    if not current:
+        return ''
+    for name in url_names:
+        if current == name or request.path_info.startswith(
+            '/' + name.replace(':', '/').split('/')[0] + '/'
+        ):
+            return 'nav-item--active'
     return ''
 
 
@@ -1,9 +1,326 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 
+from core.replica import reset_health, use_replica
+
 
 class CoreAccessTests(TestCase):
     def test_dashboard_requires_login(self):
         response = self.client.get(reverse('core:dashboard'))
         self.assertEqual(response.status_code, 302)
         self.assertIn('/login/', response.url)
+
+
+class AsyncDashboardTests(TestCase):
+    async def test_dashboard_under_asgi(self):
+        from django.contrib.auth import get_user_model
+
+        user = await get_user_model().objects.acreate_user(username='staff', password='pass123', is_staff=True)
+        await self.async_client.aforce_login(user)
+        await self.async_client.get(reverse('core:dashboard'))   # ставит CSRF-cookie, она входит в ETag
+        response = await self.async_client.get(reverse('core:dashboard'))
+        self.assertContains(response, 'Дашборд')
+        # Повторный запрос с ETag — 304 без рендеринга
+        response = await self.async_client.get(reverse('core:dashboard'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+class ReferenceDataCacheTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_snapshot_is_reused_until_reference_change(self):
+        from core.refcache import get_reference_data
+        from task_control.models import Department
+
+        first = get_reference_data()
+        with self.assertNumQueries(0):
+            self.assertIs(get_reference_data(), first)
+
+        Department.objects.create(name='Цех №1')
+        second = get_reference_data()
+
+        self.assertIsNot(second, first)
+        self.assertEqual([d['name'] for d in second.departments], ['Цех №1'])
+
+    def test_active_employees_ordered_by_department(self):
+        from core.refcache import get_reference_data
+        from task_control.models import Department, Employee
+
+        dept = Department.objects.create(name='Отдел ИТ')
+        emp = Employee.objects.create(last_name='Иванов', first_name='Иван', department=dept)
+        Employee.objects.create(last_name='Уволенный', first_name='Пётр', is_active=False)
+
+        ref = get_reference_data()
+
+        self.assertEqual([e['id'] for e in ref.employees_by_dept], [emp.pk])
+        self.assertEqual(ref.employees_by_dept[0]['label'], str(emp))
+
+    def test_assignment_save_bumps_version_only_for_new_people(self):
+        from datetime import date
+        from core.refcache import get_reference_data, get_version
+        from task_control.models import Assignment, AssignmentType, Employee
+
+        emp = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        kind = AssignmentType.objects.create(name='Приказ')
+        fields = dict(assignment_type=kind, issue_date=date.today(), deadline=date.today(),
+                      description='Тест', executor=emp, controller=emp)
+        Assignment.objects.create(document_number='1', **fields)
+        get_reference_data()
+        version = get_version()
+
+        Assignment.objects.create(document_number='2', **fields)
+        self.assertEqual(get_version(), version)
+
+        other = Employee.objects.create(last_name='Петров', first_name='Пётр')
+        get_reference_data()
+        version = get_version()
+        Assignment.objects.create(document_number='3', **dict(fields, executor=other))
+        self.assertNotEqual(get_version(), version)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth import get_user_model
+        from task_control.models import Assignment, AssignmentType, Employee
+
+        user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.client.force_login(user)
+
+        emp = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        self.assignment = Assignment.objects.create(
+            assignment_type=AssignmentType.objects.create(name='Приказ'),
+            document_number='1', issue_date=date.today(),
+            deadline=date.today() - timedelta(days=1),
+            description='Тест', executor=emp, controller=emp,
+        )
+        self.url = reverse('assignments:detail', args=[self.assignment.pk])
+
+    def test_unchanged_page_answers_304(self):
+        self.client.get(self.url)  # получаем CSRF-cookie, как браузер при первом визите
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.has_header('ETag'))
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+
+    def test_queryset_update_changes_validator(self):
+        from task_control.models import Assignment
+
+        etag = self.client.get(self.url)['ETag']
+        Assignment.objects.filter(pk=self.assignment.pk).update(status='OVERDUE')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class UserRoleTests(TestCase):
+    def test_groups_are_loaded_once_per_user_object(self):
+        from django.contrib.auth.models import Group, User
+        from core.mixins import ROLE_CONTROLLER, get_user_role, is_admin, is_controller
+
+        user = User.objects.create_user(username='controller', password='x', is_staff=True)
+        user.groups.add(Group.objects.create(name=ROLE_CONTROLLER))
+        user = User.objects.get(pk=user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_role(user), ROLE_CONTROLLER)
+            self.assertFalse(is_admin(user))
+            self.assertTrue(is_controller(user))
+
+    def test_sidebar_marks_current_page(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_user(username='staff', password='x', is_staff=True))
+        for name in ('jobs:list', 'references:departments'):
+            response = self.client.get(reverse(name))
+            self.assertContains(
+                response, f'href="{reverse(name)}" class="nav-item nav-item--active"', html=False,
+            )
+
+
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        from datetime import date, timedelta
+        from django.contrib.auth import get_user_model
+        from task_control.models import AssignmentType, Employee
+
+        self.user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        emp = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        self.fields = dict(
+            assignment_type=AssignmentType.objects.create(name='Приказ'), issue_date=date.today(),
+            deadline=date.today() + timedelta(days=3), description='Тест', executor=emp, controller=emp,
+        )
+
+    def test_broker_publishes_changed_ids_and_kpi_delta(self):
+        from core.live import Broker
+        from task_control.models import Assignment
+
+        broker = Broker()
+        self.assertIsNone(broker._poll())   # первый опрос — точка отсчёта
+        self.assertIsNone(broker._poll())   # без изменений — ни одного события
+
+        # Журнал пишется в транзакции изменения — опрос видит его без on_commit
+        first = Assignment.objects.create(document_number='1', **self.fields)
+        second = Assignment.objects.create(document_number='2', **self.fields)
+        data = broker._poll()
+        self.assertEqual(data['created'], [first.pk, second.pk])
+        self.assertEqual(data['delta'], {'active': 2, 'week': 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(pk=first.pk).update(status='DONE')
+            deleted = second.pk
+            second.delete()
+        data = broker._poll()
+        self.assertEqual((data['updated'], data['deleted']), ([first.pk], [deleted]))
+        self.assertEqual(data['kpi']['active'], 0)
+        self.assertEqual(data['seq'], broker.seq)
+
+    def test_endpoint_requires_staff_and_asgi(self):
+        url = reverse('core:events')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.user)
+        # Под WSGI поток не открывается
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+    async def test_stream_starts_with_retry_and_replays_missed_changes(self):
+        from core import live
+
+        stream = live.stream(since=0)
+        self.assertTrue((await anext(stream)).startswith('retry:'))
+        await stream.aclose()
+        live.broker().task.cancel()
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('core:events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        live.broker().task.cancel()
+
+
+@override_settings(REPLICA_READS=True, REPLICA_MAX_LAG=30)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Локальная реплика — вторая база SQLite, обновляемая sync_replica."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from task_control.models import Department
+
+        Department.objects.create(name='Цех №1')
+        call_command('sync_replica', stdout=StringIO())
+        # Запись после синхронизации: на реплике её ещё нет
+        Department.objects.create(name='Цех №2')
+        reset_health()
+
+    def tearDown(self):
+        reset_health()
+
+    def test_reads_follow_replica_until_lag_exceeds_limit(self):
+        from task_control.models import Department
+
+        self.assertEqual(Department.objects.count(), 2)
+        with use_replica():
+            self.assertEqual(Department.objects.count(), 1)
+            Department.objects.create(name='Цех №3')   # запись — всегда на основную базу
+        self.assertEqual(Department.objects.count(), 3)
+
+        reset_health()
+        with self.settings(REPLICA_MAX_LAG=0), use_replica():
+            self.assertEqual(Department.objects.count(), 3)
+
+    def test_workload_reconcile_reads_primary(self):
+        from datetime import date
+        from io import StringIO
+        from django.core.management import call_command
+        from task_control import workload
+        from task_control.models import Assignment, AssignmentType, Employee, WorkloadCounter
+
+        emp = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        fields = dict(assignment_type=AssignmentType.objects.create(name='Приказ'), issue_date=date.today(),
+                      deadline=date.today(), description='Тест', executor=emp, controller=emp)
+        Assignment.objects.create(document_number='1', **fields)
+        call_command('sync_replica', stdout=StringIO())
+        reset_health()
+        # Второго поручения нет на реплике; сверка из дашборда (@replica_view) должна его учесть
+        Assignment.objects.create(document_number='2', **fields)
+        WorkloadCounter.objects.update(day=date(2000, 1, 1), total=0)
+        with use_replica():
+            self.assertEqual(Assignment.objects.count(), 1)
+            rows = workload.counters(WorkloadCounter.Scope.EMPLOYEE)
+        self.assertEqual(rows[emp.pk].total, 2)
+        self.assertEqual(WorkloadCounter.objects.get(scope='employee', object_id=emp.pk).total, 2)
+
+    def test_rollup_reads_primary(self):
+        from datetime import date
+        from io import StringIO
+        from django.core.management import call_command
+        from analytics.models import StatusSnapshot
+        from analytics.rollup import rollup_day
+        from task_control.models import Assignment, AssignmentType, Employee
+
+        emp = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        fields = dict(assignment_type=AssignmentType.objects.create(name='Приказ'), issue_date=date.today(),
+                      deadline=date.today(), description='Тест', executor=emp, controller=emp)
+        Assignment.objects.create(document_number='1', **fields)
+        call_command('sync_replica', stdout=StringIO())
+        reset_health()
+        Assignment.objects.create(document_number='2', **fields)
+        with use_replica():
+            self.assertEqual(Assignment.objects.count(), 1)
+            rollup_day()
+        self.assertEqual(sum(StatusSnapshot.objects.values_list('count', flat=True)), 2)
+
+    def test_view_reads_primary_after_own_write(self):
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from core.replica import STICKY_COOKIE, primary_after_write_middleware, replica_view
+        from task_control.models import Department
+
+        @replica_view
+        def view(request):
+            return HttpResponse(str(Department.objects.count()))
+
+        middleware = primary_after_write_middleware(lambda request: HttpResponse())
+        self.assertNotIn(STICKY_COOKIE, middleware(RequestFactory().get('/')).cookies)
+        cookie = middleware(RequestFactory().post('/')).cookies[STICKY_COOKIE]
+
+        request = RequestFactory().get('/')
+        self.assertEqual(view(request).content, b'1')
+        request.COOKIES[STICKY_COOKIE] = cookie.value
+        self.assertEqual(view(request).content, b'2')
+
+
+@override_settings(ASYNC_DB_WORKERS=2)
+class AsyncGatherTests(TransactionTestCase):
+    """Вне транзакции gather() выполняет блоки в ограниченном пуле с постоянными соединениями."""
+
+    def tearDown(self):
+        from core import asyncdb
+
+        asyncdb.shutdown()
+
+    async def test_blocks_share_bounded_pool_and_connections(self):
+        import threading
+        from django.db import connection
+        from core import asyncdb
+        from task_control.models import Department
+
+        await Department.objects.acreate(name='Цех №1')
+
+        def block():
+            count = Department.objects.count()
+            return threading.current_thread().name, id(connection.connection), count
+
+        first = await asyncdb.gather(*[block] * 6)
+        second = await asyncdb.gather(*[block] * 6)
+
+        self.assertEqual({count for _, _, count in first + second}, {1})
+        threads = {name for name, _, _ in first + second}
+        self.assertLessEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('asyncdb') for name in threads))
+        # Соединения не открываются заново на каждый блок
+        self.assertLessEqual(len({conn for _, conn, _ in first + second}), 2)
@@ -9,5 +9,6 @@ urlpatterns = [
     path('logout/',         views.logout_view,         name='logout'),
     path('forbidden/',      views.forbidden_view,      name='forbidden'),
     path('check-overdue/',  views.check_overdue_view,  name='check_overdue'),
+    path('events/',         views.live_events,         name='events'),
 
 ]
\ No newline at end of file
@@ -1,3 +1,5 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
@@ -6,9 +8,20 @@ from django.utils import timezone
 from django.db.models import Count, Q
 from django.urls import reverse
 from datetime import timedelta, date
+from functools import partial
 import json
 
+from asgiref.sync import sync_to_async
+
+from analytics.risk import THRESHOLD as RISK_THRESHOLD
+from task_control import workload
+from task_control.models import Assignment, Employee, StatusTransition, WorkloadCounter
+
+from . import asyncdb, live
+from .conditional import ASSIGNMENTS, REFDATA, conditional_page
 from .mixins import staff_required
+from .replica import replica_view
+from .refcache import get_reference_data
 
 
 @require_http_methods(['GET', 'POST'])
@@ -43,37 +56,26 @@ def forbidden_view(request):
     return render(request, 'core/forbidden.html', status=403)
 
 
-@staff_required
-def dashboard_view(request):
-    from task_control.models import Assignment, Employee, Department
-
-    today = timezone.now().date()
-    week_end = today + timedelta(days=7)
-    month_start = today.replace(day=1)
-
-    # ── KPI-карточки ────────────────────────────────────────
-    active_qs = Assignment.objects.exclude(status='DONE')
-
-    kpi = {
-        'active':    active_qs.count(),
-        'overdue':   active_qs.filter(status='OVERDUE').count(),
-        'today':     active_qs.filter(deadline=today).count(),
-        'week':      active_qs.filter(deadline__gt=today, deadline__lte=week_end).count(),
-        'done_month': Assignment.objects.filter(
-            status='DONE',
-            updated_at__date__gte=month_start
-        ).count(),
-        'total_employees': Employee.objects.filter(is_active=True).count(),
-    }
+async def live_events(request):
+    """Поток server-sent events об изменениях поручений (core.live)."""
+    user = await request.auser()
+    if not (user.is_authenticated and user.is_staff):
+        return HttpResponseForbidden()
+    if not isinstance(request, ASGIRequest):
+        # Под WSGI бесконечный поток занял бы рабочий процесс: 204 — браузер не переподключается
+        return HttpResponse(status=204)
+    since = request.headers.get('Last-Event-ID', '')
+    response = StreamingHttpResponse(
+        live.stream(int(since) if since.isdigit() else None), content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx: не буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-    # ── Горящие поручения (просрочено + срок сегодня/завтра) ─
-    urgent = Assignment.objects.filter(
-        Q(status='OVERDUE') | Q(deadline__lte=today + timedelta(days=1), status__in=['NEW', 'IN_PROGRESS'])
-    ).select_related(
-        'executor', 'executor__department', 'assignment_type', 'controller'
-    ).order_by('deadline')
 
-    # ── График 1: Динамика по месяцам (последние 6) ──────────
+def _chart_monthly(today):
+    """Динамика по месяцам (последние 6)."""
     months_labels = []
     months_issued = []
     months_done   = []
@@ -93,9 +95,7 @@ def dashboard_view(request):
             Assignment.objects.filter(issue_date__gte=m_start, issue_date__lte=m_end).count()
         )
         months_done.append(
-            Assignment.objects.filter(
-                status='DONE', updated_at__date__gte=m_start, updated_at__date__lte=m_end
-            ).count()
+            StatusTransition.objects.completions(m_start, m_end).values('assignment').distinct().count()
         )
         months_overdue.append(
             Assignment.objects.filter(
@@ -103,55 +103,86 @@ def dashboard_view(request):
             ).count()
         )
 
-    chart_monthly = {
+    return {
         'labels':  months_labels,
         'issued':  months_issued,
         'done':    months_done,
         'overdue': months_overdue,
     }
 
-    # ── График 2: Нагрузка по исполнителям (топ 8) ───────────
-    top_executors = (
-        active_qs
-        .values('executor__last_name', 'executor__first_name')
-        .annotate(cnt=Count('id'))
-        .order_by('-cnt')[:8]
+
+def _chart_executors():
+    """Нагрузка по исполнителям (топ 8) — по счётчикам нагрузки."""
+    top_executors = sorted(
+        (c for c in workload.counters(WorkloadCounter.Scope.EMPLOYEE).values() if c.active),
+        key=lambda c: -c.active,
+    )[:8]
+    names = dict(
+        (pk, f"{last} {first[:1]}.") for pk, last, first in
+        Employee.objects.filter(pk__in=[c.object_id for c in top_executors])
+        .values_list('id', 'last_name', 'first_name')
     )
-    chart_executors = {
-        'labels': [
-            f"{e['executor__last_name']} {e['executor__first_name'][:1]}."
-            for e in top_executors
-        ],
-        'values': [e['cnt'] for e in top_executors],
+    return {
+        'labels': [names.get(c.object_id, '—') for c in top_executors],
+        'values': [c.active for c in top_executors],
     }
 
-    # ── График 3: По подразделениям ───────────────────────────
-    by_dept = (
-        active_qs
-        .values('executor__department__name')
-        .annotate(cnt=Count('id'))
-        .order_by('-cnt')[:8]
-    )
-    chart_departments = {
-        'labels': [d['executor__department__name'] or 'Без подразд.' for d in by_dept],
-        'values': [d['cnt'] for d in by_dept],
+
+def _chart_departments():
+    dept_names = {d['id']: d['name'] for d in get_reference_data().departments}
+    by_dept = sorted(
+        (c for c in workload.counters(WorkloadCounter.Scope.DEPARTMENT).values() if c.active),
+        key=lambda c: -c.active,
+    )[:8]
+    return {
+        'labels': [dept_names.get(c.object_id, 'Без подразд.') for c in by_dept],
+        'values': [c.active for c in by_dept],
     }
 
-    # ── График 4: Распределение по статусам (donut) ───────────
+
+def _chart_statuses():
+    """Распределение по статусам (donut)."""
     by_status = (
         Assignment.objects.values('status')
         .annotate(cnt=Count('id'))
     )
     status_map = {'NEW': 'Новое', 'IN_PROGRESS': 'В работе', 'OVERDUE': 'Просрочено', 'DONE': 'Исполнено'}
-    chart_statuses = {
+    return {
         'labels': [status_map.get(s['status'], s['status']) for s in by_status],
         'values': [s['cnt'] for s in by_status],
     }
 
+
+@staff_required
+@replica_view
+@conditional_page(ASSIGNMENTS, REFDATA)
+async def dashboard_view(request):
+    today = timezone.now().date()
+    week_end = today + timedelta(days=7)
+
+    # ── KPI-карточки (те же числа шлёт поток core:events) и графики — одновременно ──
+    kpi, chart_monthly, chart_executors, chart_departments, chart_statuses = await asyncdb.gather(
+        partial(live.dashboard_kpi, today),
+        partial(_chart_monthly, today),
+        _chart_executors,
+        _chart_departments,
+        _chart_statuses,
+    )
+
+    # ── Горящие поручения (просрочено + срок сегодня/завтра + высокий риск на ближайшие 2 недели) ─
+    urgent = [task async for task in Assignment.objects.filter(
+        Q(status='OVERDUE')
+        | Q(deadline__lte=today + timedelta(days=1), status__in=['NEW', 'IN_PROGRESS'])
+        | Q(deadline__lte=today + timedelta(days=14), risk_score__gte=RISK_THRESHOLD,
+            status__in=['NEW', 'IN_PROGRESS'])
+    ).select_related(
+        'executor', 'executor__department', 'assignment_type', 'controller'
+    ).order_by('deadline')]
+
     # ── Последние поручения ───────────────────────────────────
-    recent = Assignment.objects.select_related(
+    recent = [task async for task in Assignment.objects.select_related(
         'executor', 'assignment_type'
-    ).order_by('-created_at')[:8]
+    ).order_by('-created_at')[:8]]
 
     kpi_links = {
         'active': f"{reverse('assignments:list')}?status=active",
@@ -162,10 +193,12 @@ def dashboard_view(request):
         'employees': reverse('references:departments'),
     }
 
-    return render(request, 'core/dashboard.html', {
+    return await sync_to_async(render)(request, 'core/dashboard.html', {
         'kpi':               kpi,
         'kpi_links':         kpi_links,
         'urgent':            urgent,
+        'risk_threshold':    RISK_THRESHOLD,
+        'risk_link':         f"{reverse('assignments:list')}?status=active&sort=-risk",
         'recent':            recent,
         'today':             today,
         'updated_at':        timezone.now(),
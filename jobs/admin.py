@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'title', 'status', 'priority', 'progress_current', 'progress_total',
+                    'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('title', 'kind')
+    readonly_fields = ('worker', 'started_at', 'heartbeat_at', 'finished_at', 'created_at')
@@ -0,0 +1,63 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import runner
+
+
+def _install_stop_handlers(stop):
+    def handler(signum, frame):
+        stop.set()
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
+def _worker_main(poll_interval, once):
+    stop = threading.Event()
+    _install_stop_handlers(stop)
+    runner.work(runner.worker_name(), stop, poll_interval, once)
+
+
+class Command(BaseCommand):
+    help = ('Воркер фоновых задач (импорт, выгрузки, массовые операции). '
+            'Текущая задача дорабатывается до конца после SIGTERM / Ctrl+C.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Число процессов-воркеров')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Пауза между проверками пустой очереди, секунд')
+        parser.add_argument('--once', action='store_true', help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, workers, poll_interval, once, **options):
+        failed = runner.fail_stale()
+        if failed:
+            self.stdout.write(self.style.WARNING(f'Задач с остановившимся воркером: {failed}'))
+
+        if workers <= 1:
+            self.stdout.write(f'Воркер {runner.worker_name()} запущен')
+            _worker_main(poll_interval, once)
+            return
+
+        # Соединения с базой не должны наследоваться дочерними процессами
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_worker_main, args=(poll_interval, once), daemon=False)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Запущено воркеров: {workers}')
+
+        stop = threading.Event()
+        _install_stop_handlers(stop)
+        while any(process.is_alive() for process in processes):
+            if stop.wait(1):
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()   # SIGTERM: воркер завершит текущую задачу
+                break
+        for process in processes:
+            process.join()
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(db_index=True, max_length=60, verbose_name='Тип')),
+                ('title', models.CharField(blank=True, max_length=200, verbose_name='Описание')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('status', models.CharField(choices=[('QUEUED', 'В очереди'), ('RUNNING', 'Выполняется'), ('DONE', 'Завершена'), ('FAILED', 'Ошибка'), ('CANCELLED', 'Отменена')], default='QUEUED', max_length=10, verbose_name='Состояние')),
+                ('cancel_requested', models.BooleanField(default=False, verbose_name='Запрошена отмена')),
+                ('progress_current', models.PositiveIntegerField(default=0, verbose_name='Выполнено')),
+                ('progress_total', models.PositiveIntegerField(default=0, verbose_name='Всего')),
+                ('message', models.CharField(blank=True, max_length=255, verbose_name='Этап')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='Результат')),
+                ('artifact', models.CharField(blank=True, max_length=255, verbose_name='Файл результата')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Воркер')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Запустил')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', '-priority', 'created_at'], name='job_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import models
+
+
+class Job(models.Model):
+    """
+    Фоновая задача: импорт, выгрузка, массовая операция.
+
+    Задачи ставятся в очередь (jobs.runner.enqueue) и выполняются
+    воркерами manage.py runjobs. Выполняемый код регистрируется по типу
+    (kind) в jobs.registry.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED    = 'QUEUED',    'В очереди'
+        RUNNING   = 'RUNNING',   'Выполняется'
+        DONE      = 'DONE',      'Завершена'
+        FAILED    = 'FAILED',    'Ошибка'
+        CANCELLED = 'CANCELLED', 'Отменена'
+
+    FINISHED = (Status.DONE, Status.FAILED, Status.CANCELLED)
+
+    kind             = models.CharField(max_length=60, db_index=True, verbose_name="Тип")
+    title            = models.CharField(max_length=200, blank=True, verbose_name="Описание")
+    params           = models.JSONField(default=dict, blank=True, verbose_name="Параметры")
+    priority         = models.SmallIntegerField(default=0, verbose_name="Приоритет")
+    status           = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED,
+                                        verbose_name="Состояние")
+    cancel_requested = models.BooleanField(default=False, verbose_name="Запрошена отмена")
+
+    progress_current = models.PositiveIntegerField(default=0, verbose_name="Выполнено")
+    progress_total   = models.PositiveIntegerField(default=0, verbose_name="Всего")
+    message          = models.CharField(max_length=255, blank=True, verbose_name="Этап")
+    result           = models.JSONField(default=dict, blank=True, verbose_name="Результат")
+    artifact         = models.CharField(max_length=255, blank=True, verbose_name="Файл результата")
+    error            = models.TextField(blank=True, verbose_name="Ошибка")
+
+    worker       = models.CharField(max_length=100, blank=True, verbose_name="Воркер")
+    created_by   = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                                     null=True, blank=True, verbose_name="Запустил")
+    created_at   = models.DateTimeField(auto_now_add=True)
+    started_at   = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        ordering = ['-created_at']
+        indexes = [
+            # Выбор следующей задачи воркером
+            models.Index(fields=['status', '-priority', 'created_at'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title or self.kind} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
+
+    @property
+    def percent(self):
+        if self.status == self.Status.DONE:
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, round(self.progress_current * 100 / self.progress_total))
+
+    @property
+    def artifact_name(self):
+        return self.artifact.rsplit('/', 1)[-1]
@@ -0,0 +1,42 @@
+"""
+Реестр типов фоновых задач.
+
+Приложения объявляют задачи в своём модуле tasks.py (загружается
+автоматически при старте, см. JobsConfig.ready):
+
+    @register('assignments.export', 'Выгрузка поручений', concurrency=2)
+    def export_assignments(ctx):
+        ...
+        return {'rows': n}
+
+Функция получает jobs.runner.JobContext; возвращённый словарь
+сохраняется в Job.result.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+_registry = {}
+
+
+@dataclass(frozen=True)
+class JobType:
+    kind:        str
+    func:        Callable
+    label:       str
+    concurrency: int = 1   # сколько задач типа выполняется одновременно
+    priority:    int = 0   # приоритет по умолчанию; выше — раньше
+
+
+def register(kind, label, concurrency=1, priority=0):
+    def decorator(func):
+        _registry[kind] = JobType(kind, func, label, concurrency, priority)
+        return func
+    return decorator
+
+
+def get(kind):
+    return _registry.get(kind)
+
+
+def all_types():
+    return sorted(_registry.values(), key=lambda job_type: job_type.label)
@@ -0,0 +1,311 @@
+"""
+Очередь фоновых задач в базе данных.
+
+enqueue() создаёт Job в состоянии QUEUED в транзакции вызывающего кода:
+воркер увидит задачу только вместе с данными, для которых она поставлена.
+Воркер (manage.py runjobs) забирает задачи по приоритету и времени
+постановки: захват — условный UPDATE ... WHERE status='QUEUED', поэтому
+одну задачу не возьмут два воркера. Ограничение JobType.concurrency
+проверяется при захвате.
+
+Пока задача выполняется, отдельный поток воркера обновляет heartbeat_at;
+задачи с давно не обновлявшимся heartbeat (воркер убит) при старте
+воркера помечаются ошибкой — повторно они не запускаются, чтобы не
+разослать уведомления дважды.
+
+При settings.JOBS_EAGER = True задачи выполняются в том же процессе
+сразу после фиксации транзакции enqueue() (тесты, разработка без воркера).
+"""
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import registry
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL  = 1.0   # секунд между записями прогресса в базу
+HEARTBEAT_INTERVAL = 30    # секунд
+CLAIM_BATCH        = 50
+
+
+class Cancelled(Exception):
+    """Задача отменена пользователем (бросается из JobContext.progress)."""
+
+    def __init__(self, message='Задача отменена пользователем'):
+        super().__init__(message)
+
+
+def artifacts_dir():
+    return Path(settings.JOBS_ARTIFACTS_DIR)
+
+
+def artifact_path(name):
+    """Абсолютный путь к файлу задачи по относительному имени из Job.artifact / params."""
+    root = artifacts_dir().resolve()
+    path = (root / name).resolve()
+    if root not in path.parents:
+        raise ValueError(f'Недопустимый путь: {name}')
+    return path
+
+
+class JobContext:
+    """То, что получает функция задачи: параметры, прогресс, файл результата."""
+
+    def __init__(self, job):
+        self.job = job
+        self.params = job.params
+        self.current = job.progress_current
+        self.total = job.progress_total
+        self._written_at = 0.0
+
+    def progress(self, current=None, total=None, message=None, force=False):
+        """
+        Записывает прогресс (не чаще раза в PROGRESS_INTERVAL) и проверяет
+        отмену: если пользователь отменил задачу, бросает Cancelled.
+        """
+        if current is not None:
+            self.current = current
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if not force and message is None and now - self._written_at < PROGRESS_INTERVAL:
+            return
+        self._written_at = now
+
+        fields = {'progress_current': self.current, 'progress_total': self.total}
+        if message is not None:
+            fields['message'] = message[:255]
+        Job.objects.filter(pk=self.job.pk).update(**fields)
+        if Job.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise Cancelled()
+
+    def artifact(self, filename):
+        """
+        Путь для файла результата (каталог создаётся); после успешного
+        выполнения файл можно скачать со страницы задач.
+        """
+        name = f'{self.job.pk}/{Path(filename).name}'
+        path = artifact_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.job.artifact = name
+        Job.objects.filter(pk=self.job.pk).update(artifact=name)
+        return path
+
+    def input_path(self, param='file'):
+        """Путь к загруженному файлу из params[param] (см. save_upload)."""
+        return artifact_path(self.params[param])
+
+
+def save_uploads(files):
+    """
+    Сохраняет загруженные файлы в новую папку; возвращает её имя для params
+    (задача читает папку через JobContext.input_path и удаляет после себя).
+    """
+    name = f'uploads/{os.urandom(6).hex()}'
+    directory = artifact_path(name)
+    directory.mkdir(parents=True)
+    for uploaded in files:
+        with open(directory / Path(uploaded.name).name, 'wb') as f:
+            for chunk in uploaded.chunks():
+                f.write(chunk)
+    return name
+
+
+def save_upload(uploaded):
+    """Один загруженный файл; возвращает имя файла для params."""
+    return f'{save_uploads([uploaded])}/{Path(uploaded.name).name}'
+
+
+# ════════════════════════════════════════════════════════
+#  ПОСТАНОВКА И ОТМЕНА
+# ════════════════════════════════════════════════════════
+
+def enqueue(kind, params=None, user=None, title='', priority=None):
+    job_type = registry.get(kind)
+    if job_type is None:
+        raise LookupError(f'Неизвестный тип задачи: {kind}')
+    job = Job.objects.create(
+        kind=kind,
+        title=title or job_type.label,
+        params=params or {},
+        priority=job_type.priority if priority is None else priority,
+        created_by=user if getattr(user, 'is_authenticated', False) else None,
+    )
+    if getattr(settings, 'JOBS_EAGER', False):
+        # Как и воркер, задача должна видеть данные вызывающего кода —
+        # выполняем её после фиксации транзакции, при откате не выполняем
+        transaction.on_commit(lambda: _run_eager(job))
+    return job
+
+
+def _run_eager(job):
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.Status.RUNNING, worker='eager', started_at=timezone.now(),
+    )
+    job.refresh_from_db()
+    execute(job)
+    job.refresh_from_db()
+
+
+def cancel(job):
+    """Задача из очереди отменяется сразу, выполняемая — на ближайшем progress()."""
+    now = timezone.now()
+    if Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+        status=Job.Status.CANCELLED, cancel_requested=True, finished_at=now,
+    ):
+        return True
+    return bool(Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING).update(cancel_requested=True))
+
+
+# ════════════════════════════════════════════════════════
+#  ВОРКЕР
+# ════════════════════════════════════════════════════════
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim(worker):
+    """Следующая задача для воркера (уже в состоянии RUNNING) или None."""
+    running = dict(
+        Job.objects.filter(status=Job.Status.RUNNING)
+        .order_by().values('kind').annotate(n=Count('id')).values_list('kind', 'n')
+    )
+    candidates = (
+        Job.objects.filter(status=Job.Status.QUEUED)
+        .order_by('-priority', 'created_at')
+        .values_list('pk', 'kind')[:CLAIM_BATCH]
+    )
+    for pk, kind in candidates:
+        job_type = registry.get(kind)
+        if job_type is None or running.get(kind, 0) >= job_type.concurrency:
+            continue
+        now = timezone.now()
+        if not Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, worker=worker, started_at=now, heartbeat_at=now,
+        ):
+            continue   # забрал другой воркер
+        # Два воркера могли одновременно занять последний слот — лишний возвращает задачу
+        if Job.objects.filter(kind=kind, status=Job.Status.RUNNING).count() > job_type.concurrency:
+            Job.objects.filter(pk=pk, worker=worker).update(
+                status=Job.Status.QUEUED, worker='', started_at=None, heartbeat_at=None,
+            )
+            running[kind] = job_type.concurrency
+            continue
+        return Job.objects.get(pk=pk)
+    return None
+
+
+def _heartbeat(job_id, stop):
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        try:
+            Job.objects.filter(pk=job_id).update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception('Heartbeat for job %s failed', job_id)
+    close_old_connections()
+
+
+def execute(job):
+    """Выполняет захваченную задачу и записывает итог."""
+    job_type = registry.get(job.kind)
+    ctx = JobContext(job)
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job.pk, stop), daemon=True)
+    beat.start()
+    fields = {}
+    try:
+        if job_type is None:
+            raise LookupError(f'Неизвестный тип задачи: {job.kind}')
+        result = job_type.func(ctx)
+    except Cancelled:
+        status = Job.Status.CANCELLED
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        status = Job.Status.FAILED
+        fields['error'] = traceback.format_exc()
+    else:
+        status = Job.Status.DONE
+        fields['result'] = result or {}
+    finally:
+        stop.set()
+        beat.join()
+
+    Job.objects.filter(pk=job.pk).update(
+        status=status, finished_at=timezone.now(),
+        progress_current=ctx.current, progress_total=ctx.total, **fields,
+    )
+    return status
+
+
+def fail_stale():
+    """Помечает ошибкой задачи, воркер которых перестал отвечать."""
+    limit = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+    return Job.objects.filter(status=Job.Status.RUNNING, heartbeat_at__lt=limit).update(
+        status=Job.Status.FAILED, finished_at=timezone.now(),
+        error='Воркер перестал отвечать во время выполнения задачи.',
+    )
+
+
+def purge():
+    """Удаляет завершённые задачи старше JOBS_KEEP_DAYS вместе с файлами."""
+    limit = timezone.now() - timedelta(days=settings.JOBS_KEEP_DAYS)
+    old = Job.objects.filter(status__in=Job.FINISHED, finished_at__lt=limit)
+    for name in old.exclude(artifact='').values_list('artifact', flat=True):
+        try:
+            artifact_path(name).unlink(missing_ok=True)
+        except (OSError, ValueError):
+            pass
+    deleted, _ = old.delete()
+
+    uploads = artifacts_dir() / 'uploads'
+    if uploads.is_dir():
+        cutoff = limit.timestamp()
+        for path in uploads.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    shutil.rmtree(path)
+            except OSError:
+                pass
+    return deleted
+
+
+def work(worker, stop, poll_interval=2.0, once=False):
+    """
+    Цикл воркера: выполняет задачи, пока не установлен stop (threading.Event).
+    once=True — выйти, когда очередь опустеет. Возвращает число задач.
+    """
+    done = 0
+    purged_at = 0.0
+    while not stop.is_set():
+        close_old_connections()
+        if time.monotonic() - purged_at > 3600:
+            fail_stale()
+            purge()
+            purged_at = time.monotonic()
+
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        logger.info('Job %s (%s) started by %s', job.pk, job.kind, worker)
+        status = execute(job)
+        logger.info('Job %s finished: %s', job.pk, status)
+        done += 1
+    close_old_connections()
+    return done
@@ -0,0 +1,118 @@
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from task_control.models import Assignment, AssignmentType, Employee
+
+from . import registry, runner
+from .models import Job
+
+calls = []
+
+
+@registry.register('tests.limited', 'Тестовая задача', concurrency=1)
+def limited_task(ctx):
+    calls.append(ctx.params.get('n'))
+    return {'n': ctx.params.get('n')}
+
+
+@registry.register('tests.endless', 'Бесконечная задача')
+def endless_task(ctx):
+    for n in range(1000):
+        ctx.progress(n, 1000, force=True)
+
+
+class JobQueueTests(TestCase):
+    def test_claim_respects_priority_and_concurrency(self):
+        low  = runner.enqueue('tests.limited', {'n': 1})
+        high = runner.enqueue('tests.limited', {'n': 2}, priority=5)
+
+        claimed = runner.claim('w1')
+        self.assertEqual(claimed.pk, high.pk)
+        self.assertEqual(claimed.status, Job.Status.RUNNING)
+        # Лимит concurrency=1 занят — вторая задача того же типа ждёт
+        self.assertIsNone(runner.claim('w2'))
+
+        runner.execute(claimed)
+        self.assertEqual(runner.claim('w2').pk, low.pk)
+        self.assertEqual(Job.objects.get(pk=high.pk).result, {'n': 2})
+
+    def test_cancel_running_job(self):
+        job = runner.enqueue('tests.endless')
+        job = runner.claim('w1')
+        self.assertTrue(runner.cancel(job))
+
+        self.assertEqual(runner.execute(job), Job.Status.CANCELLED)
+        job.refresh_from_db()
+        self.assertEqual(job.progress_current, 0)
+
+    def test_queued_job_is_cancelled_immediately(self):
+        job = runner.enqueue('tests.limited')
+        runner.cancel(job)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.Status.CANCELLED)
+        self.assertIsNone(runner.claim('w1'))
+
+
+@override_settings(JOBS_EAGER=True)
+class JobIntegrationTests(TestCase):
+    def setUp(self):
+        artifacts = tempfile.TemporaryDirectory()
+        self.addCleanup(artifacts.cleanup)
+        self.enterContext(override_settings(JOBS_ARTIFACTS_DIR=artifacts.name))
+
+        user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.client.force_login(user)
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        Assignment.objects.create(
+            assignment_type=AssignmentType.objects.create(name='Распоряжение'), document_number='1',
+            issue_date=date.today(), deadline=date.today() + timedelta(days=3),
+            description='Тестовое поручение', executor=executor, controller=executor,
+        )
+
+    def test_eager_job_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                job = runner.enqueue('tests.limited', {'n': 3})
+                self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.status, Job.Status.DONE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                runner.enqueue('tests.limited', {'n': 4})
+                transaction.set_rollback(True)
+        self.assertNotIn(4, calls)
+
+    def test_bulk_operation_runs_as_job(self):
+        from assignments import bulk
+        from assignments.models import SelectionSet
+
+        with self.captureOnCommitCallbacks(execute=True):
+            operation = bulk.start(SelectionSet.from_filters({'status': 'active'}), 'status_done')
+        operation.refresh_from_db()
+        self.assertEqual((operation.status, operation.affected), ('DONE', 1))
+        job = Job.objects.get(kind='assignments.bulk')
+        self.assertEqual((job.status, job.result['affected']), (Job.Status.DONE, 1))
+
+    def test_export_job_artifact_download(self):
+        from assignments.models import SelectionSet
+
+        selection = SelectionSet.from_filters({})
+        with self.captureOnCommitCallbacks(execute=True):
+            job = runner.enqueue('assignments.export', {'selection': selection.token, 'format': 'csv'})
+        self.assertEqual(job.status, Job.Status.DONE)
+
+        response = self.client.get(reverse('jobs:artifact', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2)
+
+        response = self.client.get(reverse('jobs:progress'), {'ids': str(job.pk)})
+        self.assertEqual(response.json()['jobs'][0]['percent'], 100)
+
+        other = get_user_model().objects.create_user(username='user', password='x')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('jobs:artifact', args=[job.pk])).status_code, 302)
@@ -0,0 +1,13 @@
+from django.urls import path
+from . import views
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('',                    views.job_list,     name='list'),
+    path('import/',             views.job_import,   name='import'),
+    path('progress/',           views.job_progress, name='progress'),
+    path('<int:pk>/',           views.job_detail,   name='detail'),
+    path('<int:pk>/cancel/',    views.job_cancel,   name='cancel'),
+    path('<int:pk>/artifact/',  views.job_artifact, name='artifact'),
+]
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+from django.contrib import messages
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
+
+from core.mixins import staff_required
+
+from . import runner
+from .models import Job
+
+JOBS_ON_PAGE = 100
+
+IMPORT_SOURCES = (
+    ('employee',   'Сотрудники'),
+    ('department', 'Подразделения'),
+    ('position',   'Должности'),
+)
+
+
+def _job_state(job):
+    return {
+        'id':        job.pk,
+        'status':    job.status,
+        'label':     job.get_status_display(),
+        'finished':  job.is_finished,
+        'current':   job.progress_current,
+        'total':     job.progress_total,
+        'percent':   job.percent,
+        'message':   job.message,
+        'error':     job.error.strip().splitlines()[-1] if job.error else '',
+        'artifact':  reverse('jobs:artifact', args=[job.pk]) if job.artifact and job.status == Job.Status.DONE else '',
+    }
+
+
+@staff_required
+def job_list(request):
+    status = request.GET.get('status', '')
+    jobs = Job.objects.select_related('created_by').defer('params', 'error')
+    if status in Job.Status.values:
+        jobs = jobs.filter(status=status)
+    jobs = list(jobs[:JOBS_ON_PAGE])
+
+    return render(request, 'jobs/list.html', {
+        'jobs':           jobs,
+        'f_status':       status,
+        'statuses':       Job.Status.choices,
+        'import_sources': IMPORT_SOURCES,
+        'active_ids':     [job.pk for job in jobs if not job.is_finished],
+    })
+
+
+@staff_required
+def job_detail(request, pk):
+    job = get_object_or_404(Job.objects.select_related('created_by'), pk=pk)
+    return render(request, 'jobs/detail.html', {'job': job, 'state': _job_state(job)})
+
+
+@staff_required
+@never_cache
+def job_progress(request):
+    """Состояние задач ?ids=1,2,3 (JSON для опроса страницей)."""
+    ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.isdigit()]
+    jobs = Job.objects.filter(pk__in=ids).defer('params', 'result')
+    return JsonResponse({'jobs': [_job_state(job) for job in jobs]})
+
+
+@staff_required
+@require_POST
+def job_cancel(request, pk):
+    job = get_object_or_404(Job, pk=pk)
+    if runner.cancel(job):
+        messages.info(request, f'Задача «{job.title}» отменяется.')
+    else:
+        messages.warning(request, 'Задача уже завершена.')
+    return redirect(request.POST.get('next') or 'jobs:list')
+
+
+@staff_required
+def job_artifact(request, pk):
+    job = get_object_or_404(Job, pk=pk, status=Job.Status.DONE)
+    if not job.artifact:
+        raise Http404("У задачи нет файла результата.")
+    try:
+        path = runner.artifact_path(job.artifact)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=job.artifact_name)
+    except (OSError, ValueError):
+        raise Http404("Файл результата удалён.")
+
+
+@staff_required
+@require_POST
+def job_import(request):
+    """Постановка импорта в очередь: DBF-файлы поручений или справочник из XLSX/CSV."""
+    source = request.POST.get('source')
+
+    if source == 'dbf':
+        files = [f for f in request.FILES.getlist('files') if f.name.lower().endswith('.dbf')]
+        if not files:
+            messages.error(request, 'Выберите DBF-файлы для импорта.')
+            return redirect('jobs:list')
+        job = runner.enqueue('telegram.import_dbf', {'folder': runner.save_uploads(files)},
+                             user=request.user, title=f'Импорт DBF: {len(files)} файлов')
+    elif source in dict(IMPORT_SOURCES):
+        uploaded = request.FILES.get('file')
+        if uploaded is None or Path(uploaded.name).suffix.lower() not in ('.xlsx', '.csv'):
+            messages.error(request, 'Выберите файл .xlsx или .csv.')
+            return redirect('jobs:list')
+        job = runner.enqueue(
+            'task_control.import_references',
+            {'model': source, 'file': runner.save_upload(uploaded)},
+            user=request.user, title=f'Импорт: {dict(IMPORT_SOURCES)[source]} ({uploaded.name})',
+        )
+    else:
+        messages.error(request, 'Неизвестный источник импорта.')
+        return redirect('jobs:list')
+
+    messages.success(request, f'Задача «{job.title}» поставлена в очередь.')
+    return redirect('jobs:list')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReferencesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'references'
+
+    def ready(self):
+        from references import search
+        search.connect_signals()
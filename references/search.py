@@ -0,0 +1,168 @@
+"""
+Индекс для автодополнения сотрудников.
+
+Ищет по фамилии, имени, отчеству, инициалам, подразделению и должности.
+Короткие фрагменты (1–2 символа, например инициалы) ищутся по префиксам
+слов, длинные — по триграммам с последующей проверкой вхождения.
+
+Индекс строится из снимка core.refcache и живёт в памяти процесса.
+Изменение сотрудника в этом же процессе обновляет индекс точечно; смена
+версии справочников в другом процессе (или правка подразделения/должности)
+приводит к полной пересборке при следующем поиске.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+from django.db.models.signals import post_delete, post_save
+
+from core.refcache import employee_record, get_reference_data, get_version
+
+MAX_LIMIT = 50
+
+
+def normalize(text):
+    return (text or '').lower().replace('ё', 'е').replace('.', ' ')
+
+
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class EmployeeIndex:
+    def __init__(self):
+        self.version  = None
+        self.docs     = {}                    # id -> запись сотрудника
+        self.words    = {}                    # id -> слова документа
+        self.prefixes = []                    # отсортированные пары (слово, id)
+        self.grams    = defaultdict(set)      # триграмма -> ids
+        self.lock     = threading.Lock()
+
+    # ── Построение ──────────────────────────────────────────
+    def rebuild(self):
+        ref = get_reference_data()
+        with self.lock:
+            self.docs, self.words, self.grams = {}, {}, defaultdict(set)
+            pairs = []
+            for emp in ref.employees:
+                words = self._add(emp)
+                pairs.extend((w, emp['id']) for w in words)
+            pairs.sort()
+            self.prefixes = pairs
+            self.version = ref.version
+
+    def _add(self, emp):
+        dept = emp['department']['name'] if emp['department'] else ''
+        pos  = emp['position']['name'] if emp['position'] else ''
+        words = sorted(set(normalize(
+            f"{emp['last_name']} {emp['first_name']} {emp['middle_name']} {dept} {pos}"
+        ).split()))
+        self.docs[emp['id']]  = emp
+        self.words[emp['id']] = words
+        for w in words:
+            for g in trigrams(w):
+                self.grams[g].add(emp['id'])
+        return words
+
+    def _remove(self, pk):
+        for w in self.words.pop(pk, []):
+            for g in trigrams(w):
+                self.grams[g].discard(pk)
+            i = bisect.bisect_left(self.prefixes, (w, pk))
+            if i < len(self.prefixes) and self.prefixes[i] == (w, pk):
+                del self.prefixes[i]
+        self.docs.pop(pk, None)
+
+    # ── Инкрементальное обновление ──────────────────────────
+    def upsert(self, emp):
+        with self.lock:
+            self._remove(emp['id'])
+            if emp['is_active']:
+                for w in self._add(emp):
+                    bisect.insort(self.prefixes, (w, emp['id']))
+
+    def remove(self, pk):
+        with self.lock:
+            self._remove(pk)
+
+    # ── Поиск ───────────────────────────────────────────────
+    def ensure_fresh(self):
+        if self.version != get_version():
+            self.rebuild()
+
+    def _match_token(self, token):
+        ids = set()
+        i = bisect.bisect_left(self.prefixes, (token, 0))
+        while i < len(self.prefixes) and self.prefixes[i][0].startswith(token):
+            ids.add(self.prefixes[i][1])
+            i += 1
+        if len(token) >= 3:
+            grams = trigrams(token)
+            candidates = set.intersection(*(self.grams.get(g, set()) for g in grams))
+            ids |= {pk for pk in candidates if any(token in w for w in self.words[pk])}
+        return ids
+
+    def search(self, query, limit=20, role=None, dept_id=None):
+        self.ensure_fresh()
+        tokens = normalize(query).split()
+        with self.lock:
+            if tokens:
+                ids = self._match_token(tokens[0])
+                for token in tokens[1:]:
+                    if not ids:
+                        break
+                    ids &= self._match_token(token)
+                docs = [self.docs[pk] for pk in ids]
+            else:
+                docs = list(self.docs.values())
+
+        if role == 'controller':
+            docs = [d for d in docs if d['is_controller']]
+        elif role == 'approver':
+            docs = [d for d in docs if d['is_approver']]
+        if dept_id is not None:
+            docs = [d for d in docs if (d['department'] or {}).get('id') == dept_id]
+
+        # Совпадение с началом фамилии — выше остальных
+        first = tokens[0] if tokens else ''
+        docs.sort(key=lambda d: (
+            not normalize(d['last_name']).startswith(first),
+            d['last_name'], d['first_name'], d['middle_name'],
+        ))
+        return docs[:limit], len(docs) > limit
+
+
+index = EmployeeIndex()
+
+
+def _employee_saved(sender, instance, **kwargs):
+    """
+    Точечное обновление. Сигнал core.refcache уже увеличил версию на 1;
+    если других изменений не было, индекс остаётся актуальным без пересборки.
+    """
+    if index.version is None:
+        return
+    version = get_version()
+    if version != index.version + 1:
+        return  # пропустили чужие изменения — пересоберём при поиске
+    dept, pos = instance.department, instance.position
+    index.upsert(employee_record(
+        instance.pk, instance.last_name, instance.first_name, instance.middle_name,
+        {'id': dept.pk, 'name': dept.name} if dept else None,
+        {'id': pos.pk, 'name': pos.name} if pos else None,
+        instance.is_active, instance.is_approver, instance.is_controller,
+    ))
+    index.version = version
+
+
+def _employee_deleted(sender, instance, **kwargs):
+    if index.version is not None and get_version() == index.version + 1:
+        index.remove(instance.pk)
+        index.version += 1
+
+
+def connect_signals():
+    from task_control.models import Employee
+
+    post_save.connect(_employee_saved, sender=Employee, dispatch_uid='employee_index_saved')
+    post_delete.connect(_employee_deleted, sender=Employee, dispatch_uid='employee_index_deleted')
@@ -7,3 +7,51 @@ class ReferencesAccessTests(TestCase):
         response = self.client.get(reverse('references:departments'))
         self.assertEqual(response.status_code, 302)
         self.assertIn('/login/', response.url)
+
+
+class EmployeeSearchTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        from task_control.models import Department, Employee, Position
+
+        cache.clear()
+        user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.client.force_login(user)
+
+        dept = Department.objects.create(name='Ремонтный цех')
+        pos = Position.objects.create(name='Слесарь')
+        self.ivanov = Employee.objects.create(
+            last_name='Иванов', first_name='Иван', middle_name='Петрович',
+            department=dept, position=pos, is_controller=True,
+        )
+        self.petrov = Employee.objects.create(last_name='Петров', first_name='Семён', middle_name='Ильич')
+
+    def search(self, **params):
+        response = self.client.get(reverse('references:employee_search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [r['id'] for r in response.json()['results']]
+
+    def test_search_by_surname_initials_department_and_position(self):
+        self.assertEqual(self.search(q='иван'), [self.ivanov.pk])
+        self.assertEqual(self.search(q='Иванов И.П.'), [self.ivanov.pk])
+        self.assertEqual(self.search(q='ремонт'), [self.ivanov.pk])
+        self.assertEqual(self.search(q='слес'), [self.ivanov.pk])
+        self.assertEqual(self.search(q='семен'), [self.petrov.pk])
+        self.assertEqual(self.search(q='етро'), [self.ivanov.pk, self.petrov.pk])
+
+    def test_role_filter(self):
+        self.assertEqual(self.search(role='controller'), [self.ivanov.pk])
+
+    def test_index_follows_employee_changes_incrementally(self):
+        from references.search import index
+
+        self.search(q='петров')
+        built_version = index.version
+
+        self.petrov.last_name = 'Сидоров'
+        self.petrov.save()
+
+        self.assertEqual(index.version, built_version + 1)
+        self.assertEqual(self.search(q='сидор'), [self.petrov.pk])
+        self.assertEqual(self.search(q='петров семен'), [])
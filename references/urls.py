@@ -15,4 +15,6 @@ urlpatterns = [
     path('types/',                 views.assignment_types,  name='types'),
     path('types/<int:pk>/update/', views.type_update,       name='type_update'),
     path('types/<int:pk>/delete/', views.type_delete,       name='type_delete'),
+
+    path('api/employees/',         views.employee_search,   name='employee_search'),
 ]
@@ -2,18 +2,24 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_http_methods
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.utils import timezone
+from core.conditional import ASSIGNMENTS, REFDATA, conditional_page
 from core.mixins import staff_required, is_admin
-from task_control.models import Department, Position, AssignmentType, Assignment, Employee
+from core.refcache import get_reference_data
+from task_control import workload
+from task_control.models import Department, Position, AssignmentType, Assignment, Employee, WorkloadCounter
 import json
 
+from asgiref.sync import sync_to_async
+
 
 # ════════════════════════════════════════════════════════
 #  ПОДРАЗДЕЛЕНИЯ
 # ════════════════════════════════════════════════════════
 
 @staff_required
+@conditional_page(ASSIGNMENTS, REFDATA)
 def departments(request):
     if request.method == 'POST':
         if not is_admin(request.user):
@@ -24,14 +30,12 @@ def departments(request):
             messages.success(request, f'Подразделение «{name}» добавлено.')
         return redirect('references:departments')
 
-    depts = Department.objects.annotate(
-        employee_count=Count('employee', distinct=True),
-        active_count=Count(
-            'employee__assignments_to_execute',
-            filter=Q(employee__assignments_to_execute__status__in=['NEW', 'IN_PROGRESS']),
-            distinct=True
-        ),
-    ).order_by('name')
+    depts = Department.objects.annotate(employee_count=Count('employee')).order_by('name')
+    # В работе (новые и принятые, без просроченных) — по счётчикам нагрузки
+    load = workload.counters(WorkloadCounter.Scope.DEPARTMENT)
+    for dept in depts:
+        counter = load.get(dept.pk)
+        dept.active_count = counter.active - counter.overdue if counter else 0
 
     return render(request, 'references/departments.html', {
         'depts':    depts,
@@ -74,6 +78,7 @@ def department_delete(request, pk):
 # ════════════════════════════════════════════════════════
 
 @staff_required
+@conditional_page(REFDATA)
 def positions(request):
     if request.method == 'POST':
         if not is_admin(request.user):
@@ -129,6 +134,7 @@ def position_delete(request, pk):
 # ════════════════════════════════════════════════════════
 
 @staff_required
+@conditional_page(ASSIGNMENTS, REFDATA)
 def assignment_types(request):
     if request.method == 'POST':
         if not is_admin(request.user):
@@ -140,14 +146,12 @@ def assignment_types(request):
             messages.success(request, f'Вид «{name}» добавлен.')
         return redirect('references:types')
 
-    types = AssignmentType.objects.annotate(
-        total=Count('assignment', distinct=True),
-        active=Count(
-            'assignment',
-            filter=Q(assignment__status__in=['NEW', 'IN_PROGRESS']),
-            distinct=True
-        ),
-    ).order_by('name')
+    types = AssignmentType.objects.order_by('name')
+    load = workload.counters(WorkloadCounter.Scope.TYPE)
+    for t in types:
+        counter = load.get(t.pk)
+        t.total = counter.total if counter else 0
+        t.active = counter.active - counter.overdue if counter else 0
 
     COLORS = [
         '#3b5bdb', '#1971c2', '#0c8599', '#2f9e44',
@@ -191,3 +195,51 @@ def type_delete(request, pk):
         }, status=400)
     atype.delete()
     return JsonResponse({'ok': True})
+
+
+# ════════════════════════════════════════════════════════
+#  API: поиск сотрудников (автодополнение)
+# ════════════════════════════════════════════════════════
+
+@staff_required
+@conditional_page(REFDATA)
+async def employee_search(request):
+    """
+    Автодополнение сотрудников для форм поручений.
+
+    GET-параметры: q — строка поиска, role — controller/approver,
+    dept — id подразделения, ids — список id через запятую (подписи
+    уже выбранных значений), limit — не больше search.MAX_LIMIT.
+    """
+    from .search import MAX_LIMIT, index
+
+    ids_param = request.GET.get('ids', '')
+    if ids_param:
+        ids = {int(x) for x in ids_param.split(',') if x.isdigit()}
+        people = {e['id']: e for e in (await sync_to_async(get_reference_data)()).employees}
+        found = [people[pk] for pk in ids if pk in people]
+        return JsonResponse({'results': [_employee_json(e) for e in found], 'more': False})
+
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else 20
+    dept = request.GET.get('dept', '')
+
+    # Индекс пересобирается по справочникам при смене их версии — в потоке запроса
+    found, more = await sync_to_async(index.search)(
+        request.GET.get('q', ''),
+        limit=limit,
+        role=request.GET.get('role') or None,
+        dept_id=int(dept) if dept.isdigit() else None,
+    )
+    return JsonResponse({'results': [_employee_json(e) for e in found], 'more': more})
+
+
+def _employee_json(e):
+    return {
+        'id':    e['id'],
+        'name':  e['full_name'],
+        'short': e['short'],
+        'pos':   e['position']['name'] if e['position'] else '',
+        'dept':  e['department']['name'] if e['department'] else 'Без подразделения',
+        'av':    e['avatar'],
+    }
@@ -0,0 +1,95 @@
+"""
+Группировка поручений для контрольных талонов (cuttable_report).
+
+Талон — подряд идущие поручения одного исполнителя с одними и теми же
+контролирующим и визирующим, сроки которых укладываются в GROUP_DAYS дней
+от срока первого поручения талона.
+
+Ключ «исполнитель + контролирующий + визирующий» считает база оконной
+функцией (DENSE_RANK), если backend их поддерживает. Правило трёх дней
+зависит от начала предыдущего талона (цепочка), поэтому окнами не
+выражается и применяется за один проход по курсору .iterator(): в памяти
+держится только текущий талон.
+"""
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import DenseRank
+
+GROUP_DAYS = 3
+CHUNK_SIZE = 500
+
+ORDERING = ('executor_id', 'controller_id', 'approver_id', 'deadline')
+
+
+def cuttable_queryset(qs):
+    """Сортировка и соединения для талонов; ключ группы — в поле group_key."""
+    qs = qs.select_related(
+        'executor', 'executor__department', 'executor__position',
+        'controller', 'approver', 'assignment_type'
+    ).order_by(*ORDERING, 'id')
+    if connection.features.supports_over_clause:
+        qs = qs.annotate(group_key=Window(
+            DenseRank(),
+            order_by=[F('executor_id').asc(), F('controller_id').asc(), F('approver_id').asc()],
+        ))
+    return qs
+
+
+def _key(task):
+    key = getattr(task, 'group_key', None)
+    if key is None:
+        key = (task.executor_id, task.controller_id, task.approver_id)
+    return key
+
+
+def iter_groups(tasks, days=GROUP_DAYS):
+    """
+    Потоковый группировщик: принимает поручения в порядке ORDERING и отдаёт
+    талоны по мере их завершения.
+    """
+    group, group_key = None, None
+    for task in tasks:
+        key = _key(task)
+        if group is not None and key == group_key and abs((task.deadline - group['start_date']).days) <= days:
+            group['tasks'].append(task)
+            continue
+        if group is not None:
+            yield group
+        group_key = key
+        group = {
+            'executor':   task.executor,
+            'controller': task.controller,
+            'approver':   task.approver,
+            'start_date': task.deadline,
+            'tasks':      [task],
+        }
+    if group is not None:
+        yield group
+
+
+def cuttable_groups(qs):
+    return iter_groups(cuttable_queryset(qs).iterator(chunk_size=CHUNK_SIZE))
+
+
+# ════════════════════════════════════════════════════════
+#  ПАКЕТНАЯ ПЕЧАТЬ ЛИСТОВ КОНТРОЛЯ
+# ════════════════════════════════════════════════════════
+
+def executor_sections(qs):
+    """
+    Разделы «исполнитель + его поручения» из одного запроса со всеми
+    соединениями, по одному разделу за раз.
+    """
+    qs = qs.select_related(
+        'executor', 'executor__department', 'executor__position',
+        'controller', 'approver', 'assignment_type'
+    ).order_by(
+        'executor__department__name', 'executor__last_name', 'executor__first_name',
+        'executor_id', 'deadline', 'id',
+    )
+    for _, tasks in groupby(qs.iterator(chunk_size=CHUNK_SIZE), key=attrgetter('executor_id')):
+        tasks = list(tasks)
+        yield {'employee': tasks[0].executor, 'tasks': tasks}
@@ -0,0 +1,165 @@
+"""
+Серверная печать отчётов в PDF.
+
+HTML печатных страниц преобразуется в PDF библиотекой WeasyPrint —
+локально, без обращения в сеть: внешние ресурсы (веб-шрифты и т.п.) не
+загружаются, используются системные шрифты. WeasyPrint и pypdf указаны
+в requirements.txt; WeasyPrint дополнительно требует системную библиотеку
+Pango (пакет libpango-1.0-0 в Debian/Ubuntu). Если WeasyPrint не
+установлен, PDF_AVAILABLE = False и отчёты открываются в браузере, как раньше.
+
+Большие отчёты режутся на части по исполнителям/талонам
+(ITEMS_PER_CHUNK блоков на часть), части рендерятся параллельно в пуле
+процессов (settings.PDF_WORKERS) и склеиваются через pypdf. Без pypdf
+отчёт рендерится одним документом в текущем процессе.
+
+Готовый файл кладётся в settings.PDF_CACHE_DIR. Ключ — имя отчёта,
+параметры запроса, номера изменений поручений и справочников
+(core.models.ChangeCounter) и текущая дата, поэтому повторная печать
+без изменений данных отдаёт файл с диска.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils import timezone
+
+from core.conditional import ASSIGNMENTS, REFDATA
+from core.models import ChangeCounter
+
+logger = logging.getLogger(__name__)
+
+PDF_AVAILABLE   = find_spec('weasyprint') is not None
+MERGE_AVAILABLE = find_spec('pypdf') is not None
+
+ITEMS_PER_CHUNK = 40
+CACHE_MAX_AGE   = 24 * 60 * 60   # секунд; устаревшие файлы удаляются при записи новых
+
+_pool      = None
+_pool_lock = Lock()
+
+
+# ════════════════════════════════════════════════════════
+#  РЕНДЕРИНГ (выполняется в процессах пула)
+# ════════════════════════════════════════════════════════
+
+def _offline_url_fetcher(url, *args, **kwargs):
+    """Разрешены только встроенные (data:) и локальные (file:) ресурсы."""
+    from weasyprint import default_url_fetcher
+
+    if url.startswith(('data:', 'file:')):
+        return default_url_fetcher(url, *args, **kwargs)
+    raise ValueError(f'Внешние ресурсы при печати в PDF не загружаются: {url}')
+
+
+def html_to_pdf(html):
+    from weasyprint import HTML
+
+    return HTML(
+        string=html, base_url=str(settings.BASE_DIR), url_fetcher=_offline_url_fetcher,
+    ).write_pdf()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS)
+        return _pool
+
+
+# ════════════════════════════════════════════════════════
+#  СБОРКА
+# ════════════════════════════════════════════════════════
+
+def chunked_documents(parts, size=ITEMS_PER_CHUNK):
+    """
+    Полные HTML-документы по size блоков из reports.streaming.PageParts —
+    каждый можно отрендерить независимо.
+    """
+    batch = []
+    for block in parts.blocks():
+        batch.append(block)
+        if len(batch) >= size:
+            yield parts.head + ''.join(batch) + parts.tail
+            batch = []
+    if batch:
+        yield parts.head + ''.join(batch) + parts.tail
+
+
+def render_pdf(documents):
+    """PDF из последовательности HTML-документов (страницы подряд)."""
+    if MERGE_AVAILABLE and settings.PDF_WORKERS > 1:
+        from pypdf import PdfWriter
+
+        # Части уходят в пул по мере построения HTML, пока база ещё читается
+        pool = _get_pool()
+        futures = [pool.submit(html_to_pdf, html) for html in documents]
+        writer = PdfWriter()
+        for future in futures:
+            writer.append(BytesIO(future.result()))
+        output = BytesIO()
+        writer.write(output)
+        return output.getvalue()
+
+    from weasyprint import HTML
+
+    documents = [
+        HTML(string=html, base_url=str(settings.BASE_DIR), url_fetcher=_offline_url_fetcher).render()
+        for html in documents
+    ]
+    if not documents:
+        return b''
+    pages = [page for document in documents for page in document.pages]
+    return documents[0].copy(pages).write_pdf()
+
+
+# ════════════════════════════════════════════════════════
+#  КЭШ И ОТВЕТ
+# ════════════════════════════════════════════════════════
+
+def cache_path(name, request):
+    params   = sorted((key, values) for key, values in request.GET.lists() if key != 'format')
+    versions = sorted(ChangeCounter.versions(ASSIGNMENTS, REFDATA).items())
+    key = repr((name, params, versions, timezone.localdate().isoformat()))
+    return Path(settings.PDF_CACHE_DIR) / f'{name}-{hashlib.sha256(key.encode()).hexdigest()[:40]}.pdf'
+
+
+def _purge(directory):
+    limit = time.time() - CACHE_MAX_AGE
+    for path in directory.glob('*.pdf'):
+        try:
+            if path.stat().st_mtime < limit:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def pdf_response(request, name, filename, make_documents):
+    """
+    FileResponse с PDF отчёта name. make_documents() вызывается только
+    при промахе кэша и возвращает HTML-документы для render_pdf().
+    """
+    path = cache_path(name, request)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _purge(path.parent)
+        started = time.monotonic()
+        content = render_pdf(make_documents())
+        # Запись через временный файл: параллельный запрос не увидит недописанный PDF
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+        logger.info('PDF %s rendered in %.1f s', path.name, time.monotonic() - started)
+
+    return FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f'{filename}.pdf')
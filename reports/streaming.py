@@ -0,0 +1,47 @@
+"""
+Потоковый вывод печатных отчётов.
+
+Страница (шапка, стили, подвал) рендерится один раз с меткой на месте
+содержимого, затем части отдаются по очереди: начало страницы, блоки
+(талоны, разделы исполнителей) по мере их построения, конец страницы.
+Браузер начинает показывать и печатать первые листы, пока остальные
+ещё формируются.
+"""
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template
+
+MARKER = '<!--stream-->'
+
+
+class PageParts:
+    """
+    Части страницы: head и tail вокруг метки stream_marker в page_template
+    и генератор отрендеренных блоков items (item_template с переменными
+    страницы и item, first).
+    """
+
+    def __init__(self, request, page_template, item_template, items, context=None, empty_template=None):
+        self.request = request
+        self.context = dict(context or {}, stream_marker=MARKER)
+        self.head, _, self.tail = get_template(page_template).render(self.context, request).partition(MARKER)
+        self.item_template = get_template(item_template)
+        self.empty_template = empty_template
+        self.items = items
+
+    def blocks(self):
+        empty = True
+        for item in self.items:
+            yield self.item_template.render(dict(self.context, item=item, first=empty), self.request)
+            empty = False
+        if empty and self.empty_template:
+            yield get_template(self.empty_template).render(self.context, self.request)
+
+    def __iter__(self):
+        yield self.head
+        yield from self.blocks()
+        yield self.tail
+
+
+def stream_response(parts):
+    """StreamingHttpResponse со страницей из частей PageParts."""
+    return StreamingHttpResponse(iter(parts), content_type='text/html; charset=utf-8')
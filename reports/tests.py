@@ -1,9 +1,197 @@
-from django.test import TestCase
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from .pdf import MERGE_AVAILABLE, PDF_AVAILABLE
+
 
 class ReportViewsTests(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_user(username='staff', password='pass123', is_staff=True)
+        self.client.force_login(user)
+
+    def test_reports_require_staff(self):
+        from django.contrib.auth import get_user_model
+
+        self.client.logout()
+        for url in (reverse('reports:executors_print'), reverse('reports:print_selected'),
+                    reverse('reports:executor_print', args=[1]), reverse('reports:deadline_filter')):
+            response = self.client.get(url, {'format': 'pdf'})
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('/login/', response.url)
+
+        # Проверка доступа стоит над conditional_page: по чужому ETag 304 не отдаётся
+        self.client.force_login(get_user_model().objects.get(username='staff'))
+        etag = self.client.get(reverse('reports:deadline_filter'))['ETag']
+        self.client.logout()
+        response = self.client.get(reverse('reports:deadline_filter'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(get_user_model().objects.create_user(username='user', password='pass123'))
+        response = self.client.get(reverse('reports:executors_print'))
+        self.assertRedirects(response, reverse('core:forbidden'), fetch_redirect_response=False)
+
     def test_deadline_filter_invalid_date_shows_error(self):
         response = self.client.get(reverse('reports:deadline_filter'), {'deadline': 'invalid-date'})
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.context['error'], 'Неверный формат даты.')
+        self.assertContains(response, 'Неверный формат даты.')
+
+    def test_deadline_export_requires_valid_date(self):
+        response = self.client.get(reverse('reports:deadline_export'), {'deadline': 'invalid-date'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse('reports:deadline_export'), {'deadline': '2030-01-01', 'format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()), 1)
+
+    def test_cuttable_groups_follow_three_day_rule(self):
+        from datetime import date, timedelta
+
+        from task_control.models import Assignment, AssignmentType, Employee
+        from .grouping import cuttable_groups
+
+        atype = AssignmentType.objects.create(name='Распоряжение')
+        executor = Employee.objects.create(last_name='Иванов', first_name='Иван')
+        controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        start = date(2030, 1, 1)
+        for number, days in enumerate((0, 2, 3, 5, 9)):
+            Assignment.objects.create(
+                assignment_type=atype, document_number=str(number), issue_date=start,
+                deadline=start + timedelta(days=days), description='—',
+                executor=executor, controller=controller,
+            )
+
+        groups = list(cuttable_groups(Assignment.objects.all()))
+        self.assertEqual([len(g['tasks']) for g in groups], [3, 1, 1])
+
+    def test_executors_batch_report_sections(self):
+        from datetime import date
+
+        from task_control.models import Assignment, AssignmentType, Department, Employee
+
+        dept = Department.objects.create(name='Цех 1')
+        atype = AssignmentType.objects.create(name='Распоряжение')
+        controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        for last_name in ('Иванов', 'Сидоров'):
+            executor = Employee.objects.create(last_name=last_name, first_name='Иван', department=dept)
+            for number in range(2):
+                Assignment.objects.create(
+                    assignment_type=atype, document_number=str(number), issue_date=date(2030, 1, 1),
+                    deadline=date(2030, 1, 2), description='—', executor=executor, controller=controller,
+                )
+
+        response = self.client.get(reverse('reports:executors_print'), {'dept': dept.pk})
+        page = b''.join(response.streaming_content).decode()
+        self.assertEqual(page.count('class="executor-section"'), 2)
+        self.assertEqual(page.count('class="page-break"'), 1)
+
+    def test_pdf_is_cached_until_data_changes(self):
+        import tempfile
+        from unittest.mock import patch
+
+        from core.conditional import ASSIGNMENTS, touch
+
+        url = reverse('reports:print_selected')
+        with tempfile.TemporaryDirectory() as cache_dir, override_settings(PDF_CACHE_DIR=cache_dir), \
+                patch('reports.views.PDF_AVAILABLE', True), \
+                patch('reports.pdf.render_pdf', return_value=b'%PDF-1.7') as render_pdf:
+            response = self.client.get(url, {'ids': '1', 'format': 'pdf'})
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.7')
+            response.close()
+
+            self.client.get(url, {'ids': '1', 'format': 'pdf'}).close()
+            self.assertEqual(render_pdf.call_count, 1)
+
+            touch(ASSIGNMENTS)
+            self.client.get(url, {'ids': '1', 'format': 'pdf'}).close()
+            self.assertEqual(render_pdf.call_count, 2)
+
+    def test_deadline_filter_groups_by_executor_in_database(self):
+        from datetime import date
+
+        from task_control.models import Assignment, AssignmentType, Department, Employee
+
+        dept = Department.objects.create(name='Цех 1')
+        atype = AssignmentType.objects.create(name='Распоряжение')
+        controller = Employee.objects.create(last_name='Петров', first_name='Пётр', is_controller=True)
+        for last_name, count in (('Иванов', 2), ('Сидоров', 1)):
+            executor = Employee.objects.create(last_name=last_name, first_name='Иван', department=dept)
+            for number in range(count):
+                Assignment.objects.create(
+                    assignment_type=atype, document_number=str(number), issue_date=date(2030, 1, 1),
+                    deadline=date(2030, 1, 2), description='—', executor=executor, controller=controller,
+                )
+
+        response = self.client.get(reverse('reports:deadline_filter'), {'deadline': '2030-01-31'})
+        groups = response.context['groups']
+        self.assertEqual([(g['executor__last_name'], g['total'], len(g['tasks'])) for g in groups],
+                         [('Иванов', 2, 2), ('Сидоров', 1, 1)])
+        self.assertEqual(response.context['totals']['total'], 3)
+        self.assertEqual(response.context['departments'], [{'id': dept.pk, 'name': 'Цех 1'}])
+
+        response = self.client.get(reverse('reports:deadline_filter'), {'deadline': '2030-01-31', 'executor': 'Сидор'})
+        self.assertEqual(len(response.context['groups']), 1)
+
+
+@skipUnless(PDF_AVAILABLE, 'WeasyPrint не установлен')
+class PdfRenderingTests(TestCase):
+    """Настоящий рендеринг: WeasyPrint, пул процессов и склейка частей."""
+
+    DOCUMENTS = ['<html><body><p>Часть 1</p></body></html>', '<html><body><p>Часть 2</p></body></html>']
+
+    def setUp(self):
+        import tempfile
+
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+
+    def tearDown(self):
+        from . import pdf
+
+        if pdf._pool is not None:
+            pdf._pool.shutdown()
+            pdf._pool = None
+
+    def page_count(self, content):
+        from io import BytesIO
+        from pypdf import PdfReader
+
+        return len(PdfReader(BytesIO(content)).pages)
+
+    def test_external_resources_are_not_fetched(self):
+        from .pdf import _offline_url_fetcher
+
+        with self.assertRaises(ValueError):
+            _offline_url_fetcher('https://fonts.example.com/font.woff2')
+
+    @override_settings(PDF_WORKERS=1)
+    def test_render_in_process(self):
+        from .pdf import render_pdf
+
+        content = render_pdf(self.DOCUMENTS)
+        self.assertTrue(content.startswith(b'%PDF'))
+        if MERGE_AVAILABLE:
+            self.assertEqual(self.page_count(content), 2)
+
+    @skipUnless(MERGE_AVAILABLE, 'pypdf не установлен')
+    @override_settings(PDF_WORKERS=2)
+    def test_render_in_pool_and_merge(self):
+        from .pdf import render_pdf
+
+        self.assertEqual(self.page_count(render_pdf(self.DOCUMENTS)), 2)
+
+    @override_settings(PDF_WORKERS=1)
+    def test_print_view_returns_pdf(self):
+        from django.contrib.auth import get_user_model
+
+        self.client.force_login(get_user_model().objects.create_user(username='staff', is_staff=True))
+        with override_settings(PDF_CACHE_DIR=self.cache_dir.name):
+            response = self.client.get(reverse('reports:print_selected'), {'ids': '1', 'format': 'pdf'})
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            response.close()
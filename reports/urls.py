@@ -1,10 +1,15 @@
 from django.urls import path
-from .views import print_executor_report, print_selected_assignments, deadline_filter_view
+from .views import (
+    print_executor_report, print_executors_batch, print_selected_assignments,
+    deadline_filter_view, deadline_export,
+)
 
 app_name = 'reports'
 
 urlpatterns = [
     path('executor/<int:employee_id>/', print_executor_report,      name='executor_print'),
+    path('executors/',                 print_executors_batch,       name='executors_print'),
     path('print-selected/',            print_selected_assignments,  name='print_selected'),
     path('by-deadline/',               deadline_filter_view,        name='deadline_filter'),
+    path('by-deadline/export/',        deadline_export,             name='deadline_export'),
 ]
\ No newline at end of file
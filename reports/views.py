@@ -1,134 +1,286 @@
+from collections import defaultdict
+from datetime import date
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
 from django.utils import timezone
-from django.db.models import Count
+from django.db.models import Count, Q
+from assignments.export import export_response
+from assignments.models import SelectionSet
+from core.conditional import ASSIGNMENTS, REFDATA, conditional_page
+from core.mixins import staff_required
+from core.replica import replica_view
+from core.models import ChangeCounter
+from core.refcache import get_reference_data
 from task_control.models import Employee, Assignment
 
+from .grouping import cuttable_groups, executor_sections
+from .pdf import PDF_AVAILABLE, chunked_documents, pdf_response
+from .streaming import PageParts, stream_response
+
+GROUPS_PER_PAGE = 30
+DEPARTMENTS_CACHE_TIMEOUT = 24 * 60 * 60
+
 
+@staff_required
+@replica_view
+@conditional_page(ASSIGNMENTS, REFDATA)
 def print_executor_report(request, employee_id):
-    employee    = get_object_or_404(Employee, pk=employee_id)
+    employee    = get_object_or_404(
+        Employee.objects.select_related('department', 'position'), pk=employee_id
+    )
     report_date = timezone.now().date()
 
     assignments = Assignment.objects.filter(
         executor=employee
-    ).exclude(status='DONE').order_by('deadline')
+    ).exclude(status='DONE').select_related(
+        'assignment_type', 'controller', 'approver'
+    ).order_by('deadline')
+
+    context = {
+        'employee':      employee,
+        'assignments':   assignments,
+        'report_date':   report_date,
+        'pdf_available': PDF_AVAILABLE,
+    }
+    if wants_pdf(request):
+        return pdf_response(
+            request, f'executor-{employee.pk}', f'control_{employee.pk}',
+            lambda: [render_to_string('reports/print_report.html', context, request)],
+        )
+    return render(request, 'reports/print_report.html', context)
+
+
+def wants_pdf(request):
+    """?format=pdf и WeasyPrint установлен; иначе отчёт открывается в браузере."""
+    return request.GET.get('format') == 'pdf' and PDF_AVAILABLE
+
+
+def executor_batch_response(request, qs, title, page_breaks=True):
+    """
+    Листы контроля всех исполнителей поручений qs — потоком, раздел за
+    разделом, или PDF (?format=pdf), разбитый по исполнителям.
+    """
+    def parts():
+        return PageParts(
+            request, 'reports/executors_batch.html', 'reports/_executor_batch_item.html',
+            executor_sections(qs.exclude(status='DONE')),
+            context={
+                'title':         title,
+                'report_date':   timezone.now().date(),
+                'page_breaks':   page_breaks,
+                'pdf_available': PDF_AVAILABLE,
+            },
+            empty_template='reports/_executors_empty.html',
+        )
+
+    if wants_pdf(request):
+        return pdf_response(request, 'executors', 'control_sheets', lambda: chunked_documents(parts()))
+    return stream_response(parts())
+
 
-    return render(request, 'reports/print_report.html', {
-        'employee':    employee,
-        'assignments': assignments,
-        'report_date': report_date,
-    })
+@staff_required
+@replica_view
+@conditional_page(ASSIGNMENTS, REFDATA)
+def print_executors_batch(request):
+    """
+    Пакетная печать листов контроля: ?dept=<id> — подразделение,
+    ?ids=1,2,3 — выбранные сотрудники, без параметров — все исполнители.
+    ?breaks=0 — без разрывов страниц между исполнителями.
+    """
+    dept_id = request.GET.get('dept', '')
+    ids     = request.GET.get('ids', '')
+    qs      = Assignment.objects.all()
 
+    if dept_id.isdigit():
+        names = {d['id']: d['name'] for d in get_reference_data().departments}
+        title = names.get(int(dept_id), 'подразделение')
+        qs = qs.filter(executor__department_id=int(dept_id))
+    elif ids:
+        title = 'выбранные сотрудники'
+        qs = qs.filter(executor_id__in=[int(x) for x in ids.split(',') if x.isdigit()])
+    else:
+        title = 'все подразделения'
 
+    return executor_batch_response(request, qs, title, page_breaks=request.GET.get('breaks') != '0')
+
+
+@staff_required
+@replica_view
+@conditional_page(ASSIGNMENTS, REFDATA)
 def print_selected_assignments(request):
+    token     = request.GET.get('s', '')
     ids_param = request.GET.get('ids', '')
-    if not ids_param:
-        return render(request, 'reports/cuttable_report.html', {'grouped_tasks': []})
-
-    ids_list = [int(x) for x in ids_param.split(',') if x.isdigit()]
-
-    assignments = Assignment.objects.filter(id__in=ids_list).select_related(
-        'executor', 'executor__department', 'executor__position',
-        'controller', 'approver', 'assignment_type'
-    ).order_by('executor__id', 'controller__id', 'approver__id', 'deadline')
-
-    grouped_tasks = []
-    current_group = None
-
-    for task in assignments:
-        if current_group is None:
-            current_group = {
-                'executor':   task.executor,
-                'controller': task.controller,
-                'approver':   task.approver,
-                'start_date': task.deadline,
-                'tasks':      [task],
-            }
-            grouped_tasks.append(current_group)
-            continue
-
-        ctrl_id_1 = task.controller.id if task.controller else None
-        ctrl_id_2 = current_group['controller'].id if current_group['controller'] else None
-        appr_id_1 = task.approver.id if task.approver else None
-        appr_id_2 = current_group['approver'].id if current_group['approver'] else None
-        date_diff  = abs((task.deadline - current_group['start_date']).days)
-
-        if (task.executor_id == current_group['executor'].id
-                and ctrl_id_1 == ctrl_id_2
-                and appr_id_1 == appr_id_2
-                and date_diff <= 3):
-            current_group['tasks'].append(task)
-        else:
-            current_group = {
-                'executor':   task.executor,
-                'controller': task.controller,
-                'approver':   task.approver,
-                'start_date': task.deadline,
-                'tasks':      [task],
-            }
-            grouped_tasks.append(current_group)
-
-    return render(request, 'reports/cuttable_report.html', {
-        'grouped_tasks': grouped_tasks,
-    })
+    if token:
+        # Выборка, сохранённая массовым действием или админкой
+        qs = SelectionSet.get_or_404(token).queryset()
+    elif ids_param:
+        ids_list = [int(x) for x in ids_param.split(',') if x.isdigit()]
+        qs = Assignment.objects.filter(id__in=ids_list)
+    else:
+        qs = Assignment.objects.none()
 
+    def parts():
+        return PageParts(
+            request, 'reports/cuttable_report.html', 'reports/_cuttable_group.html',
+            cuttable_groups(qs), context={'pdf_available': PDF_AVAILABLE},
+            empty_template='reports/_cuttable_empty.html',
+        )
 
-def deadline_filter_view(request):
-    today        = timezone.now().date()
-    deadline_str = request.GET.get('deadline', '')
-    print_mode   = request.GET.get('print') == '1'
+    if wants_pdf(request):
+        return pdf_response(request, 'cuttable', 'control_slips', lambda: chunked_documents(parts()))
+    # Талоны строятся и отдаются браузеру по одному
+    return stream_response(parts())
 
-    deadline_date = None
-    assignments   = None
-    error         = None
-
-    from task_control.models import Department
-    departments = Department.objects.filter(
-        employee__assignments_to_execute__status__in=['NEW', 'IN_PROGRESS', 'OVERDUE']
-    ).distinct().order_by('name')
-
-    if deadline_str:
-        try:
-            from datetime import date
-            deadline_date = date.fromisoformat(deadline_str)
-        except ValueError:
-            error = "Неверный формат даты."
-
-    if deadline_date and not error:
-        qs = Assignment.objects.filter(
-            deadline__lte=deadline_date
-        ).exclude(status='DONE').select_related(
-            'executor', 'executor__department', 'executor__position',
-            'controller', 'approver', 'assignment_type'
+
+def parse_deadline(value):
+    """Дата из ?deadline=YYYY-MM-DD: (date | None, сообщение об ошибке | None)."""
+    if not value:
+        return None, None
+    try:
+        return date.fromisoformat(value), None
+    except ValueError:
+        return None, "Неверный формат даты."
+
+
+def read_deadline_filters(params):
+    """Фильтры отчёта по срокам — одинаковые для страницы, печати и выгрузки."""
+    return {
+        'executor': params.get('executor', '').strip(),
+        'dept':     params.get('dept', '').strip(),
+        'status':   params.get('status', '').strip(),
+    }
+
+
+def deadline_queryset(deadline_date, filters):
+    """Неисполненные поручения со сроком до deadline_date, по исполнителям."""
+    qs = Assignment.objects.filter(
+        deadline__lte=deadline_date
+    ).exclude(status='DONE')
+
+    if filters['executor']:
+        qs = qs.filter(
+            Q(executor__last_name__icontains=filters['executor']) |
+            Q(executor__first_name__icontains=filters['executor'])
         )
+    if filters['dept'].isdigit():
+        qs = qs.filter(executor__department_id=int(filters['dept']))
+    if filters['status']:
+        qs = qs.filter(status=filters['status'])
 
-        # Фильтры из печатной версии (переданы JS-ом)
-        if print_mode:
-            pexec   = request.GET.get('pexec', '').strip()
-            pdept   = request.GET.get('pdept', '').strip()
-            pstatus = request.GET.get('pstatus', '').strip()
-            if pexec:
-                qs = qs.filter(
-                    Q(executor__last_name__icontains=pexec) |
-                    Q(executor__first_name__icontains=pexec)
-                )
-            if pdept.isdigit():
-                qs = qs.filter(executor__department_id=int(pdept))
-            if pstatus:
-                qs = qs.filter(status=pstatus)
-
-        assignments = qs.order_by(
-            'executor__last_name', 'executor__first_name', 'deadline'
+    return qs.order_by('executor__last_name', 'executor__first_name', 'executor_id', 'deadline')
+
+
+def active_departments():
+    """
+    Подразделения, у сотрудников которых есть неисполненные поручения.
+    Кэшируется до следующего изменения поручений или справочников.
+    """
+    versions = ChangeCounter.versions(ASSIGNMENTS, REFDATA)
+    key = f'reports:active_departments:{versions[ASSIGNMENTS]}:{versions[REFDATA]}'
+    dept_ids = cache.get(key)
+    if dept_ids is None:
+        dept_ids = set(
+            Assignment.objects.exclude(status='DONE')
+            .values_list('executor__department_id', flat=True).distinct()
         )
+        cache.set(key, dept_ids, DEPARTMENTS_CACHE_TIMEOUT)
+    return [d for d in get_reference_data().departments if d['id'] in dept_ids]
+
 
-    template = 'reports/deadline_filter_print.html' if print_mode else 'reports/deadline_filter.html'
+def executor_groups(qs, today):
+    """
+    Группы «исполнитель» со счётчиками, посчитанными в базе (GROUP BY),
+    без загрузки самих поручений.
+    """
+    return qs.values(
+        'executor_id', 'executor__last_name', 'executor__first_name',
+        'executor__middle_name', 'executor__department__name',
+    ).annotate(
+        total=Count('id'),
+        overdue=Count('id', filter=Q(deadline__lt=today)),
+    ).order_by('executor__last_name', 'executor__first_name', 'executor_id')
+
+
+@staff_required
+@replica_view
+@conditional_page(ASSIGNMENTS, REFDATA)
+def deadline_filter_view(request):
+    today        = timezone.now().date()
+    deadline_str = request.GET.get('deadline', '')
+    print_mode   = request.GET.get('print') == '1'
+    filters      = read_deadline_filters(request.GET)
 
-    return render(request, template, {
+    departments = active_departments()
+    deadline_date, error = parse_deadline(deadline_str)
+
+    context = {
         'today':          today,
         'deadline_date':  deadline_date,
         'deadline_str':   deadline_str,
-        'assignments':    assignments,
         'departments':    departments,
+        'filters':        filters,
+        'has_filters':    any(filters.values()),
+        'dept_name':      next((d['name'] for d in departments if str(d['id']) == filters['dept']), ''),
+        'status_name':    dict(Assignment.Status.choices).get(filters['status'], ''),
         'error':          error,
         'report_date':    today,
         'status_choices': Assignment.Status.choices,
-    })
\ No newline at end of file
+        'pdf_available':  PDF_AVAILABLE,
+        'assignments':    None,
+        'groups':         None,
+    }
+
+    if deadline_date and print_mode:
+        context['assignments'] = deadline_queryset(deadline_date, filters).select_related(
+            'executor', 'executor__department', 'executor__position',
+            'controller', 'approver', 'assignment_type'
+        )
+        template = 'reports/deadline_filter_print.html'
+        if wants_pdf(request):
+            return pdf_response(
+                request, 'deadline', f'deadline_{deadline_date:%Y-%m-%d}',
+                lambda: [render_to_string(template, context, request)],
+            )
+        return render(request, template, context)
+
+    if deadline_date:
+        qs = deadline_queryset(deadline_date, filters)
+        page_obj = Paginator(executor_groups(qs, today), GROUPS_PER_PAGE).get_page(request.GET.get('page'))
+        groups = list(page_obj)
+
+        # Поручения загружаются только для исполнителей текущей страницы
+        tasks = defaultdict(list)
+        for task in qs.filter(
+            executor_id__in=[g['executor_id'] for g in groups]
+        ).select_related('assignment_type', 'approver'):
+            tasks[task.executor_id].append(task)
+        for group in groups:
+            group['tasks'] = tasks[group['executor_id']]
+
+        context.update({
+            'groups':   groups,
+            'page_obj': page_obj,
+            'totals':   qs.aggregate(
+                total=Count('id'), overdue=Count('id', filter=Q(deadline__lt=today)),
+            ),
+        })
+
+    return render(request, 'reports/deadline_filter.html', context)
+
+
+@staff_required
+@replica_view
+def deadline_export(request):
+    """Выгрузка отчёта по срокам с фильтрами страницы (?format=csv|xlsx)."""
+    deadline_date, error = parse_deadline(request.GET.get('deadline', ''))
+    if deadline_date is None:
+        return HttpResponseBadRequest(error or "Не указана дата.")
+    qs = deadline_queryset(deadline_date, read_deadline_filters(request.GET))
+    return export_response(
+        qs, request.GET.get('format', 'xlsx'),
+        f'deadline_{deadline_date:%Y-%m-%d}', title='По срокам',
+    )
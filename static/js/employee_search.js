@@ -0,0 +1,49 @@
+// ══ ПОИСК СОТРУДНИКОВ (автодополнение) ══════════════════
+// Списки сотрудников больше не рендерятся в HTML целиком: выпадающие
+// списки и список исполнителей подгружают варианты из
+// API по мере ввода. Адрес задаёт шаблон:
+//   <script>const EMPLOYEE_SEARCH_URL = "{% url 'references:employee_search' %}";</script>
+
+const _searchTimers = {};
+
+function fetchEmployees(params) {
+    const qs = new URLSearchParams(params);
+    return fetch(`${EMPLOYEE_SEARCH_URL}?${qs}`, {credentials: 'same-origin'})
+        .then(r => r.ok ? r.json() : {results: []})
+        .then(data => data.results || []);
+}
+
+function _escape(s) {
+    return String(s ?? '').replace(/[&<>"']/g, ch => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[ch]);
+}
+
+// Подгрузка вариантов в кастомный select (.cs[data-employee-search])
+function searchCS(id, q) {
+    clearTimeout(_searchTimers[id]);
+    _searchTimers[id] = setTimeout(() => {
+        const cs   = document.getElementById(id);
+        const list = cs.querySelector('.cs-drop__list');
+        const none = list.querySelector('.cs-none');
+        const current = document.getElementById(id + '-val').value;
+        const params = {q: q, limit: 30};
+        if (cs.dataset.employeeSearch) params.role = cs.dataset.employeeSearch;
+
+        fetchEmployees(params).then(results => {
+            list.querySelectorAll('.cs-opt[data-v]:not([data-v=""])').forEach(o => o.remove());
+            results.forEach(e => {
+                const opt = document.createElement('div');
+                opt.className = 'cs-opt' + (String(e.id) === current ? ' sel' : '');
+                opt.dataset.v = e.id;
+                opt.dataset.l = e.short;
+                opt.onclick = () => pickCS(id, opt);
+                opt.innerHTML = `<span class="cs-opt__check">✓</span>
+                    <div><div>${_escape(e.short)}</div>
+                    <div class="cs-opt__sub">${_escape(e.pos || '—')} · ${_escape(e.dept)}</div></div>`;
+                list.insertBefore(opt, none);
+            });
+            if (none) none.style.display = results.length ? 'none' : 'block';
+        });
+    }, q ? 250 : 0);
+}
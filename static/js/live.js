@@ -0,0 +1,86 @@
+// ══ ЖИВОЕ ОБНОВЛЕНИЕ (server-sent events, core:events) ══
+// Страница подписывается на поток изменений поручений и правит себя
+// на месте: числа KPI, строки таблицы, отметка «Обновлено».
+//   <script>const LIVE_EVENTS_URL = "{% url 'core:events' %}";</script>
+//   liveUpdates({kpi: true, rows: 'tr[data-id]'});
+//
+// Разметка:
+//   [data-kpi="active"]  — число, заменяется значением из события
+//   [data-live-updated]  — время последнего изменения
+//   [data-live-hint]     — скрытая плашка «есть изменения», текст — в [data-live-hint-text]
+
+function _liveFlash(el) {
+    el.classList.remove('live-flash');
+    void el.offsetWidth;
+    el.classList.add('live-flash');
+}
+
+function _liveHint(text) {
+    const hint = document.querySelector('[data-live-hint]');
+    if (!hint) return;
+    const label = hint.querySelector('[data-live-hint-text]') || hint;
+    label.textContent = text;
+    hint.hidden = false;
+}
+
+function _livePatchKpi(data) {
+    Object.entries(data.kpi || {}).forEach(([name, value]) => {
+        document.querySelectorAll(`[data-kpi="${name}"]`).forEach(el => {
+            if (el.textContent.trim() !== String(value)) {
+                el.textContent = value;
+                _liveFlash(el);
+            }
+        });
+    });
+}
+
+// Строки, изменённые на сервере, берутся из свежей копии страницы
+function _livePatchRows(data, selector) {
+    const shown = new Map();
+    document.querySelectorAll(selector).forEach(row => shown.set(Number(row.dataset.id), row));
+    const changed = data.updated.filter(id => shown.has(id));
+    data.deleted.filter(id => shown.has(id)).forEach(id => shown.get(id).classList.add('live-gone'));
+    if (data.created.length) {
+        _liveHint(`Новых поручений: ${data.created.length}`);
+    }
+    if (!changed.length) return;
+    fetch(location.href, {credentials: 'same-origin'})
+        .then(r => r.ok ? r.text() : '')
+        .then(html => {
+            if (!html) return;
+            const fresh = new DOMParser().parseFromString(html, 'text/html');
+            changed.forEach(id => {
+                const next = fresh.querySelector(`${selector}[data-id="${id}"]`);
+                const row = shown.get(id);
+                if (next) {
+                    row.replaceWith(document.importNode(next, true));
+                    _liveFlash(document.querySelector(`${selector}[data-id="${id}"]`));
+                } else {
+                    // Больше не подходит под фильтры страницы
+                    row.classList.add('live-gone');
+                }
+            });
+        });
+}
+
+function liveUpdates(options) {
+    if (!window.EventSource || typeof LIVE_EVENTS_URL === 'undefined') return;
+    const source = new EventSource(LIVE_EVENTS_URL);
+    source.addEventListener('assignments', e => {
+        const data = JSON.parse(e.data);
+        if (options.kpi) _livePatchKpi(data);
+        if (data.truncated) {
+            _liveHint('Много изменений — обновите страницу');
+        } else if (options.rows) {
+            _livePatchRows(data, options.rows);
+        }
+        if (options.onChange) options.onChange(data);
+        document.querySelectorAll('[data-live-updated]').forEach(el => {
+            el.textContent = new Date(data.at).toLocaleString('ru-RU', {
+                day: '2-digit', month: '2-digit', year: 'numeric', hour: '2-digit', minute: '2-digit',
+            }).replace(',', '');
+        });
+    });
+    window.addEventListener('pagehide', () => source.close());
+    return source;
+}
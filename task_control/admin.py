@@ -1,9 +1,9 @@
 from django.contrib import admin, messages
 from django import forms
-from django.contrib.admin.widgets import FilteredSelectMultiple
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
 
 # Импорт моделей из текущего приложения
-from .models import Department, Position, Employee, AssignmentType, Assignment
+from .models import Department, Position, Employee, AssignmentType, Assignment, StatusTransition
 
 # Импорт модели из приложения telegram (для отображения в сотрудниках)
 from telegram.models import TelegramUser
@@ -23,6 +23,10 @@ from telegram.notifications import (
 from django.utils.html import format_html
 from django.urls import reverse
 from django.shortcuts import redirect
+
+from core.conditional import REFDATA, touch
+from core.refcache import bump_version
+from assignments.models import SelectionSet
 # ==========================================
 # 1. ПРОСТЫЕ СПРАВОЧНИКИ
 # ==========================================
@@ -129,18 +133,31 @@ class EmployeeAdmin(ImportExportModelAdmin, admin.ModelAdmin):
     inlines = [TelegramUserInline]
 
     # 8. Массовые действия для списка
-    actions = ['make_active', 'make_inactive']
+    actions = ['make_active', 'make_inactive', 'print_reports']
 
     @admin.action(description="✅ Отметить выбранных как РАБОТАЮЩИХ")
     def make_active(self, request, queryset):
         updated = queryset.update(is_active=True)
+        # queryset.update() не вызывает сигналы
+        bump_version()
+        touch(REFDATA)
         self.message_user(request, f"Восстановлено {updated} сотрудников.", messages.SUCCESS)
 
     @admin.action(description="❌ Отметить выбранных как УВОЛЕННЫХ")
     def make_inactive(self, request, queryset):
         updated = queryset.update(is_active=False)
+        bump_version()
+        touch(REFDATA)
         self.message_user(request, f"Уволено {updated} сотрудников.", messages.WARNING)
 
+    @admin.action(description="🖨️ ПЕЧАТЬ листов контроля выбранных")
+    def print_reports(self, request, queryset):
+        # Один поток со всеми разделами вместо вкладки на каждого сотрудника
+        from reports.views import executor_batch_response
+        return executor_batch_response(
+            request, Assignment.objects.filter(executor__in=queryset), 'выбранные сотрудники'
+        )
+
     # Создаем саму кнопку
     def print_button(self, obj):
         # ИЗМЕНЕНИЕ ЗДЕСЬ:
@@ -163,7 +180,8 @@ class AssignmentCreateForm(forms.ModelForm):
     # Создаем виртуальное поле для выбора нескольких исполнителей
     executors = forms.ModelMultipleChoiceField(
         queryset=Employee.objects.filter(is_active=True),
-        widget=FilteredSelectMultiple('Исполнители', is_stacked=False),
+        # Поиск через автодополнение админки: список сотрудников не рендерится целиком
+        widget=AutocompleteSelectMultiple(Assignment._meta.get_field('executor'), admin.site),
         required=True,
         label="Исполнители (можно выбрать несколько)"
     )
@@ -190,6 +208,7 @@ class AssignmentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'assignment_type', 'issue_date', 'deadline', 'executor', 'controller')
     search_fields = ('document_number', 'base_document_number', 'description', 'executor__last_name',
                      'executor__first_name')
+    autocomplete_fields = ('executor', 'approver', 'controller')
 
     # Подключаем наши действия (кнопки)
     actions = ['action_send_new', 'action_send_extensions', 'action_send_reminders', 'action_print_selected']
@@ -237,12 +256,9 @@ class AssignmentAdmin(admin.ModelAdmin):
 
     @admin.action(description="🖨️ ПЕЧАТЬ выбранных (для нарезки)")
     def action_print_selected(self, request, queryset):
-        # Собираем ID всех выбранных галочками поручений в строку "1,5,12"
-        selected_ids = list(queryset.values_list('id', flat=True))
-        ids_string = ",".join(map(str, selected_ids))
-
-        # Генерируем ссылку на наш новый View
-        url = reverse('reports:print_selected') + f'?ids={ids_string}'
+        # Выборку сохраняем на сервере: в ссылке только короткий токен
+        selection = SelectionSet.from_queryset(queryset, request.user)
+        url = reverse('reports:print_selected') + f'?s={selection.token}'
 
         # Перенаправляем пользователя на страницу печати
         return redirect(url)
@@ -253,24 +269,26 @@ class AssignmentAdmin(admin.ModelAdmin):
             # СЦЕНАРИЙ: СОЗДАНИЕ НОВЫХ
             executors_list = form.cleaned_data.get('executors')
 
-            # Сохраняем самое первое поручение стандартным способом
-            obj.executor = executors_list[0]
-            super().save_model(request, obj, form, change)
-
-            # В цикле создаем независимые клоны для всех остальных исполнителей
-            for executor in executors_list[1:]:
-                Assignment.objects.create(
-                    assignment_type=obj.assignment_type,
-                    document_number=obj.document_number,
-                    base_document_number=obj.base_document_number,
-                    issue_date=obj.issue_date,
-                    deadline=obj.deadline,
-                    description=obj.description,
-                    approver=obj.approver,
-                    controller=obj.controller,
-                    status=obj.status,
-                    executor=executor  # Подставляем следующего человека
-                )
+            # Переходы статусов всех клонов — одной вставкой
+            with StatusTransition.buffer():
+                # Сохраняем самое первое поручение стандартным способом
+                obj.executor = executors_list[0]
+                super().save_model(request, obj, form, change)
+
+                # В цикле создаем независимые клоны для всех остальных исполнителей
+                for executor in executors_list[1:]:
+                    Assignment.objects.create(
+                        assignment_type=obj.assignment_type,
+                        document_number=obj.document_number,
+                        base_document_number=obj.base_document_number,
+                        issue_date=obj.issue_date,
+                        deadline=obj.deadline,
+                        description=obj.description,
+                        approver=obj.approver,
+                        controller=obj.controller,
+                        status=obj.status,
+                        executor=executor  # Подставляем следующего человека
+                    )
         else:
             # СЦЕНАРИЙ: РЕДАКТИРОВАНИЕ СУЩЕСТВУЮЩЕГО
             super().save_model(request, obj, form, change)
@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class TaskControlConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task_control'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save, pre_delete
+
+        from .models import Assignment, Employee
+        from .signals import (
+            assignments_updated, log_assignment_deleted, log_assignment_saved, log_assignments_updated,
+            observe_document_number, track_assignment_deleted, track_assignment_saved, track_employee_saved,
+        )
+
+        post_save.connect(observe_document_number, sender=Assignment, dispatch_uid='document_number_observe')
+        post_save.connect(log_assignment_saved, sender=Assignment, dispatch_uid='assignment_change_save')
+        post_save.connect(track_assignment_saved, sender=Assignment, dispatch_uid='assignment_track_save')
+        post_delete.connect(log_assignment_deleted, sender=Assignment, dispatch_uid='assignment_change_delete')
+        pre_delete.connect(track_assignment_deleted, sender=Assignment, dispatch_uid='assignment_track_delete')
+        post_save.connect(track_employee_saved, sender=Employee, dispatch_uid='employee_track_save')
+        assignments_updated.connect(log_assignments_updated, sender=Assignment, dispatch_uid='assignment_change_update')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from task_control.workload import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики нагрузки по поручениям и исправляет расхождения (запускать раз в сутки)'
+
+    def handle(self, *args, **kwargs):
+        fixed = reconcile()
+        if fixed:
+            self.stdout.write(self.style.WARNING(f'Исправлено счётчиков: {fixed}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Счётчики нагрузки сходятся'))
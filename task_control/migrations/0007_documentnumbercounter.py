@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0006_assignmenttype_color'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('prefix', models.CharField(blank=True, max_length=50, verbose_name='Префикс номера')),
+                ('last_number', models.PositiveIntegerField(default=0, verbose_name='Последний номер')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('assignment_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='task_control.assignmenttype', verbose_name='Вид документа')),
+            ],
+            options={
+                'verbose_name': 'Счётчик номеров',
+                'verbose_name_plural': 'Счётчики номеров',
+                'constraints': [models.UniqueConstraint(fields=('assignment_type', 'year', 'prefix'), name='unique_number_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0007_documentnumbercounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['updated_at', 'id'], name='assignment_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['deadline', 'id'], name='assignment_deadline_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:20
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+from django.db.models import Count
+
+KEY = ('assignment_type_id', 'issue_year', 'document_number', 'executor_id')
+
+
+def check_duplicates(apps, schema_editor):
+    """
+    Поручения, созданные до ограничения (форма создания, импорт DBF), могли
+    повторять ключ. Номера документов официальные, поэтому миграция их не
+    меняет: при повторах она останавливается со списком — их нужно разобрать
+    вручную и повторить migrate.
+    """
+    Assignment = apps.get_model('task_control', 'Assignment')
+    duplicates = list(
+        Assignment.objects.using(schema_editor.connection.alias).order_by().values(*KEY)
+        .annotate(n=Count('id')).filter(n__gt=1).order_by(*KEY)
+    )
+    if duplicates:
+        lines = '\n'.join(
+            f'  вид {row["assignment_type_id"]}, {row["issue_year"]} год, № {row["document_number"]}, '
+            f'исполнитель {row["executor_id"]}: {row["n"]} поручения'
+            for row in duplicates
+        )
+        raise RuntimeError(f'Повторяющиеся поручения (вид, год, номер, исполнитель):\n{lines}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0008_assignment_assignment_updated_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='issue_year',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.datetime.ExtractYear('issue_date'), output_field=models.PositiveSmallIntegerField(), verbose_name='Год издания'),
+        ),
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='assignment',
+            constraint=models.UniqueConstraint(fields=('assignment_type', 'issue_year', 'document_number', 'executor'), name='unique_type_year_document_executor'),
+        ),
+    ]
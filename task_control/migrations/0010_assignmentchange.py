@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:23
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0009_assignment_unique_document_executor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assignment_id', models.BigIntegerField(db_index=True, verbose_name='Поручение')),
+                ('operation', models.CharField(choices=[('create', 'Создание'), ('update', 'Изменение'), ('delete', 'Удаление')], max_length=10, verbose_name='Операция')),
+                ('fields', models.JSONField(blank=True, default=list, verbose_name='Изменённые поля')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+            ],
+            options={
+                'verbose_name': 'Изменение поручения',
+                'verbose_name_plural': 'Журнал изменений поручений',
+            },
+        ),
+    ]
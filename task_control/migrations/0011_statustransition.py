@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """
+    Начальная история существующих поручений: создание в NEW и, если статус
+    уже другой, переход в него в момент последнего изменения (точнее
+    узнать нельзя).
+    """
+    Assignment = apps.get_model('task_control', 'Assignment')
+    StatusTransition = apps.get_model('task_control', 'StatusTransition')
+    batch = []
+    rows = Assignment.objects.values_list('id', 'executor_id', 'deadline', 'status', 'created_at', 'updated_at')
+    for pk, executor_id, deadline, status, created_at, updated_at in rows.iterator(chunk_size=2000):
+        common = {'assignment_id': pk, 'executor_id': executor_id, 'deadline': deadline}
+        batch.append(StatusTransition(from_status='', to_status='NEW', changed_at=created_at, **common))
+        if status != 'NEW':
+            batch.append(StatusTransition(from_status='NEW', to_status=status, changed_at=updated_at, **common))
+        if len(batch) >= 2000:
+            StatusTransition.objects.bulk_create(batch)
+            batch = []
+    StatusTransition.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0010_assignmentchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('NEW', 'Новое'), ('IN_PROGRESS', 'В работе'), ('DONE', 'Исполнено'), ('OVERDUE', 'Просрочено')], max_length=20, verbose_name='Был статус')),
+                ('to_status', models.CharField(choices=[('NEW', 'Новое'), ('IN_PROGRESS', 'В работе'), ('DONE', 'Исполнено'), ('OVERDUE', 'Просрочено')], max_length=20, verbose_name='Стал статус')),
+                ('deadline', models.DateField(verbose_name='Срок на момент перехода')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions', to='task_control.assignment', verbose_name='Поручение')),
+                ('executor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='task_control.employee', verbose_name='Исполнитель')),
+            ],
+            options={
+                'verbose_name': 'Смена статуса',
+                'verbose_name_plural': 'Журнал смены статусов',
+                'indexes': [models.Index(fields=['to_status', 'changed_at'], name='transition_period_idx'), models.Index(fields=['executor', 'changed_at'], name='transition_executor_idx'), models.Index(fields=['assignment', 'changed_at'], name='transition_assignment_idx')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
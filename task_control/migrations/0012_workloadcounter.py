@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0011_statustransition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkloadCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('employee', 'Сотрудник'), ('department', 'Подразделение'), ('type', 'Вид поручений')], max_length=10, verbose_name='Разрез')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Id')),
+                ('total', models.IntegerField(default=0, verbose_name='Всего поручений')),
+                ('active', models.IntegerField(default=0, verbose_name='Неисполненных')),
+                ('overdue', models.IntegerField(default=0, verbose_name='Просрочено')),
+                ('due_week', models.IntegerField(default=0, verbose_name='Срок в ближайшие 7 дней')),
+                ('done_month', models.IntegerField(default=0, verbose_name='Исполнено за месяц')),
+                ('day', models.DateField(verbose_name='Дата сверки')),
+            ],
+            options={
+                'verbose_name': 'Счётчик нагрузки',
+                'verbose_name_plural': 'Счётчики нагрузки',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'object_id'), name='unique_workload_counter')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_control', '0012_workloadcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='risk_score',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True, verbose_name='Риск просрочки'),
+        ),
+    ]
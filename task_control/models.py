@@ -1,4 +1,11 @@
-from django.db import models
+import re
+import threading
+from contextlib import contextmanager
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -54,6 +61,13 @@ class Employee(models.Model):
         dept = f" ({self.department.name})" if self.department else ""
         return f"{self.last_name} {self.first_name} {self.middle_name}".strip() + dept
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Смена подразделения переносит нагрузку сотрудника (WorkloadCounter)
+        instance._loaded_department_id = instance.__dict__.get('department_id', 0)
+        return instance
+
     class Meta:
         verbose_name = "Сотрудник"
         verbose_name_plural = "Сотрудники"
@@ -72,6 +86,73 @@ class AssignmentType(models.Model):
         verbose_name_plural = "Виды поручений"
 
 
+UPDATE_CHUNK = 900   # id в одном UPDATE ... WHERE id IN (...) (лимит параметров SQLite)
+
+# Поля, от которых зависят журнал статусов и счётчики нагрузки (StatusTransition, WorkloadCounter)
+TRACKED_FIELDS = ('executor_id', 'assignment_type_id', 'status', 'deadline')
+
+
+def _tracked_values(kwargs):
+    """Новые значения отслеживаемых полей из аргументов update(); выражения (F()) пропускаются."""
+    values = {}
+    for name in TRACKED_FIELDS:
+        for key in (name, name.removesuffix('_id')):
+            if key in kwargs:
+                value = kwargs[key]
+                if not hasattr(value, 'resolve_expression'):
+                    values[name] = value.pk if isinstance(value, models.Model) else value
+    return values
+
+
+class AssignmentQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        UPDATE с отметкой updated_at (auto_now здесь не срабатывает) и
+        сигналом assignments_updated со списком id. id читаются до обновления:
+        после него фильтр может уже не совпадать (status → OVERDUE).
+        """
+        kwargs.setdefault('updated_at', timezone.now())
+        changed = _tracked_values(kwargs)
+        with transaction.atomic(using=self.db):
+            if changed:
+                # Прежние значения — для журнала статусов и счётчиков нагрузки
+                before = {row[0]: row[1:] for row in self.values_list('id', *TRACKED_FIELDS)}
+                ids = list(before)
+            else:
+                ids = list(self.values_list('id', flat=True))
+            rows = 0
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                chunk = self.model._base_manager.using(self.db).filter(pk__in=ids[start:start + UPDATE_CHUNK])
+                rows += models.QuerySet.update(chunk, **kwargs)
+            if changed:
+                self._track_update(before, changed, kwargs['updated_at'])
+            if rows:
+                # Внутри транзакции: журнал изменений фиксируется вместе с UPDATE
+                from .signals import assignments_updated
+                assignments_updated.send(sender=self.model, queryset=self, fields=kwargs, rows=rows, ids=ids)
+        return rows
+
+    def _track_update(self, before, changed, changed_at):
+        from . import workload
+
+        transitions, changes, left_done = [], [], {}
+        for pk, values in before.items():
+            old = workload.State(*values)
+            new = old._replace(**changed)
+            if new == old:
+                continue
+            changes.append((old, new))
+            if workload.leaves_done(old, new):
+                left_done[pk] = old
+            if new.status != old.status:
+                transitions.append(StatusTransition(
+                    assignment_id=pk, executor_id=new.executor_id, deadline=new.deadline,
+                    from_status=old.status, to_status=new.status, changed_at=changed_at,
+                ))
+        StatusTransition.record(transitions)
+        workload.apply(changes, [left_done[pk] for pk in workload.completed_this_month(left_done)])
+
+
 # 5. Главная модель поручения
 class Assignment(models.Model):
     class Status(models.TextChoices):
@@ -86,6 +167,11 @@ class Assignment(models.Model):
                                             verbose_name="Основание (номер документа)")
 
     issue_date = models.DateField(verbose_name="Дата издания")
+    # Нумерация документов ведётся заново каждый год (DocumentNumberCounter) — год входит в ключ
+    issue_year = models.GeneratedField(
+        expression=ExtractYear('issue_date'), output_field=models.PositiveSmallIntegerField(),
+        db_persist=True, verbose_name="Год издания",
+    )
     deadline = models.DateField(verbose_name="Срок исполнения")
     description = models.TextField(verbose_name="Текст поручения")
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.NEW, verbose_name="Статус")
@@ -105,6 +191,9 @@ class Assignment(models.Model):
         null=True, blank=True,
         verbose_name="Срок, о котором уже было напоминание"
     )
+    # Вероятность просрочки (analytics.risk, пересчёт раз в сутки); у исполненных — пусто
+    risk_score = models.FloatField(null=True, blank=True, editable=False, db_index=True,
+                                   verbose_name="Риск просрочки")
     # Теперь связи идут к модели Employee, а не к пользователям сайта
     executor = models.ForeignKey(
         Employee,
@@ -131,10 +220,340 @@ class Assignment(models.Model):
         verbose_name="Контролирующий"
     )
 
+    objects = AssignmentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.assignment_type.name} №{self.document_number} от {self.issue_date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения при загрузке: post_save сравнивает с ними статус и поля нагрузки
+        instance._loaded = {name: instance.__dict__.get(name) for name in TRACKED_FIELDS}
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счётчики нагрузки (post_save) — в одной транзакции с поручением
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
     class Meta:
         verbose_name = "Поручение"
         verbose_name_plural = "Поручения"
-        ordering = ['-issue_date']
\ No newline at end of file
+        ordering = ['-issue_date']
+        constraints = [
+            # Ключ загрузки поручений из внешних систем (api.ingest, импорт DBF): upsert по нему.
+            # Номера повторяются у разных видов и в разные годы — счётчики идут по (вид, год)
+            models.UniqueConstraint(
+                fields=['assignment_type', 'issue_year', 'document_number', 'executor'],
+                name='unique_type_year_document_executor',
+            ),
+        ]
+        indexes = [
+            # Постраничное чтение через API (keyset по полю сортировки и id)
+            models.Index(fields=['updated_at', 'id'], name='assignment_updated_idx'),
+            models.Index(fields=['deadline', 'id'], name='assignment_deadline_idx'),
+        ]
+
+# 6. Счётчик номеров документов
+NUMBER_RE = re.compile(r'(\d+)$')
+
+
+def split_document_number(number):
+    """'15-к/107' -> ('15-к/', 107); номер без цифр в конце -> (номер, None)."""
+    m = NUMBER_RE.search(number or '')
+    if not m:
+        return number, None
+    return number[:m.start()], int(m.group(1))
+
+
+class DocumentNumberCounter(models.Model):
+    """
+    Последний выданный номер документа для (вид, год, префикс).
+
+    Номер выдаётся одним UPDATE ... SET last_number = last_number + n внутри
+    транзакции: строка блокируется до конца транзакции, поэтому два
+    одновременных запроса получают разные номера. Номера, введённые
+    вручную, подтягивают счётчик вверх (observe), чтобы не было повторов.
+    """
+    assignment_type = models.ForeignKey(AssignmentType, on_delete=models.CASCADE, verbose_name="Вид документа")
+    year = models.PositiveSmallIntegerField(verbose_name="Год")
+    prefix = models.CharField(max_length=50, blank=True, verbose_name="Префикс номера")
+    last_number = models.PositiveIntegerField(default=0, verbose_name="Последний номер")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Счётчик номеров"
+        verbose_name_plural = "Счётчики номеров"
+        constraints = [
+            models.UniqueConstraint(fields=['assignment_type', 'year', 'prefix'], name='unique_number_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.assignment_type_id}/{self.year}: {self.prefix}{self.last_number}"
+
+    @classmethod
+    def _current(cls, type_id, year, prefix=None):
+        qs = cls.objects.filter(assignment_type_id=type_id, year=year)
+        if prefix is not None:
+            return qs.filter(prefix=prefix).first()
+        # Без явного префикса — тот, по которому номера выдавались последними
+        return qs.order_by('-updated_at', '-pk').first()
+
+    @classmethod
+    def _last_issued(cls, type_id, year):
+        """Префикс и число номера последнего поручения вида за год."""
+        last = (Assignment.objects.filter(assignment_type_id=type_id, issue_date__year=year)
+                .order_by('-id').values_list('document_number', flat=True).first())
+        prefix, number = split_document_number(last) if last else ('', 0)
+        if number is None:
+            return '', 0
+        return prefix, number
+
+    @classmethod
+    def _seed(cls, type_id, year):
+        """Первый счётчик вида за год — от последнего поручения (один раз)."""
+        prefix, number = cls._last_issued(type_id, year)
+        counter, _ = cls.objects.get_or_create(
+            assignment_type_id=type_id, year=year, prefix=prefix,
+            defaults={'last_number': number},
+        )
+        return counter
+
+    @classmethod
+    def allocate(cls, type_id, year, count=1, prefix=None):
+        """Выдаёт count номеров подряд: список строк вида '<префикс><число>'."""
+        with transaction.atomic():
+            counter = cls._current(type_id, year, prefix)
+            if counter is None:
+                counter = cls._seed(type_id, year) if prefix is None else cls.objects.get_or_create(
+                    assignment_type_id=type_id, year=year, prefix=prefix)[0]
+            cls.objects.filter(pk=counter.pk).update(
+                last_number=F('last_number') + count, updated_at=timezone.now(),
+            )
+            last = cls.objects.values_list('last_number', flat=True).get(pk=counter.pk)
+        return [f'{counter.prefix}{n}' for n in range(last - count + 1, last + 1)]
+
+    @classmethod
+    def peek(cls, type_id, year, prefix=None):
+        """Номер, который выдаст allocate(), — без выдачи: счётчик не меняется."""
+        counter = cls._current(type_id, year, prefix)
+        if counter is not None:
+            return f'{counter.prefix}{counter.last_number + 1}'
+        if prefix is None:
+            prefix, number = cls._last_issued(type_id, year)
+        else:
+            number = 0
+        return f'{prefix}{number + 1}'
+
+    @classmethod
+    def observe(cls, assignment):
+        """Учитывает номер сохранённого поручения (введённый вручную или выданный)."""
+        cls.observe_many([assignment])
+
+    @classmethod
+    def observe_many(cls, assignments):
+        """observe() для пачки поручений: один UPDATE на счётчик, а не на поручение."""
+        highest = {}
+        for assignment in assignments:
+            prefix, number = split_document_number(assignment.document_number)
+            if number is None or not assignment.issue_date:
+                continue
+            key = (assignment.assignment_type_id, assignment.issue_date.year, prefix)
+            highest[key] = max(number, highest.get(key, 0))
+        for (type_id, year, prefix), number in highest.items():
+            cls.objects.filter(
+                assignment_type_id=type_id, year=year, prefix=prefix, last_number__lt=number,
+            ).update(last_number=number)
+
+
+# 7. Журнал изменений поручений
+class AssignmentChange(models.Model):
+    """
+    Запись журнала изменений поручений для инкрементальной синхронизации
+    (api/v1/changes/). Номер записи (id) — последовательность seq.
+
+    Пишется на всех путях записи: save/delete (сигналы), queryset.update()
+    (assignments_updated) и загрузка через bulk_create (api.ingest) — в той
+    же транзакции, что и само изменение, так что одно без другого не
+    фиксируется. Пишущие в журнал транзакции выстраиваются в очередь на
+    блокировке LOCK (см. record()), поэтому seq растёт в порядке фиксаций и
+    потребитель, читающий «после seq», не пропускает записи долгих транзакций.
+    """
+    # Строка core.ChangeCounter: UPDATE блокирует её до конца транзакции
+    LOCK = 'assignment_changes'
+
+    class Operation(models.TextChoices):
+        CREATE = 'create', 'Создание'
+        UPDATE = 'update', 'Изменение'
+        DELETE = 'delete', 'Удаление'
+
+    # Не внешний ключ: запись об удалении переживает поручение
+    assignment_id = models.BigIntegerField(db_index=True, verbose_name="Поручение")
+    operation     = models.CharField(max_length=10, choices=Operation.choices, verbose_name="Операция")
+    fields        = models.JSONField(default=list, blank=True, verbose_name="Изменённые поля")
+    changed_at    = models.DateTimeField(default=timezone.now, verbose_name="Время")
+
+    class Meta:
+        verbose_name = "Изменение поручения"
+        verbose_name_plural = "Журнал изменений поручений"
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_operation_display()} {self.assignment_id}"
+
+    @classmethod
+    def record(cls, operation, ids, fields=()):
+        """
+        Добавляет записи по id поручений в текущей транзакции. До вставки
+        берётся блокировка журнала: следующая транзакция получит seq только
+        после фиксации этой, даже если записей больше одной пачки bulk_create.
+        """
+        from core.models import ChangeCounter
+
+        ids = list(ids)
+        if not ids:
+            return
+        fields = sorted(fields)
+        now = timezone.now()
+        with transaction.atomic():
+            ChangeCounter.touch(cls.LOCK)
+            cls.objects.bulk_create(
+                [cls(assignment_id=pk, operation=operation, fields=fields, changed_at=now) for pk in ids],
+                batch_size=1000,
+            )
+
+
+# 8. Журнал смены статусов
+_transition_buffer = threading.local()
+
+
+class StatusTransitionQuerySet(models.QuerySet):
+    def completions(self, start, end):
+        """Переходы в «Исполнено» с start по end (даты включительно)."""
+        return self.filter(
+            to_status=Assignment.Status.DONE,
+            changed_at__date__gte=start, changed_at__date__lte=end,
+        )
+
+    def on_time(self):
+        """Переходы, сделанные не позже срока поручения на тот момент."""
+        return self.filter(changed_at__date__lte=F('deadline'))
+
+
+class StatusTransition(models.Model):
+    """
+    Смена статуса поручения — только добавление, записи не изменяются.
+
+    Пишется на всех путях записи: save() (сигнал post_save сравнивает статус
+    с загруженным из базы), queryset.update(status=...) и загрузка через
+    bulk_create (api.ingest). Исполнитель и срок копируются на момент
+    перехода, поэтому «в срок ли исполнено» и статистика по исполнителю
+    считаются по этой таблице без соединения с поручениями.
+
+    Записи копятся и добавляются одним bulk_create: после фиксации
+    транзакции, а внутри блока StatusTransition.buffer() — при выходе из него.
+    """
+    assignment  = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='transitions',
+                                    verbose_name="Поручение")
+    executor    = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='+',
+                                    verbose_name="Исполнитель")
+    from_status = models.CharField(max_length=20, blank=True, choices=Assignment.Status.choices,
+                                   verbose_name="Был статус")   # пусто — поручение создано
+    to_status   = models.CharField(max_length=20, choices=Assignment.Status.choices, verbose_name="Стал статус")
+    deadline    = models.DateField(verbose_name="Срок на момент перехода")
+    changed_at  = models.DateTimeField(default=timezone.now, verbose_name="Время")
+
+    objects = StatusTransitionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Смена статуса"
+        verbose_name_plural = "Журнал смены статусов"
+        indexes = [
+            models.Index(fields=['to_status', 'changed_at'], name='transition_period_idx'),
+            models.Index(fields=['executor', 'changed_at'], name='transition_executor_idx'),
+            models.Index(fields=['assignment', 'changed_at'], name='transition_assignment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.assignment_id}: {self.from_status or '—'} → {self.to_status}"
+
+    @classmethod
+    def for_assignment(cls, assignment, from_status=''):
+        return cls(
+            assignment_id=assignment.pk, executor_id=assignment.executor_id, deadline=assignment.deadline,
+            from_status=from_status or '', to_status=assignment.status,
+        )
+
+    @classmethod
+    def record(cls, transitions):
+        """Добавляет переходы: в открытый буфер или одним bulk_create после фиксации."""
+        transitions = list(transitions)
+        if not transitions:
+            return
+        buffer = getattr(_transition_buffer, 'items', None)
+        if buffer is not None:
+            buffer.extend(transitions)
+            return
+        transaction.on_commit(lambda: cls.objects.bulk_create(transitions, batch_size=1000))
+
+    @classmethod
+    @contextmanager
+    def buffer(cls):
+        """
+        Переходы из save() в цикле копятся и пишутся одной вставкой при
+        выходе из блока (вложенные блоки пишут во внешний буфер).
+        """
+        if getattr(_transition_buffer, 'items', None) is not None:
+            yield
+            return
+        _transition_buffer.items = items = []
+        try:
+            yield
+        finally:
+            # И при ошибке: в автокоммите уже сохранённые изменения остались в базе,
+            # а внутри откатываемой транзакции on_commit не выполнится
+            _transition_buffer.items = None
+            cls.record(items)
+
+
+# 9. Счётчики нагрузки
+class WorkloadCounter(models.Model):
+    """
+    Нагрузка сотрудника, подразделения или вида поручений: готовые числа
+    для дашборда и справочников вместо группировки всех поручений.
+
+    Обновляется дельтами в транзакции каждой записи поручения
+    (task_control.workload.apply). «Срок на неделе» и «исполнено за месяц»
+    зависят от даты, поэтому верны только на день последней сверки (day):
+    при чтении устаревших строк счётчики пересчитываются
+    (workload.reconcile, команда reconcile_workload).
+    """
+    class Scope(models.TextChoices):
+        EMPLOYEE   = 'employee',   'Сотрудник'
+        DEPARTMENT = 'department', 'Подразделение'
+        TYPE       = 'type',       'Вид поручений'
+
+    scope      = models.CharField(max_length=10, choices=Scope.choices, verbose_name="Разрез")
+    object_id  = models.PositiveIntegerField(verbose_name="Id")   # 0 — без подразделения
+    total      = models.IntegerField(default=0, verbose_name="Всего поручений")
+    active     = models.IntegerField(default=0, verbose_name="Неисполненных")
+    overdue    = models.IntegerField(default=0, verbose_name="Просрочено")
+    due_week   = models.IntegerField(default=0, verbose_name="Срок в ближайшие 7 дней")
+    done_month = models.IntegerField(default=0, verbose_name="Исполнено за месяц")
+    day        = models.DateField(verbose_name="Дата сверки")
+
+    FIELDS = ('total', 'active', 'overdue', 'due_week', 'done_month')
+
+    class Meta:
+        verbose_name = "Счётчик нагрузки"
+        verbose_name_plural = "Счётчики нагрузки"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'object_id'], name='unique_workload_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.object_id}: {self.active}"
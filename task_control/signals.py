@@ -0,0 +1,88 @@
+from django.dispatch import Signal
+
+# Отправляется после queryset.update() по поручениям: post_save при этом
+# не срабатывает, а auto_now-поля не обновляются.
+# Аргументы: sender (модель), queryset, fields (dict обновлённых полей), rows,
+# ids (id обновлённых поручений).
+assignments_updated = Signal()
+
+
+def observe_document_number(sender, instance, **kwargs):
+    """post_save Assignment: номер поручения подтягивает счётчик номеров."""
+    from .models import DocumentNumberCounter
+
+    DocumentNumberCounter.observe(instance)
+
+
+# ── Журнал изменений (AssignmentChange) ─────────────────
+
+def log_assignment_saved(sender, instance, created, update_fields=None, **kwargs):
+    from .models import AssignmentChange
+
+    if created:
+        AssignmentChange.record(AssignmentChange.Operation.CREATE, [instance.pk])
+    else:
+        AssignmentChange.record(AssignmentChange.Operation.UPDATE, [instance.pk], update_fields or ())
+
+
+def log_assignment_deleted(sender, instance, **kwargs):
+    from .models import AssignmentChange
+
+    AssignmentChange.record(AssignmentChange.Operation.DELETE, [instance.pk])
+
+
+def log_assignments_updated(sender, ids, fields, **kwargs):
+    from .models import AssignmentChange
+
+    AssignmentChange.record(AssignmentChange.Operation.UPDATE, ids, fields)
+
+
+# ── Журнал смены статусов и счётчики нагрузки ───────────
+
+def track_assignment_saved(sender, instance, created, update_fields=None, **kwargs):
+    """post_save Assignment: переход статуса (StatusTransition) и дельты WorkloadCounter."""
+    from . import workload
+    from .models import TRACKED_FIELDS, StatusTransition
+
+    loaded = getattr(instance, '_loaded', None)
+    if not created and (loaded is None or None in loaded.values()):
+        # Поручение собрано вручную или загружено не целиком — прежние значения неизвестны
+        return
+    if update_fields is not None and not {name.removesuffix('_id') for name in TRACKED_FIELDS} & set(update_fields):
+        return
+
+    old = None if created else workload.State(**loaded)
+    new = workload.State.of(instance)
+    if old is None or old.status != new.status:
+        StatusTransition.record([StatusTransition.for_assignment(instance, old and old.status)])
+    if old != new:
+        workload.apply([(old, new)], _reopened(instance, old, new))
+    instance._loaded = new._asdict()
+
+
+def track_assignment_deleted(sender, instance, **kwargs):
+    """pre_delete Assignment: до каскадного удаления переходов — по ним считается done_month."""
+    from . import workload
+
+    loaded = getattr(instance, '_loaded', None)
+    if loaded and None not in loaded.values():
+        old = workload.State(**loaded)
+        workload.apply([(old, None)], _reopened(instance, old, None))
+
+
+def _reopened(instance, old, new):
+    from . import workload
+
+    if workload.leaves_done(old, new) and workload.completed_this_month([instance.pk]):
+        return [old]
+    return []
+
+
+def track_employee_saved(sender, instance, created, **kwargs):
+    """post_save Employee: при смене подразделения нагрузка сотрудника переходит в новое."""
+    from . import workload
+
+    previous = getattr(instance, '_loaded_department_id', 0)
+    if not created and previous != 0 and previous != instance.department_id:
+        workload.move_employee(instance.pk, previous, instance.department_id)
+    instance._loaded_department_id = instance.department_id
@@ -0,0 +1,65 @@
+"""Фоновые задачи справочников (jobs.registry)."""
+import shutil
+
+from import_export.formats import base_formats
+
+from jobs.registry import register
+
+CHUNK_ROWS = 500
+
+IMPORT_FORMATS = {
+    '.xlsx': base_formats.XLSX,
+    '.csv':  base_formats.CSV,
+}
+
+
+def _resources():
+    from .admin import DepartmentResource, EmployeeResource, PositionResource
+    return {
+        'department': DepartmentResource,
+        'position':   PositionResource,
+        'employee':   EmployeeResource,
+    }
+
+
+def read_dataset(path):
+    fmt = IMPORT_FORMATS.get(path.suffix.lower())
+    if fmt is None:
+        raise ValueError('Поддерживаются файлы .xlsx и .csv')
+    data = path.read_bytes()
+    if fmt is base_formats.CSV:
+        data = data.decode('utf-8-sig')
+    return fmt().create_dataset(data)
+
+
+@register('task_control.import_references', 'Импорт справочника', concurrency=1)
+def import_references(ctx):
+    """
+    Импорт сотрудников / подразделений / должностей теми же ресурсами
+    import_export, что и в админке, порциями по CHUNK_ROWS строк — каждая
+    в своей транзакции.
+    """
+    resource = _resources()[ctx.params['model']]()
+    path = ctx.input_path()
+    try:
+        dataset = read_dataset(path)
+    finally:
+        shutil.rmtree(path.parent, ignore_errors=True)
+
+    totals, errors, rejected = {}, [], 0
+    ctx.progress(0, len(dataset), message=f'Строк в файле: {len(dataset)}')
+    for start in range(0, len(dataset), CHUNK_ROWS):
+        chunk = dataset.subset(rows=range(start, min(start + CHUNK_ROWS, len(dataset))))
+        result = resource.import_data(chunk, dry_run=False, raise_errors=False, use_transactions=True)
+        if result.has_errors() or result.has_validation_errors():
+            # Как и в админке, порция с ошибками откатывается целиком
+            rejected += len(chunk)
+            for number, row_errors in result.row_errors():
+                errors.extend(f'Строка {start + number}: {error.error}' for error in row_errors)
+            for row in result.invalid_rows:
+                errors.append(f'Строка {start + row.number}: {"; ".join(row.error.messages)}')
+        else:
+            for key, value in result.totals.items():
+                totals[key] = totals.get(key, 0) + value
+        ctx.progress(start + len(chunk))
+    return {'totals': totals, 'rejected': rejected, 'errors': errors[:100]}
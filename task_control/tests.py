@@ -1,9 +1,153 @@
+from django.core.management import call_command
+from django.db.models import F
 from django.test import TestCase
+from django.utils import timezone
 
-from task_control.models import Employee
+from datetime import date, timedelta
+from io import StringIO
+
+from task_control import workload
+from task_control.models import (
+    Assignment, AssignmentType, Department, DocumentNumberCounter, Employee, StatusTransition, WorkloadCounter,
+)
 
 
 class EmployeeModelTests(TestCase):
     def test_telegram_id_property_without_profile_returns_none(self):
         employee = Employee.objects.create(last_name='Иванов', first_name='Иван')
         self.assertIsNone(employee.telegram_id)
+
+
+class DocumentNumberCounterTests(TestCase):
+    def setUp(self):
+        self.atype = AssignmentType.objects.create(name='Распоряжение')
+        self.executor = Employee.objects.create(last_name='Иванов', first_name='Иван', is_controller=True)
+
+    def create(self, number):
+        return Assignment.objects.create(
+            assignment_type=self.atype, document_number=number, issue_date=date(2030, 3, 1),
+            deadline=date(2030, 3, 5), description='—', executor=self.executor, controller=self.executor,
+        )
+
+    def test_allocate_continues_last_number_without_repeats(self):
+        self.create('15-к/41')
+
+        self.assertEqual(DocumentNumberCounter.allocate(self.atype.pk, 2030), ['15-к/42'])
+        self.assertEqual(DocumentNumberCounter.allocate(self.atype.pk, 2030, count=2), ['15-к/43', '15-к/44'])
+
+        # Номер, введённый вручную, сдвигает счётчик
+        self.create('15-к/50')
+        self.assertEqual(DocumentNumberCounter.allocate(self.atype.pk, 2030), ['15-к/51'])
+
+
+class StatusTransitionTests(TestCase):
+    def setUp(self):
+        atype = AssignmentType.objects.create(name='Распоряжение')
+        self.executor = Employee.objects.create(last_name='Иванов', first_name='Иван', is_controller=True)
+        self.fields = dict(
+            assignment_type=atype, issue_date=date(2030, 3, 1), deadline=date(2030, 3, 5),
+            description='—', executor=self.executor, controller=self.executor,
+        )
+
+    def history(self, assignment):
+        return list(StatusTransition.objects.filter(assignment=assignment).order_by('id')
+                    .values_list('from_status', 'to_status'))
+
+    def test_save_and_update_record_only_status_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Assignment.objects.create(document_number='1', **self.fields)
+        with self.captureOnCommitCallbacks(execute=True):
+            task.description = 'Правка'
+            task.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.status = Assignment.Status.IN_PROGRESS
+            task.save(update_fields=['status', 'updated_at'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(pk=task.pk).update(status=Assignment.Status.DONE)
+            Assignment.objects.filter(pk=task.pk).update(status=Assignment.Status.DONE)
+
+        self.assertEqual(self.history(task), [('', 'NEW'), ('NEW', 'IN_PROGRESS'), ('IN_PROGRESS', 'DONE')])
+        done = StatusTransition.objects.completions(date.today(), date.today())
+        self.assertEqual(done.get().executor, self.executor)
+        # Срок 2030 года — исполнено в срок
+        self.assertEqual(done.on_time().count(), 1)
+
+    def test_buffer_writes_one_insert(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, StatusTransition.buffer():
+            for n in range(5):
+                Assignment.objects.create(document_number=str(n), **self.fields)
+        inserts = [c for c in callbacks if c.__qualname__.startswith('StatusTransition.')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(StatusTransition.objects.filter(to_status='NEW').count(), 5)
+
+
+class WorkloadCounterTests(TestCase):
+    def setUp(self):
+        self.atype = AssignmentType.objects.create(name='Распоряжение')
+        self.dept = Department.objects.create(name='Цех №1')
+        self.executor = Employee.objects.create(last_name='Иванов', first_name='Иван', is_controller=True)
+        today = date.today()
+        self.fields = dict(
+            assignment_type=self.atype, issue_date=today, deadline=today + timedelta(days=2),
+            description='—', executor=self.executor, controller=self.executor,
+        )
+
+    def stored(self):
+        return {
+            (c.scope, c.object_id): {name: getattr(c, name) for name in WorkloadCounter.FIELDS}
+            for c in WorkloadCounter.objects.all() if any(getattr(c, name) for name in WorkloadCounter.FIELDS)
+        }
+
+    def test_deltas_match_full_recount(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Assignment.objects.create(document_number='1', **self.fields)
+            Assignment.objects.create(document_number='2', **self.fields)
+            second = Assignment.objects.get(document_number='2')
+            second.status = Assignment.Status.IN_PROGRESS
+            second.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(pk=first.pk).update(status=Assignment.Status.OVERDUE)
+            self.executor.department = self.dept
+            self.executor.save()
+            Assignment.objects.filter(pk=second.pk).update(status=Assignment.Status.DONE)
+        Assignment.objects.create(document_number='3', **self.fields).delete()
+
+        counter = WorkloadCounter.objects.get(scope='department', object_id=self.dept.pk)
+        self.assertEqual((counter.total, counter.active, counter.overdue, counter.due_week, counter.done_month),
+                         (2, 1, 1, 1, 1))
+        self.assertEqual(self.stored(), workload.compute())
+        self.assertEqual(workload.reconcile(), 0)
+
+    def test_done_month_follows_reopening(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Assignment.objects.create(document_number='1', status=Assignment.Status.DONE, **self.fields)
+        old = Assignment.objects.create(document_number='2', status=Assignment.Status.DONE, **self.fields)
+        # Исполнено в прошлом месяце — в done_month не входит
+        StatusTransition.objects.create(
+            assignment=old, executor=self.executor, deadline=old.deadline, to_status=Assignment.Status.DONE,
+            changed_at=timezone.now() - timedelta(days=40),
+        )
+        workload.reconcile()
+
+        for status in (Assignment.Status.IN_PROGRESS, Assignment.Status.DONE, Assignment.Status.IN_PROGRESS):
+            with self.captureOnCommitCallbacks(execute=True):
+                task.status = status
+                task.save()
+            self.assertEqual(self.stored(), workload.compute())
+        Assignment.objects.filter(pk=old.pk).update(status=Assignment.Status.IN_PROGRESS)
+        self.assertEqual(self.stored(), workload.compute())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Assignment.objects.filter(pk=task.pk).update(status=Assignment.Status.DONE)
+        Assignment.objects.get(pk=task.pk).delete()
+        self.assertEqual(self.stored(), workload.compute())
+        self.assertEqual(workload.reconcile(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        Assignment.objects.create(document_number='1', **self.fields)
+        WorkloadCounter.objects.filter(scope='employee').update(active=F('active') + 5)
+
+        out = StringIO()
+        call_command('reconcile_workload', stdout=out)
+        self.assertIn('Исправлено счётчиков: 1', out.getvalue())
+        self.assertEqual(WorkloadCounter.objects.get(scope='employee', object_id=self.executor.pk).active, 1)
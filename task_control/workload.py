@@ -0,0 +1,215 @@
+"""
+Счётчики нагрузки (WorkloadCounter): изменение при записи поручений и сверка.
+
+Запись поручения превращается в пару состояний (до, после) — State;
+apply() вычитает вклад прежнего состояния и добавляет вклад нового по
+сотруднику, его подразделению и виду поручения: один UPDATE ... SET
+n = n + delta на затронутую строку. Пути записи: post_save/pre_delete
+(task_control.signals), AssignmentQuerySet.update() и api.ingest.
+
+reconcile() пересчитывает все счётчики тремя GROUP BY и исправляет
+расхождения; страницы вызывают его сами, если последняя сверка была
+не сегодня (сроки «на неделе» сдвигаются каждый день).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from core.replica import use_primary
+
+from .models import Assignment, Employee, StatusTransition, WorkloadCounter
+
+DUE_DAYS = 7   # «срок в ближайшие 7 дней», включая сегодня
+
+Scope = WorkloadCounter.Scope
+
+
+class State(NamedTuple):
+    """Поля поручения, от которых зависит нагрузка."""
+    executor_id:        int
+    assignment_type_id: int
+    status:             str
+    deadline:           object
+
+    @classmethod
+    def of(cls, assignment):
+        return cls(assignment.executor_id, assignment.assignment_type_id, assignment.status, assignment.deadline)
+
+
+def _contribution(state, today):
+    active = state.status != Assignment.Status.DONE
+    return {
+        'total':    1,
+        'active':   int(active),
+        'overdue':  int(state.status == Assignment.Status.OVERDUE),
+        'due_week': int(active and today <= state.deadline < today + timedelta(days=DUE_DAYS)),
+    }
+
+
+def _keys(state, departments):
+    return (
+        (Scope.EMPLOYEE, state.executor_id),
+        (Scope.DEPARTMENT, departments.get(state.executor_id) or 0),
+        (Scope.TYPE, state.assignment_type_id),
+    )
+
+
+def leaves_done(old, new):
+    """Поручение выходит из «Исполнено»: возвращено в работу или удалено."""
+    return old is not None and old.status == Assignment.Status.DONE and (
+        new is None or new.status != Assignment.Status.DONE)
+
+
+def completed_this_month(ids, today=None):
+    """id из ids, исполненные в текущем месяце, — те, что учтены в done_month."""
+    ids = list(ids)
+    if not ids:
+        return set()
+    today = today or timezone.localdate()
+    return set(
+        StatusTransition.objects.completions(today.replace(day=1), today)
+        .filter(assignment_id__in=ids).values_list('assignment_id', flat=True)
+    )
+
+
+def apply(changes, reopened=()):
+    """
+    Применяет изменения [(прежнее State или None, новое State или None)]:
+    None слева — поручение создано, справа — удалено.
+
+    done_month, как и в compute(), — исполненные поручения с переходом в
+    «Исполнено» в этом месяце. Переход в DONE добавляет единицу; reopened —
+    прежние State поручений, которые уходят из DONE (leaves_done) и были
+    исполнены в этом месяце (completed_this_month): у них единица снимается.
+    """
+    changes = [(old, new) for old, new in changes if old != new]
+    if not changes:
+        return
+    today = timezone.localdate()
+    executors = {state.executor_id for pair in changes for state in pair if state}
+    departments = dict(Employee.objects.filter(pk__in=executors).values_list('id', 'department_id'))
+
+    deltas = defaultdict(lambda: dict.fromkeys(WorkloadCounter.FIELDS, 0))
+    for old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            for key in _keys(state, departments):
+                for name, value in _contribution(state, today).items():
+                    deltas[key][name] += sign * value
+        if new and new.status == Assignment.Status.DONE and (old is None or old.status != Assignment.Status.DONE):
+            for key in _keys(new, departments):
+                deltas[key]['done_month'] += 1
+    for old in reopened:
+        for key in _keys(old, departments):
+            deltas[key]['done_month'] -= 1
+
+    deltas = {key: delta for key, delta in deltas.items() if any(delta.values())}
+    if deltas:
+        _add(deltas, today)
+
+
+def _add(deltas, today):
+    with transaction.atomic():
+        WorkloadCounter.objects.bulk_create(
+            [WorkloadCounter(scope=scope, object_id=pk, day=today) for scope, pk in deltas],
+            ignore_conflicts=True,
+        )
+        for (scope, pk), delta in deltas.items():
+            WorkloadCounter.objects.filter(scope=scope, object_id=pk).update(
+                **{name: F(name) + value for name, value in delta.items() if value}
+            )
+
+
+def move_employee(employee_id, old_department_id, new_department_id):
+    """Переносит нагрузку сотрудника из одного подразделения в другое."""
+    row = WorkloadCounter.objects.filter(scope=Scope.EMPLOYEE, object_id=employee_id).values(
+        *WorkloadCounter.FIELDS).first()
+    if not row or not any(row.values()):
+        return
+    _add({
+        (Scope.DEPARTMENT, old_department_id or 0): {name: -value for name, value in row.items()},
+        (Scope.DEPARTMENT, new_department_id or 0): row,
+    }, timezone.localdate())
+
+
+# ════════════════════════════════════════════════════════
+#  СВЕРКА
+# ════════════════════════════════════════════════════════
+
+GROUP_BY = {
+    Scope.EMPLOYEE:   'executor_id',
+    Scope.DEPARTMENT: 'executor__department_id',
+    Scope.TYPE:       'assignment_type_id',
+}
+
+
+def compute(today=None):
+    """Счётчики по поручениям: {(разрез, id): {поле: значение}}."""
+    today = today or timezone.localdate()
+    active = ~Q(status=Assignment.Status.DONE)
+    done_this_month = Exists(
+        StatusTransition.objects.completions(today.replace(day=1), today).filter(assignment=OuterRef('pk'))
+    )
+    counts = {}
+    for scope, field in GROUP_BY.items():
+        rows = Assignment.objects.order_by().values(field).annotate(
+            total=Count('id'),
+            active=Count('id', filter=active),
+            overdue=Count('id', filter=Q(status=Assignment.Status.OVERDUE)),
+            due_week=Count('id', filter=active & Q(
+                deadline__gte=today, deadline__lt=today + timedelta(days=DUE_DAYS))),
+            done_month=Count('id', filter=Q(done_this_month, status=Assignment.Status.DONE)),
+        )
+        for row in rows:
+            counts[(scope, row.pop(field) or 0)] = row
+    return counts
+
+
+def reconcile(today=None):
+    """
+    Пересчитывает счётчики; возвращает число исправленных строк. Считает
+    всегда по основной базе: результат записывается в неё, а отстающая
+    реплика вернула бы устаревшие числа.
+    """
+    today = today or timezone.localdate()
+    with use_primary(), transaction.atomic():
+        expected = compute(today)
+        stored = {(c.scope, c.object_id): c for c in WorkloadCounter.objects.select_for_update()}
+        zero = dict.fromkeys(WorkloadCounter.FIELDS, 0)
+
+        fixed, created = [], []
+        for key in expected.keys() | stored.keys():
+            values = expected.get(key, zero)
+            counter = stored.get(key)
+            if counter is None:
+                created.append(WorkloadCounter(scope=key[0], object_id=key[1], day=today, **values))
+            elif any(getattr(counter, name) != value for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(counter, name, value)
+                fixed.append(counter)
+
+        WorkloadCounter.objects.bulk_create(created, batch_size=1000)
+        WorkloadCounter.objects.bulk_update(fixed, WorkloadCounter.FIELDS, batch_size=1000)
+        WorkloadCounter.objects.exclude(day=today).update(day=today)
+    return len(fixed) + len(created)
+
+
+def counters(scope):
+    """
+    {id: WorkloadCounter} разреза; устаревшие (сверка не сегодня) сначала
+    пересчитываются. Таблица маленькая и меняется при каждой записи поручений,
+    поэтому читается с основной базы и под @replica_view: по отстающей
+    реплике сверка запускалась бы снова на каждом запросе.
+    """
+    today = timezone.localdate()
+    with use_primary():
+        rows = {c.object_id: c for c in WorkloadCounter.objects.filter(scope=scope)}
+        if not rows or any(c.day != today for c in rows.values()):
+            reconcile(today)
+            rows = {c.object_id: c for c in WorkloadCounter.objects.filter(scope=scope)}
+    return rows
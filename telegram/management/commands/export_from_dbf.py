@@ -6,7 +6,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 # ВАЖНО: ЗАМЕНИТЕ 'main' на реальное название вашего приложения, если оно называется иначе
-from task_control.models import Assignment, AssignmentType, Employee
+from task_control.models import Assignment, AssignmentType, Employee, StatusTransition
 
 
 class Command(BaseCommand):
@@ -99,10 +99,11 @@ class Command(BaseCommand):
             zip(pd.to_numeric(sprisp['KISP'], errors='coerce'), sprisp['FIOISP'])) if sprisp is not None else {}
 
         count_created = 0
+        count_updated = 0
         count_skipped = 0
 
         # 3. Перебираем строки приказа и создаем записи в БД
-        with transaction.atomic():
+        with transaction.atomic(), StatusTransition.buffer():
             for index, row in prikaz.iterrows():
                 # Расшифровываем коды в текст
                 doc_vid_text = dict_vid.get(pd.to_numeric(row.get('KDOC', 0), errors='coerce'))
@@ -147,20 +148,30 @@ class Command(BaseCommand):
                     count_skipped += 1
                     continue
 
-                # --- СОЗДАЕМ ПОРУЧЕНИЕ В БАЗЕ ---
-                Assignment.objects.create(
+                # --- СОЗДАЕМ ИЛИ ОБНОВЛЯЕМ ПОРУЧЕНИЕ В БАЗЕ ---
+                # Номер документа уникален у исполнителя в пределах вида и года:
+                # повторный импорт обновляет поручение, статус уже заведённого не трогаем
+                fields = {
+                    'issue_date': date_issue,
+                    'deadline': date_deadline,
+                    'description': description,
+                    'approver': approver,
+                    'controller': controller,
+                }
+                _, created = Assignment.objects.update_or_create(
                     assignment_type=assign_type,
+                    issue_date__year=date_issue.year,
                     document_number=doc_num,
-                    issue_date=date_issue,
-                    deadline=date_deadline,
-                    description=description,
                     executor=executor,
-                    approver=approver,
-                    controller=controller,
-                    status=Assignment.Status.NEW
+                    defaults=fields,
+                    create_defaults={**fields, 'status': Assignment.Status.NEW},
                 )
-                count_created += 1
+                if created:
+                    count_created += 1
+                else:
+                    count_updated += 1
 
         self.stdout.write(self.style.SUCCESS(f"\n--- ГОТОВО! ---"))
         self.stdout.write(self.style.SUCCESS(f"Создано поручений: {count_created}"))
+        self.stdout.write(self.style.SUCCESS(f"Обновлено поручений: {count_updated}"))
         self.stdout.write(self.style.WARNING(f"Пропущено (исполнитель не найден): {count_skipped}"))
\ No newline at end of file
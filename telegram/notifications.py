@@ -6,7 +6,7 @@ from datetime import timedelta
 from collections import defaultdict
 from requests.exceptions import RequestException
 
-from task_control.models import Assignment
+from task_control.models import Assignment, StatusTransition
 
 logger = logging.getLogger(__name__)
 
@@ -175,6 +175,8 @@ def fmt_footer(note: str) -> list[str]:
 #  1. НОВЫЕ ПОРУЧЕНИЯ
 # ════════════════════════════════════════════════════════
 
+# Переходы NEW → IN_PROGRESS за весь проход — одной вставкой
+@StatusTransition.buffer()
 def process_new_assignments(queryset):
     sent_count = 0
     assignments = queryset.filter(is_notified_created=False)
@@ -0,0 +1,21 @@
+"""Фоновые задачи Telegram-модуля (jobs.registry)."""
+import shutil
+from io import StringIO
+
+from django.core.management import call_command
+
+from jobs.registry import register
+
+
+@register('telegram.import_dbf', 'Импорт поручений из DBF', concurrency=1)
+def import_dbf(ctx):
+    """Команда export_from_dbf над папкой с загруженными DBF-файлами."""
+    folder = ctx.input_path('folder')
+    output = StringIO()
+    ctx.progress(message='Импорт DBF')
+    try:
+        call_command('export_from_dbf', str(folder), stdout=output, stderr=output)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    lines = output.getvalue().splitlines()
+    return {'log': lines[-50:]}